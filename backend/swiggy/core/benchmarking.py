@@ -0,0 +1,191 @@
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from socketserver import ThreadingMixIn
+from typing import Callable, Optional
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client
+
+SERVER_TIMING_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+@dataclass
+class Scenario:
+    """
+    One endpoint to benchmark.
+
+    ``body`` and ``headers`` are called with the iteration number so each
+    request can carry unique data (e.g. a fresh email for registration).
+    """
+    name: str
+    method: str
+    path: str
+    body: Optional[Callable[[int], dict]] = None
+    headers: Callable[[int], dict] = field(default=lambda i: {})
+    expect_status: tuple = (200, 201)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def queries_from_header(value):
+    match = SERVER_TIMING_QUERIES_RE.search(value or '')
+    return int(match.group(1)) if match else None
+
+
+def summarize(name, samples, elapsed, errors):
+    latencies = sorted(latency for latency, _ in samples)
+    queries = [count for _, count in samples if count is not None]
+    return {
+        'scenario': name,
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_with_client(scenario, iterations):
+    """
+    Drive a scenario in-process through the Django test client. A request
+    that raises (``QueryBudgetExceeded`` with budgets enforced) is counted
+    as an error, like a 500 over HTTP, instead of ending the run.
+    """
+    client = Client(raise_request_exception=False)
+    samples, errors = [], 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        body = scenario.body(i) if scenario.body else None
+        extra = {f'HTTP_{k.upper().replace("-", "_")}': v for k, v in scenario.headers(i).items()}
+        t0 = time.perf_counter()
+        response = client.generic(
+            scenario.method, scenario.path,
+            json.dumps(body) if body is not None else '',
+            content_type='application/json', **extra,
+        )
+        latency = time.perf_counter() - t0
+        if response.status_code not in scenario.expect_status:
+            errors += 1
+        samples.append((latency, queries_from_header(response.get('Server-Timing'))))
+    return summarize(scenario.name, samples, time.perf_counter() - started, errors)
+
+
+def run_over_http(base_url, scenario, iterations, concurrency):
+    """Drive a scenario against a running server with ``concurrency`` workers."""
+    def one(i):
+        body = scenario.body(i) if scenario.body else None
+        request = Request(
+            base_url + scenario.path,
+            data=json.dumps(body).encode() if body is not None else None,
+            method=scenario.method,
+            headers={'Content-Type': 'application/json', **scenario.headers(i)},
+        )
+        t0 = time.perf_counter()
+        try:
+            with urlopen(request, timeout=30) as response:
+                response.read()
+                status, timing = response.status, response.headers.get('Server-Timing')
+        except HTTPError as exc:
+            status, timing = exc.code, exc.headers.get('Server-Timing')
+        return time.perf_counter() - t0, queries_from_header(timing), status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(iterations)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for _, _, status in results if status not in scenario.expect_status)
+    return summarize(scenario.name, [(latency, q) for latency, q, _ in results], elapsed, errors)
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_wsgi(application):
+    """Serve a WSGI app on an ephemeral localhost port for the block's duration."""
+    server = make_server('127.0.0.1', 0, application, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def serve_asgi(application):
+    """Serve an ASGI app with uvicorn (optional dependency) on an ephemeral port."""
+    try:
+        import uvicorn
+    except ImportError as exc:
+        raise ImproperlyConfigured('ASGI benchmarks require the "uvicorn" package.') from exc
+    import socket
+
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(application, lifespan='off', log_level='warning'))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def compare_to_baseline(results, baseline, tolerance, timings=True):
+    """
+    Regressions of ``results`` against ``baseline``.
+
+    Failed requests and any increase in queries per request are
+    regressions; latency and throughput are compared with a relative
+    ``tolerance`` because they depend on the machine, and only with
+    ``timings``.
+    """
+    previous = {row['scenario']: row for row in baseline.get('results', [])}
+    regressions = []
+    for row in results:
+        if row['errors']:
+            regressions.append(f"{row['scenario']}: {row['errors']} of {row['requests']} requests failed")
+        old = previous.get(row['scenario'])
+        if not old:
+            continue
+        if (row['queries_per_request'] or 0) > (old['queries_per_request'] or 0):
+            regressions.append(
+                f"{row['scenario']}: queries/request {old['queries_per_request']} -> {row['queries_per_request']}"
+            )
+        if not timings:
+            continue
+        if old['p95_ms'] and row['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{row['scenario']}: p95 {old['p95_ms']}ms -> {row['p95_ms']}ms")
+        if old['throughput_rps'] and row['throughput_rps'] < old['throughput_rps'] * (1 - tolerance):
+            regressions.append(
+                f"{row['scenario']}: throughput {old['throughput_rps']} -> {row['throughput_rps']} req/s"
+            )
+    return regressions
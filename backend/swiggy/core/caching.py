@@ -0,0 +1,275 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .instrumentation import record_cache, registry
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """
+    Bounded in-process LRU with per-entry expiry. Thread-safe; every
+    operation is O(1).
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    A small local LRU in front of a shared Django cache.
+
+    Reads try the local tier, then the shared backend, and fill the local
+    tier on the way back. Local entries live at most ``local_ttl`` seconds,
+    which bounds how stale another process's copy can be after a delete or
+    a namespace bump; writes and deletes always go to the shared tier.
+
+    Counters (``incr``/``add``) bypass the local tier, so rate limits are
+    shared by every worker as long as the shared backend is.
+    """
+
+    def __init__(self, alias='default', local_max_entries=10000, local_ttl=5, lock_timeout=10):
+        self.alias = alias
+        self.local = LocalLRU(local_max_entries, local_ttl)
+        self.lock_timeout = lock_timeout
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        # caches[...] is per-thread, so look it up on every use
+        return caches[self.alias]
+
+    @property
+    def is_shared(self):
+        """Whether the shared tier is seen by every worker process rather than just this one."""
+        return not isinstance(self.shared, (LocMemCache, DummyCache))
+
+    def _count(self, tier, hits, misses):
+        if hits:
+            registry.inc('tiered_cache_hits_total', {'tier': tier}, hits)
+        if misses:
+            registry.inc('tiered_cache_misses_total', {'tier': tier}, misses)
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count('local', 1, 0)
+            record_cache(hits=1)
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            self._count('local', 0, 1)
+            self._count('shared', 0, 1)
+            record_cache(misses=1)
+            return default
+        self._count('local', 0, 1)
+        self._count('shared', 1, 0)
+        record_cache(hits=1)
+        self.local.set(key, value)
+        return value
+
+    def get_many(self, keys):
+        found, pending = {}, []
+        for key in keys:
+            value = self.local.get(key)
+            if value is _MISSING:
+                pending.append(key)
+            else:
+                found[key] = value
+        shared = self.shared.get_many(pending) if pending else {}
+        for key, value in shared.items():
+            self.local.set(key, value)
+        found.update(shared)
+        self._count('local', len(keys) - len(pending), len(pending))
+        self._count('shared', len(shared), len(pending) - len(shared))
+        record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.shared.set(key, value, timeout=timeout)
+        self.local.set(key, value, None if timeout in (DEFAULT_TIMEOUT, None) else timeout)
+
+    def set_many(self, mapping, timeout=DEFAULT_TIMEOUT):
+        self.shared.set_many(mapping, timeout=timeout)
+        for key, value in mapping.items():
+            self.local.set(key, value, None if timeout in (DEFAULT_TIMEOUT, None) else timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many(keys)
+
+    def clear(self):
+        """Empty both tiers (tests); other processes keep their local tier."""
+        self.local.clear()
+        self.shared.clear()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return self.shared.add(key, value, timeout=timeout)
+
+    def incr(self, key, delta=1, timeout=DEFAULT_TIMEOUT):
+        """
+        Atomically add ``delta`` to a shared counter, creating it with
+        ``timeout`` on first use. The expiry is not extended by later
+        increments, so it works as a fixed window.
+        """
+        shared = self.shared
+        if shared.add(key, delta, timeout=timeout):
+            return delta
+        try:
+            return shared.incr(key, delta)
+        except ValueError:
+            # Expired between add() and incr()
+            shared.set(key, delta, timeout=timeout)
+            return delta
+
+    def namespace_version(self, namespace):
+        key = f'{namespace}:version'
+        version = self.local.get(key)
+        if version is _MISSING:
+            version = self.shared.get_or_set(key, 1, timeout=None)
+            self.local.set(key, version)
+        return version
+
+    def versioned_key(self, namespace, key):
+        return f'{namespace}:{self.namespace_version(namespace)}:{key}'
+
+    def bump_namespace(self, namespace):
+        """Invalidate every key built with ``versioned_key(namespace, ...)`` at once."""
+        key = f'{namespace}:version'
+        self.local.delete(key)
+        try:
+            self.shared.incr(key)
+        except ValueError:
+            self.shared.set(key, 2, timeout=None)
+
+    def get_or_set(self, key, compute, timeout=DEFAULT_TIMEOUT):
+        """
+        Return the cached value for ``key``, computing it at most once at a
+        time: threads of this process wait on the same in-flight call, and
+        other processes wait on a short shared lock instead of recomputing.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {'event': threading.Event(), 'value': _MISSING}
+        if not leader:
+            flight['event'].wait(self.lock_timeout)
+            if flight['value'] is not _MISSING:
+                record_cache(hits=1)
+                return flight['value']
+            return self.get_or_set(key, compute, timeout)
+
+        try:
+            value = self._compute_once(key, compute, timeout)
+            flight['value'] = value
+            return value
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight['event'].set()
+
+    def _compute_once(self, key, compute, timeout):
+        lock_key = f'{key}:lock'
+        if not self.shared.add(lock_key, 1, timeout=self.lock_timeout):
+            # Another process is computing; wait for its result
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self.shared.get(key, _MISSING)
+                if value is not _MISSING:
+                    self.local.set(key, value)
+                    return value
+            # The other process died or is too slow; compute anyway
+        try:
+            value = compute()
+            self.set(key, value, timeout=timeout)
+            return value
+        finally:
+            self.shared.delete(lock_key)
+
+
+_tiered_cache = None
+_tiered_cache_lock = threading.Lock()
+
+
+def get_tiered_cache():
+    """The process-wide ``TieredCache`` configured by ``settings.TIERED_CACHE``."""
+    global _tiered_cache
+    if _tiered_cache is None:
+        with _tiered_cache_lock:
+            if _tiered_cache is None:
+                options = settings.TIERED_CACHE
+                _tiered_cache = TieredCache(
+                    alias=options['ALIAS'],
+                    local_max_entries=options['LOCAL_MAX_ENTRIES'],
+                    local_ttl=options['LOCAL_TTL'],
+                    lock_timeout=options['LOCK_TIMEOUT'],
+                )
+    return _tiered_cache
+
+
+@receiver(setting_changed)
+def reset_tiered_cache(setting=None, **kwargs):
+    """Drop the process-wide instance when the cache settings change (tests)."""
+    global _tiered_cache
+    if setting in (None, 'TIERED_CACHE', 'CACHES'):
+        with _tiered_cache_lock:
+            _tiered_cache = None
@@ -0,0 +1,204 @@
+import atexit
+import logging
+import pickle
+import threading
+import time
+
+from django.conf import settings
+
+from .caching import get_tiered_cache
+from .sketches import CountMinSketch, HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_NAMESPACE = 'counters'
+
+
+class EventSketch:
+    """
+    Everything counted for one event type in one time bucket: a count-min
+    sketch of keys, a HyperLogLog of all users, and per-key HyperLogLogs of
+    users for the heaviest ``candidates`` keys (count-min sketches cannot
+    list their keys, so the heavy ones are tracked to rank them later).
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.counts = CountMinSketch(options['CMS_WIDTH'], options['CMS_DEPTH'])
+        self.users = HyperLogLog(options['HLL_PRECISION'])
+        self.key_users = {}
+
+    def add(self, key, user):
+        key = str(key)
+        self.counts.add(key)
+        self.users.add(user)
+        key_users = self.key_users.get(key)
+        if key_users is None:
+            if len(self.key_users) >= self.options['CANDIDATES']:
+                self._evict()
+            key_users = self.key_users[key] = HyperLogLog(self.options['KEY_HLL_PRECISION'])
+        key_users.add(user)
+
+    def _evict(self):
+        # Drop the lightest half at once so eviction stays amortized O(1)
+        ranked = sorted(self.key_users, key=self.counts.estimate)
+        for key in ranked[:len(ranked) // 2]:
+            del self.key_users[key]
+
+    def merge(self, other):
+        self.counts.merge(other.counts)
+        self.users.merge(other.users)
+        for key, users in other.key_users.items():
+            if key in self.key_users:
+                self.key_users[key].merge(users)
+            else:
+                self.key_users[key] = users
+
+    def top(self, limit):
+        """
+        Returns:
+            list: ``(key, estimated count, estimated unique users)``, heaviest first
+        """
+        ranked = sorted(self.key_users, key=lambda key: (-self.counts.estimate(key), key))[:limit]
+        return [(key, self.counts.estimate(key), self.key_users[key].count()) for key in ranked]
+
+
+class ShardedCounters:
+    """
+    Sliding-window event counters without a database write per event.
+
+    Each process counts into its own shard for the current time bucket,
+    and a background thread publishes the shard to the shared cache every
+    ``FLUSH_SECONDS`` under a slot of its own, so shards are never
+    read-modify-written across workers. Readers merge every slot of the
+    last ``WINDOW_BUCKETS`` buckets and cache the merged window for
+    ``MERGED_TTL`` seconds. Events are visible after at most one flush
+    interval; a process that dies loses its unflushed interval.
+    """
+
+    def __init__(self, options, background=True):
+        self.options = options
+        self.background = background
+        self._shards = {}
+        self._slots = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def _bucket(self, now=None):
+        return int((now or time.time()) // self.options['BUCKET_SECONDS'])
+
+    def _shard_key(self, event, bucket, slot):
+        return f'{COUNTERS_NAMESPACE}:{event}:{bucket}:{slot}'
+
+    def _slots_key(self, event, bucket):
+        return f'{COUNTERS_NAMESPACE}:{event}:{bucket}:slots'
+
+    def _ttl(self):
+        return self.options['BUCKET_SECONDS'] * (self.options['WINDOW_BUCKETS'] + 1)
+
+    def record(self, event, key, user):
+        bucket = self._bucket()
+        with self._lock:
+            shard = self._shards.get((event, bucket))
+            if shard is None:
+                shard = self._shards[(event, bucket)] = EventSketch(self.options)
+            shard.add(key, str(user))
+            self._dirty.add((event, bucket))
+        if self.background:
+            self._ensure_thread()
+        else:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='counters-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.options['FLUSH_SECONDS'])
+            self.flush()
+
+    def flush(self):
+        """Publish every shard changed since the last flush; safe from any thread."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                current = self._bucket()
+                # Finished buckets are published one last time, then forgotten
+                for ident in [ident for ident in self._shards if ident[1] < current and ident not in dirty]:
+                    del self._shards[ident]
+                    self._slots.pop(ident, None)
+            if not dirty:
+                return
+            cache = get_tiered_cache()
+            try:
+                for event, bucket in dirty:
+                    slot = self._slots.get((event, bucket))
+                    if slot is None:
+                        slot = self._slots[(event, bucket)] = cache.incr(
+                            self._slots_key(event, bucket), timeout=self._ttl(),
+                        )
+                    with self._lock:
+                        # Pickled under the lock so record() cannot change it
+                        # mid-write, and sent outside it so record() never
+                        # waits on the cache round trip
+                        payload = pickle.dumps(self._shards[(event, bucket)], pickle.HIGHEST_PROTOCOL)
+                    cache.shared.set(self._shard_key(event, bucket, slot), payload, timeout=self._ttl())
+            except Exception:
+                logger.exception('Failed to publish counter shards')
+                with self._lock:
+                    self._dirty |= {ident for ident in dirty if ident in self._shards}
+
+    def _merge_bucket(self, event, bucket):
+        cache = get_tiered_cache()
+        slots = cache.shared.get(self._slots_key(event, bucket), 0)
+        merged = EventSketch(self.options)
+        keys = [self._shard_key(event, bucket, slot) for slot in range(1, slots + 1)]
+        for payload in cache.shared.get_many(keys).values():
+            merged.merge(pickle.loads(payload))
+        return merged
+
+    def window(self, event, now=None):
+        """
+        The merged sketch of ``event`` over the sliding window. Finished
+        buckets are merged across workers once and kept sealed, so a window
+        read fetches one sketch per past bucket plus the current shards.
+        """
+        cache = get_tiered_cache()
+        current = self._bucket(now)
+        merged_key = f'{COUNTERS_NAMESPACE}:{event}:merged:{current}'
+        merged = cache.get(merged_key)
+        if merged is not None:
+            return merged
+
+        past = range(current - self.options['WINDOW_BUCKETS'] + 1, current)
+        sealed_keys = {f'{COUNTERS_NAMESPACE}:{event}:{bucket}:sealed': bucket for bucket in past}
+        sealed = cache.shared.get_many(list(sealed_keys))
+        merged = self._merge_bucket(event, current)
+        for key, bucket in sealed_keys.items():
+            sketch = sealed.get(key)
+            if sketch is None:
+                sketch = self._merge_bucket(event, bucket)
+                # The previous bucket may still get a worker's final flush
+                if bucket < current - 1:
+                    cache.shared.set(key, sketch, timeout=self._ttl())
+            merged.merge(sketch)
+        cache.set(merged_key, merged, timeout=self.options['MERGED_TTL'])
+        return merged
+
+
+_counters = None
+_counters_lock = threading.Lock()
+
+
+def get_counters():
+    global _counters
+    if _counters is None:
+        with _counters_lock:
+            if _counters is None:
+                _counters = ShardedCounters(settings.COUNTERS, background=settings.COUNTERS['BACKGROUND_FLUSH'])
+                atexit.register(_counters.flush)
+    return _counters
@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+# One record per request; sampled through LOGGING
+access_logger = logging.getLogger('core.access')
+
+# "<queries>/<budget>" on responses of views that ran over their budget
+BUDGET_HEADER = 'Query-Budget-Exceeded'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more SQL queries than it declared."""
+
+
+class RequestMetrics:
+    __slots__ = (
+        'started', 'view', 'query_budget', 'sql_count', 'sql_time',
+        'cache_hits', 'cache_misses', 'serializer_time',
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.query_budget = None
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a connection execute_wrapper for the whole request
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    def budget_for(self, method):
+        budget = self.query_budget
+        if isinstance(budget, dict):
+            return budget.get(method)
+        return budget
+
+
+def current_metrics():
+    """Metrics of the request being served on this thread/task, if any."""
+    return _current.get()
+
+
+def record_cache(hits=0, misses=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+@contextmanager
+def serializer_timer():
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """
+    Count the time spent producing ``serializer.data`` towards the
+    request's serializer time. Use ``TimedListSerializer`` as the
+    ``Meta.list_serializer_class`` for serializers rendered with many=True.
+    """
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    pass
+
+
+class MetricsRegistry:
+    """
+    Process-local aggregate of request metrics, rendered in the Prometheus
+    text exposition format. Each worker process exposes its own numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets, total, count = self._histograms.get(key, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    buckets[index] += 1
+            self._histograms[key] = (buckets, total + value, count + 1)
+
+    def record(self, metrics, method, status):
+        view = metrics.view or 'unresolved'
+        labels = {'view': view, 'method': method, 'status': str(status)}
+        self.inc('http_requests_total', labels)
+        self.observe('http_request_duration_seconds', {'view': view}, time.perf_counter() - metrics.started)
+        self.inc('db_queries_total', {'view': view}, metrics.sql_count)
+        self.inc('db_query_duration_seconds_total', {'view': view}, metrics.sql_time)
+        self.inc('cache_hits_total', {'view': view}, metrics.cache_hits)
+        self.inc('cache_misses_total', {'view': view}, metrics.cache_misses)
+        self.inc('serializer_duration_seconds_total', {'view': view}, metrics.serializer_time)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(b), t, c)) for key, (b, t, c) in self._histograms.items())
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f'# TYPE {name} counter')
+                declared.add(name)
+            lines.append(f'{name}{{{_labels(labels)}}} {value}')
+        for (name, labels), (buckets, total, count) in histograms:
+            if name not in declared:
+                lines.append(f'# TYPE {name} histogram')
+                declared.add(name)
+            for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'{name}_bucket{{{_labels(labels + (("le", str(bound)),))}}} {bucket_count}')
+            lines.append(f'{name}_bucket{{{_labels(labels + (("le", "+Inf"),))}}} {count}')
+            lines.append(f'{name}_sum{{{_labels(labels)}}} {total}')
+            lines.append(f'{name}_count{{{_labels(labels)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    """
+    Records wall time, SQL count/time, cache hits/misses and serializer time
+    for every request, reports them as a ``Server-Timing`` header, in the
+    ``/metrics`` registry and in a ``core.access`` log record, and enforces
+    per-view query budgets.
+
+    Views declare budgets with a ``query_budget`` attribute, either an int
+    or a ``{method: int}`` dict. An overrun is logged, counted and flagged
+    in a ``Query-Budget-Exceeded`` header. The view has run and committed
+    by then, so only with ``QUERY_BUDGETS['ENFORCE']`` (the test runner)
+    does it raise ``QueryBudgetExceeded`` instead.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        registry.record(metrics, request.method, response.status_code)
+        response['Server-Timing'] = self.server_timing(metrics)
+        if access_logger.isEnabledFor(logging.INFO):
+            access_logger.info('request', extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'view': metrics.view,
+                'duration_ms': round((time.perf_counter() - metrics.started) * 1000, 1),
+                'queries': metrics.sql_count,
+            })
+        self.check_budget(metrics, request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return None
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        target = view_class or view_func
+        metrics.view = f'{target.__module__}.{target.__qualname__}'
+        metrics.query_budget = getattr(view_class, 'query_budget', None)
+        return None
+
+    @staticmethod
+    def server_timing(metrics):
+        total = (time.perf_counter() - metrics.started) * 1000
+        return ', '.join([
+            f'app;dur={total:.1f}',
+            f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} queries"',
+            f'ser;dur={metrics.serializer_time * 1000:.1f}',
+            f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+        ])
+
+    @staticmethod
+    def check_budget(metrics, request, response):
+        budget = metrics.budget_for(request.method)
+        if budget is None or metrics.sql_count <= budget:
+            return
+        registry.inc('query_budget_exceeded_total', {'view': metrics.view})
+        response[BUDGET_HEADER] = f'{metrics.sql_count}/{budget}'
+        message = (
+            f'{metrics.view} ran {metrics.sql_count} queries for {request.method} '
+            f'{request.path}, budget is {budget}'
+        )
+        if settings.QUERY_BUDGETS['ENFORCE']:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
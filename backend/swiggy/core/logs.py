@@ -0,0 +1,204 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Incoming ids are echoed into logs and headers, so only plain tokens are kept
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id = ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed with ``extra``
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def current_request_id():
+    """Id of the request being served on this thread/task, if any."""
+    return _request_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: time, level, logger, message, request id,
+    every field passed with ``extra``, and the formatted exception.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Give every record a ``request_id``: the one being served on this
+    thread/task, or else that of the record's ``request``. ``django.request``
+    logs 4xx/5xx responses after ``RequestIdMiddleware`` has returned, so
+    only the request still knows its id by then.
+    """
+
+    def filter(self, record):
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = _request_id.get() or getattr(getattr(record, 'request', None), 'request_id', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep INFO and lower records of the loggers in ``rates`` (names or
+    dotted prefixes) at the given rate; warnings and errors always pass.
+    Records of one request are kept or dropped together, so a sampled
+    request's logs stay complete.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        # Longest prefix first, so 'core.access' wins over 'core'
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+
+    def rate_for(self, name):
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return rate
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1:
+            return True
+        request_id = getattr(record, 'request_id', None) or _request_id.get()
+        if request_id is None:
+            return random.random() < rate
+        return zlib.crc32(request_id.encode()) / 2 ** 32 < rate
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full when the process exits; wait for room
+        # rather than losing the sentinel and never joining the thread
+        self.queue.put(self._sentinel, timeout=5)
+
+
+class PipelineHandler(QueueHandler):
+    """
+    Logging handler that never blocks the calling thread: records are put
+    on a bounded queue and a listener thread formats them as JSON and
+    writes them to the sink. When the sink falls behind and the queue
+    fills, new records are dropped and counted
+    (``log_records_dropped_total`` in ``/metrics``) instead of stalling
+    requests.
+
+    Messages are rendered in the listener, so log arguments should be
+    plain values (ids, strings, numbers) rather than objects that change
+    or query the database when formatted.
+
+    Args:
+        sink (str): ``stdout``, ``stderr`` or a file path (reopened when
+            rotated away, for logrotate)
+        queue_size (int): Records buffered before dropping
+        sample_rates (dict): ``{logger name: rate}`` for ``SamplingFilter``
+    """
+
+    def __init__(self, sink='stdout', queue_size=10000, sample_rates=None):
+        super().__init__(queue.Queue(queue_size))
+        self.queue_size = queue_size
+        if sink in ('stdout', 'stderr'):
+            self.sink = logging.StreamHandler(getattr(sys, sink))
+        else:
+            self.sink = WatchedFileHandler(sink, encoding='utf-8')
+        self.sink.setFormatter(JsonFormatter())
+        self.addFilter(RequestIdFilter())
+        if sample_rates:
+            self.addFilter(SamplingFilter(sample_rates))
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_listener(self):
+        # Threads do not survive a fork, so a forked worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(self.queue_size)
+                self._listener = DrainingQueueListener(self.queue, self.sink)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, leave formatting to the listener
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            # Imported here so configuring logging does not load DRF
+            from .instrumentation import registry
+            registry.inc('log_records_dropped_total', {'logger': record.name})
+
+    def stop(self):
+        """Write out everything queued; called at exit."""
+        listener = self._listener
+        if listener is not None and self._pid == os.getpid():
+            self._listener = self._pid = None
+            listener.stop()
+
+    def close(self):
+        self.stop()
+        self.sink.close()
+        super().close()
+
+
+class RequestIdMiddleware:
+    """
+    Tag every log record of a request with its id: the caller's
+    ``X-Request-ID`` when it is a plain token, otherwise a new one. The
+    id is returned in the same header for correlating client reports.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = _request_id.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,127 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ('full', 'api')
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from swiggy.wsgi import application
+booted = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+from django.conf import settings
+
+# Otherwise an empty ALLOWED_HOSTS turns every probe into a 400
+settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'localhost']
+
+def call(path):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': 'localhost'}
+    setup_testing_defaults(environ)
+    statuses = []
+    t0 = time.perf_counter()
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(body)
+    if hasattr(body, 'close'):
+        body.close()
+    return time.perf_counter() - t0, statuses[0]
+
+first, status = call(sys.argv[1])
+second, _ = call(sys.argv[1])
+print(json.dumps({
+    'setup_ms': (setup - started) * 1000,
+    'boot_ms': (booted - setup) * 1000,
+    'first_request_ms': first * 1000,
+    'second_request_ms': second * 1000,
+    'status': status,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold-start cost for each settings profile in fresh interpreters: '
+        'django.setup() time, WSGI boot (including prewarming), time to first and '
+        'second request, and the wall time of a bare manage.py command.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per profile.')
+        parser.add_argument('--profile', action='append', dest='profiles', choices=PROFILES,
+                            help='Only measure the named profile(s).')
+        parser.add_argument('--path', default='/.well-known/jwks.json',
+                            help='Public GET path for the first-request probe; it must answer 200.')
+        parser.add_argument('--no-prewarm', action='store_true', help='Boot workers with PREWARM_ON_BOOT=False.')
+        parser.add_argument('--output', help='Also write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        results = []
+        for profile in options['profiles'] or PROFILES:
+            env = {
+                **os.environ,
+                'SETTINGS_PROFILE': profile,
+                'PREWARM_ON_BOOT': str(not options['no_prewarm']),
+                # Keep the probe's stdout for its result line
+                'LOG_SINK': 'stderr',
+                'PYTHONPATH': os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.getenv('PYTHONPATH')])),
+            }
+            self.stdout.write(f'Measuring {profile} profile...')
+            probes = [self.probe(env, options['path']) for _ in range(options['runs'])]
+            commands = [self.time_command(env) for _ in range(options['runs'])]
+            row = {'profile': profile, 'status': probes[-1]['status'], 'modules': probes[-1]['modules']}
+            for key in ('setup_ms', 'boot_ms', 'first_request_ms', 'second_request_ms'):
+                row[key] = round(statistics.median(p[key] for p in probes), 1)
+            row['command_ms'] = round(statistics.median(commands), 1)
+            results.append(row)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def probe(self, env, path):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, path], env=env, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'Startup probe failed:\n{completed.stderr}')
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        # An error response would time the error path, not the view
+        if not result['status'].startswith('200'):
+            raise CommandError(f"Startup probe of {path} answered {result['status']}, expected 200 OK.")
+        return result
+
+    @staticmethod
+    def time_command(env):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'check'],
+            env=env, capture_output=True, check=True,
+        )
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, results):
+        header = (
+            f"{'profile':<9}{'setup ms':>10}{'boot ms':>10}{'1st req':>10}{'2nd req':>10}"
+            f"{'check ms':>10}{'modules':>9}  status"
+        )
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            self.stdout.write(
+                f"{row['profile']:<9}{row['setup_ms']:>10}{row['boot_ms']:>10}{row['first_request_ms']:>10}"
+                f"{row['second_request_ms']:>10}{row['command_ms']:>10}{row['modules']:>9}  {row['status']}"
+            )
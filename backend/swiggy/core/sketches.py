@@ -0,0 +1,134 @@
+import hashlib
+import math
+from array import array
+
+
+def _hash_pair(item):
+    digest = hashlib.blake2b(item.encode() if isinstance(item, str) else item, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    ``might_contain`` never returns False for an added item; it returns a
+    false positive for roughly ``error_rate`` of other items while fewer
+    than ``capacity`` items have been added. Positions come from double
+    hashing one 128-bit blake2b digest.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        first, step = _hash_pair(item)
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def might_contain(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    __contains__ = might_contain
+
+    @property
+    def saturated(self):
+        """True once more items were added than the filter was sized for."""
+        return self.count > self.capacity
+
+
+class CountMinSketch:
+    """
+    Count-min sketch over strings: ``depth`` rows of ``width`` counters.
+
+    ``estimate`` never undercounts; it overcounts by at most
+    ``e / width`` of the total count with probability ``1 - exp(-depth)``.
+    Sketches of the same shape merge by adding their tables, so per-worker
+    sketches can be combined exactly.
+    """
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array('q', bytes(8 * width * depth))
+        self.total = 0
+
+    def _cells(self, item):
+        first, step = _hash_pair(item)
+        return (row * self.width + (first + row * step) % self.width for row in range(self.depth))
+
+    def add(self, item, count=1):
+        for cell in self._cells(item):
+            self.table[cell] += count
+        self.total += count
+
+    def estimate(self, item):
+        return min(self.table[cell] for cell in self._cells(item))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Cannot merge count-min sketches of different shapes')
+        table = self.table
+        for cell, count in enumerate(other.table):
+            if count:
+                table[cell] += count
+        self.total += other.total
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with ``2 ** precision`` one-byte registers.
+
+    The standard error is about ``1.04 / sqrt(2 ** precision)`` (3.25% at
+    the default precision of 10, in 1KB). Counters merge by taking the
+    register-wise maximum, which equals counting the union.
+    """
+
+    def __init__(self, precision=10):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item):
+        digest = hashlib.blake2b(item.encode() if isinstance(item, str) else item, digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge HyperLogLogs of different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Linear counting is more accurate while many registers are empty
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    __len__ = count
@@ -0,0 +1,98 @@
+import logging
+import sys
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _view_classes(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _view_classes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if view_class is not None:
+                yield view_class
+
+
+def _serializer_classes(view_classes):
+    found = {cls.serializer_class for cls in view_classes if getattr(cls, 'serializer_class', None)}
+    for app_config in apps.get_app_configs():
+        module = sys.modules.get(f'{app_config.name}.serializers')
+        # Only this project's apps; third-party modules hold abstract bases
+        if module is None or not app_config.path.startswith(str(settings.BASE_DIR)):
+            continue
+        found.update(
+            value for value in vars(module).values()
+            if isinstance(value, type) and issubclass(value, BaseSerializer)
+            and value.__module__ == module.__name__
+        )
+    return found
+
+
+def prewarm():
+    """
+    Pay the one-off costs of the first request at worker boot.
+
+    Populates the URL resolver (which imports every view), builds each
+    serializer's fields once so model ``_meta`` caches are filled, and
+    loads the password hasher, JWT backend and signing key ring. The key
+    ring is the only step reading the database (and cache); its
+    connections are closed afterwards, so this is safe to run before a
+    pre-fork server forks its workers.
+
+    Returns:
+        dict: Milliseconds spent in each step
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018  (populates the resolver)
+    view_classes = list(_view_classes(resolver.url_patterns))
+    timings['urls'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    autodiscover_modules('serializers')
+    warmed = 0
+    for serializer_class in _serializer_classes(view_classes):
+        try:
+            serializer_class().fields
+        except Exception:
+            # Serializers that need context/arguments warm on first use instead
+            logger.debug('Could not prewarm %s', serializer_class.__qualname__, exc_info=True)
+        else:
+            warmed += 1
+    timings['serializers'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    get_hasher()
+    from rest_framework_simplejwt.state import token_backend  # noqa: F401  (imports PyJWT)
+    timings['auth'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    from user_auth.keys import get_token_backend
+    try:
+        # Otherwise the first login or JWKS request of the worker loads it
+        get_token_backend().ring.signing_key()
+    except Exception:
+        # No database yet (e.g. before migrate); keys load on first use
+        logger.warning('Could not preload signing keys', exc_info=True)
+    finally:
+        connections.close_all()
+    timings['keys'] = time.perf_counter() - started
+
+    timings = {step: round(seconds * 1000, 2) for step, seconds in timings.items()}
+    logger.info(
+        'Prewarmed %d views and %d serializers (%s profile): %s',
+        len(view_classes), warmed, settings.SETTINGS_PROFILE, timings,
+    )
+    return timings
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner that fails any request running more queries than its
+    view's ``query_budget``, so budgets are checked by every request test,
+    and writes out the write-behind buffers before the test database goes.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._budgets = override_settings(QUERY_BUDGETS={**settings.QUERY_BUDGETS, 'ENFORCE': True})
+        self._budgets.enable()
+
+    def teardown_databases(self, old_config, **kwargs):
+        # Their atexit flush would run once the test database is dropped,
+        # when the connection points back at the development database
+        from user_auth import audit, rollups, tokens
+        for module in (rollups, tokens, audit):
+            module.get_writer().flush()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self._budgets.disable()
+        super().teardown_test_environment(**kwargs)
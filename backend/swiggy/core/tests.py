@@ -0,0 +1,109 @@
+import logging
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from .caching import get_tiered_cache
+from .counters import ShardedCounters
+from .instrumentation import BUDGET_HEADER, PerformanceMiddleware, QueryBudgetExceeded, current_metrics
+from .logs import RequestIdFilter, _request_id
+
+
+class RequestIdFilterTests(SimpleTestCase):
+    def record(self, **extra):
+        record = logging.LogRecord('django.request', logging.WARNING, __file__, 0, 'Bad Request', (), None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_uses_the_request_being_served(self):
+        token = _request_id.set('served')
+        try:
+            record = self.record()
+            RequestIdFilter().filter(record)
+        finally:
+            _request_id.reset(token)
+        self.assertEqual(record.request_id, 'served')
+
+    def test_falls_back_to_the_record_request(self):
+        # django.request logs 4xx responses after the middleware reset the id
+        request = type('Request', (), {'request_id': 'from-request'})()
+        record = self.record(request=request)
+        RequestIdFilter().filter(record)
+        self.assertEqual(record.request_id, 'from-request')
+
+    def test_keeps_an_explicit_request_id(self):
+        record = self.record(request_id='explicit')
+        RequestIdFilter().filter(record)
+        self.assertEqual(record.request_id, 'explicit')
+
+
+class QueryBudgetTests(TestCase):
+    def respond(self, queries):
+        def view(request):
+            current_metrics().query_budget = 1
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+            return HttpResponse()
+        return PerformanceMiddleware(view)(RequestFactory().post('/'))
+
+    @override_settings(QUERY_BUDGETS={'ENFORCE': False})
+    def test_overrun_is_flagged_not_failed(self):
+        # The view has committed its writes by now, so the client still gets them
+        with self.assertLogs('core.instrumentation', 'WARNING'):
+            response = self.respond(2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response[BUDGET_HEADER], '2/1')
+        self.assertNotIn(BUDGET_HEADER, self.respond(1))
+
+    def test_test_runner_enforces_budgets(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.respond(2)
+
+
+class ShardedCountersTests(SimpleTestCase):
+    BUCKET = 1_000_000
+
+    def setUp(self):
+        cache.clear()
+        get_tiered_cache().clear()
+        self.options = settings.COUNTERS
+        # Two workers, each publishing its shards under a slot of its own
+        self.workers = [ShardedCounters(self.options, background=False) for _ in range(2)]
+
+    def at(self, bucket):
+        return (self.BUCKET + bucket) * self.options['BUCKET_SECONDS']
+
+    def record(self, worker, bucket, key, user):
+        # Only the counters' clock, so the cache still expires entries in real time
+        with mock.patch('core.counters.time', mock.Mock(time=mock.Mock(return_value=self.at(bucket)))):
+            self.workers[worker].record('menu_view', key, user)
+
+    def window(self):
+        return ShardedCounters(self.options, background=False).window('menu_view', now=self.at(0))
+
+    def test_window_merges_slots_and_buckets(self):
+        self.record(0, -3, 7, 'u1')
+        self.record(1, -3, 7, 'u2')
+        self.record(0, -1, 7, 'u3')
+        self.record(0, -1, 8, 'u1')
+        self.record(1, 0, 8, 'u4')
+        # Just outside the window
+        self.record(1, -self.options['WINDOW_BUCKETS'], 9, 'u5')
+
+        merged = self.window()
+        self.assertEqual(merged.top(10), [('7', 3, 3), ('8', 2, 2)])
+        self.assertEqual(merged.counts.estimate('9'), 0)
+        self.assertEqual(round(merged.users.count()), 4)
+
+        # Older buckets are sealed, the previous one stays open for a final flush
+        sealed = 'counters:menu_view:{}:sealed'
+        self.assertIsNotNone(get_tiered_cache().shared.get(sealed.format(self.BUCKET - 3)))
+        self.assertIsNone(get_tiered_cache().shared.get(sealed.format(self.BUCKET - 1)))
+        self.record(1, -1, 8, 'u2')
+        get_tiered_cache().delete(f'counters:menu_view:merged:{self.BUCKET}')
+        self.assertEqual(self.window().top(10), [('7', 3, 3), ('8', 3, 3)])
@@ -0,0 +1,182 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+import django
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from realtime.events import publish_order_status
+
+from .matching import plan_window, route_minutes
+from .models import DeliveryTask, Rider
+
+TASK_FIELDS = (
+    'id', 'order_id', 'user_id', 'restaurant_id', 'pickup_latitude', 'pickup_longitude',
+    'dropoff_latitude', 'dropoff_longitude', 'ready_at',
+)
+
+
+def dispatch_options():
+    """``DISPATCH`` plus the rider speed model shared with delivery ETAs."""
+    return {
+        **settings.DISPATCH,
+        'RIDER_SPEED_KMH': settings.DELIVERY['RIDER_SPEED_KMH'],
+        'ROUTE_FACTOR': settings.DELIVERY['ROUTE_FACTOR'],
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The matching processes, started on first use; each sets up Django once."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=settings.DISPATCH['WORKERS'], initializer=django.setup)
+    return _pool
+
+
+def map_in_pool(pool, workers, function, problems):
+    """Solve zone problems in ``pool``, or inline without one or for a single zone."""
+    problems = list(problems)
+    if pool is None or len(problems) < 2:
+        return list(map(function, problems))
+    return list(pool.map(function, problems, chunksize=max(1, len(problems) // (workers * 4))))
+
+
+def pool_map(function, problems):
+    """``map`` over the dispatch pool, or inline when ``WORKERS`` is 0."""
+    workers = settings.DISPATCH['WORKERS']
+    return map_in_pool(get_pool() if workers else None, workers, function, problems)
+
+
+def create_task(order_id, user, address, restaurant, ready_at):
+    """
+    Queue an order for dispatch; the next window picks it up. Orders come
+    in through ``POST /api/dispatch/tasks/`` (``DeliveryTaskCreateView``).
+
+    Raises:
+        ValueError: The restaurant or address has no coordinates yet
+    """
+    if None in (restaurant.latitude, restaurant.longitude, address.latitude, address.longitude):
+        raise ValueError('Restaurant and address must be geocoded before dispatch.')
+    return DeliveryTask.objects.create(
+        order_id=order_id,
+        user=user,
+        address=address,
+        restaurant=restaurant,
+        pickup_latitude=restaurant.latitude,
+        pickup_longitude=restaurant.longitude,
+        dropoff_latitude=address.latitude,
+        dropoff_longitude=address.longitude,
+        ready_at=ready_at,
+    )
+
+
+def load_window(now):
+    """
+    Pending tasks (oldest first, at most ``MAX_TASKS_PER_WINDOW``) and
+    available riders that reported a location recently.
+
+    Returns:
+        tuple: ``(task rows, order arrays, rider rows, rider arrays)``
+    """
+    options = settings.DISPATCH
+    tasks = list(
+        DeliveryTask.objects.filter(status='pending').order_by('created_at')
+        .values_list(*TASK_FIELDS)[:options['MAX_TASKS_PER_WINDOW']]
+    )
+    riders = list(
+        Rider.objects.filter(
+            is_available=True,
+            latitude__isnull=False,
+            longitude__isnull=False,
+            location_updated_at__gte=now - timedelta(seconds=options['RIDER_STALE_SECONDS']),
+        ).values_list('id', 'latitude', 'longitude')
+    )
+    orders = {
+        'restaurant': np.array([task[3] for task in tasks], dtype=np.int64),
+        'pickup_lat': np.array([task[4] for task in tasks], dtype=np.float64),
+        'pickup_lng': np.array([task[5] for task in tasks], dtype=np.float64),
+        'drop_lat': np.array([task[6] for task in tasks], dtype=np.float64),
+        'drop_lng': np.array([task[7] for task in tasks], dtype=np.float64),
+        'ready': np.array([(task[8] - now).total_seconds() / 60 for task in tasks], dtype=np.float64),
+    }
+    rider_columns = {
+        'lat': np.array([rider[1] for rider in riders], dtype=np.float64),
+        'lng': np.array([rider[2] for rider in riders], dtype=np.float64),
+    }
+    return tasks, orders, riders, rider_columns
+
+
+def assign_batch(tasks, rider_id, pickup_minutes, now, options):
+    """
+    Hand ``tasks`` to the rider, unless the rider went offline or a task was
+    cancelled since the window was read (both checked by conditional
+    updates), and tell each customer their ETA once committed.
+
+    Returns:
+        int: Tasks assigned
+    """
+    batch = uuid.uuid4().hex
+    with transaction.atomic():
+        if not Rider.objects.filter(pk=rider_id, is_available=True).update(is_available=False):
+            return 0
+        assigned = DeliveryTask.objects.filter(id__in=[task[0] for task in tasks], status='pending').update(
+            status='assigned', rider_id=rider_id, batch=batch, assigned_at=now,
+        )
+        if not assigned:
+            transaction.set_rollback(True)
+            return 0
+        if assigned < len(tasks):
+            still_assigned = set(DeliveryTask.objects.filter(batch=batch).values_list('id', flat=True))
+            tasks = [task for task in tasks if task[0] in still_assigned]
+
+        pickup_at = max(pickup_minutes, max((task[8] - now).total_seconds() / 60 for task in tasks))
+        visits, minutes = route_minutes(
+            tasks[0][4], tasks[0][5], [task[6] for task in tasks], [task[7] for task in tasks], options,
+        )
+        for stop, elapsed in zip(visits, minutes):
+            _, order_id, user_id = tasks[stop][:3]
+            transaction.on_commit(partial(
+                publish_order_status, user_id, order_id, 'rider_assigned',
+                rider_id=rider_id, eta_minutes=round(pickup_at + elapsed),
+            ))
+    return assigned
+
+
+def run_window(now=None, map_fn=pool_map):
+    """
+    Dispatch one window: read pending tasks and idle riders, batch and
+    match them (zones solved in the process pool), then write the
+    assignments.
+
+    Customer notifications go through the realtime broker, so a dispatcher
+    running in its own process needs a shared broker (``RedisBroker``).
+
+    Returns:
+        dict: Counts and timings of the window
+    """
+    now = now or timezone.now()
+    options = dispatch_options()
+    started = time.perf_counter()
+    tasks, orders, riders, rider_columns = load_window(now)
+    report = {'pending': len(tasks), 'riders': len(riders), 'batches': 0, 'assigned': 0}
+    if tasks and riders:
+        plan = plan_window(orders, rider_columns, options, map_fn)
+        report['solve_seconds'] = time.perf_counter() - started
+        for indices, rider_index, pickup_minutes in plan:
+            assigned = assign_batch([tasks[i] for i in indices], riders[rider_index][0], pickup_minutes, now, options)
+            report['batches'] += bool(assigned)
+            report['assigned'] += assigned
+    report['seconds'] = time.perf_counter() - started
+    return report
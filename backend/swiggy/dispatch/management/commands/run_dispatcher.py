@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from dispatch.dispatcher import run_window
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the rider dispatcher: every DISPATCH["WINDOW_SECONDS"], batch the '
+        'pending deliveries and match them to available riders. Run exactly one '
+        'dispatcher; matching is spread over its own process pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Dispatch a single window and exit.')
+
+    def handle(self, *args, **options):
+        window = settings.DISPATCH['WINDOW_SECONDS']
+        while True:
+            started = time.monotonic()
+            report = run_window()
+            if report['pending'] or options['once']:
+                self.stdout.write(
+                    f"{report['assigned']}/{report['pending']} tasks assigned in {report['batches']} batches "
+                    f"to {report['riders']} idle riders ({report['seconds'] * 1000:.0f} ms)"
+                )
+            if options['once']:
+                return
+            time.sleep(max(0.0, window - (time.monotonic() - started)))
@@ -0,0 +1,173 @@
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.benchmarking import percentile
+from dispatch.dispatcher import dispatch_options, map_in_pool
+from dispatch.matching import greedy_zone, plan_window, route_minutes, solve_zone
+
+# Synthetic city: restaurants and riders scattered around this point
+CENTER = (12.9716, 77.5946)
+KM_PER_DEGREE = 111.0
+
+
+class Simulation:
+    """
+    Synthetic riders and orders played through the dispatch planner one
+    window at a time. Riders become idle again at their last dropoff once
+    a delivery is done; orders nobody could take wait for the next window.
+    """
+
+    def __init__(self, rate, riders, restaurants, options, rng, busy_minutes=0):
+        self.rate, self.options, self.rng = rate, options, rng
+        self.restaurants = self._scatter(restaurants, 5)
+        popularity = 1 / np.arange(1, restaurants + 1) ** 0.8
+        self.popularity = popularity / popularity.sum()
+        self.rider_lat, self.rider_lng = self._scatter(riders, 6)
+        # Mid-shift: riders come free over the next busy_minutes as earlier
+        # deliveries finish, rather than the whole fleet idling at once
+        self.busy_until = rng.uniform(0, busy_minutes, size=riders)
+        self.pending = {name: np.array([]) for name in ('restaurant', 'created', 'ready', 'drop_lat', 'drop_lng')}
+        self.stats = {'latency': [], 'delay': [], 'pickup': [], 'food_wait': [], 'delivery': [], 'batch': []}
+        self.created = 0
+
+    def _scatter(self, count, sigma_km):
+        offsets = self.rng.normal(0, sigma_km / KM_PER_DEGREE, size=(2, count))
+        return CENTER[0] + offsets[0], CENTER[1] + offsets[1]
+
+    def _arrivals(self, now):
+        count = self.rng.poisson(self.rate * self.options['WINDOW_SECONDS'] / 60)
+        restaurant = self.rng.choice(len(self.popularity), size=count, p=self.popularity)
+        distance = self.rng.uniform(0.3, 4, size=count) / KM_PER_DEGREE
+        angle = self.rng.uniform(0, 2 * np.pi, size=count)
+        arrivals = {
+            'restaurant': restaurant.astype(np.float64),
+            'created': np.full(count, now),
+            'ready': now + self.rng.uniform(5, 20, size=count),
+            'drop_lat': self.restaurants[0][restaurant] + distance * np.sin(angle),
+            'drop_lng': self.restaurants[1][restaurant] + distance * np.cos(angle),
+        }
+        self.pending = {name: np.concatenate([self.pending[name], arrivals[name]]) for name in self.pending}
+        self.created += count
+
+    def step(self, now, map_fn, solve):
+        self._arrivals(now)
+        idle = np.flatnonzero(self.busy_until <= now)
+        restaurant = self.pending['restaurant'].astype(np.int64)
+        orders = {
+            'restaurant': restaurant,
+            'ready': self.pending['ready'] - now,
+            'pickup_lat': self.restaurants[0][restaurant],
+            'pickup_lng': self.restaurants[1][restaurant],
+            'drop_lat': self.pending['drop_lat'],
+            'drop_lng': self.pending['drop_lng'],
+        }
+        started = time.perf_counter()
+        plan = plan_window(orders, {'lat': self.rider_lat[idle], 'lng': self.rider_lng[idle]}, self.options,
+                           map_fn, solve)
+        self.stats['latency'].append(time.perf_counter() - started)
+
+        assigned = np.zeros(len(restaurant), dtype=bool)
+        for indices, rider_index, pickup in plan:
+            rider = idle[rider_index]
+            pickup_at = max(pickup, orders['ready'][indices].max())
+            visits, minutes = route_minutes(
+                orders['pickup_lat'][indices[0]], orders['pickup_lng'][indices[0]],
+                orders['drop_lat'][indices], orders['drop_lng'][indices], self.options,
+            )
+            for stop, elapsed in zip(visits, minutes):
+                order = indices[stop]
+                waited = now - self.pending['created'][order]
+                # Seconds between the batch coming due for assignment and getting a rider
+                due = max(self.pending['created'][indices].max(),
+                          self.pending['ready'][indices].max() - self.options['ASSIGN_LEAD_MINUTES'])
+                self.stats['delay'].append(max(0.0, now - due) * 60)
+                self.stats['food_wait'].append(max(0.0, pickup - orders['ready'][order]))
+                self.stats['delivery'].append(waited + pickup_at + elapsed)
+            self.stats['pickup'].append(pickup)
+            self.stats['batch'].append(len(indices))
+            last = indices[visits[-1]]
+            self.busy_until[rider] = now + pickup_at + minutes[-1]
+            self.rider_lat[rider], self.rider_lng[rider] = orders['drop_lat'][last], orders['drop_lng'][last]
+            assigned[indices] = True
+        self.pending = {name: values[~assigned] for name, values in self.pending.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate dispatch with synthetic riders and orders at the given '
+        'orders-per-minute rates and report per-window assignment latency and '
+        'assignment quality, for the optimal matcher and the greedy baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=int, action='append', dest='rates',
+                            help='Orders per minute (repeatable; default 1000 and 10000).')
+        parser.add_argument('--minutes', type=float, default=5, help='Simulated minutes per run.')
+        parser.add_argument('--riders-per-order', type=float, default=10,
+                            help='Fleet size as a multiple of the per-minute order rate; small enough '
+                                 'that riders are contended and the matchers differ.')
+        parser.add_argument('--busy-minutes', type=float, default=20,
+                            help='Riders start busy for up to this long, freeing up steadily.')
+        parser.add_argument('--restaurants', type=int, default=3000)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Matching processes (default DISPATCH["WORKERS"]; 0 solves inline).')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        dispatch = dispatch_options()
+        workers = dispatch['WORKERS'] if options['workers'] is None else options['workers']
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers else None
+        try:
+            results = []
+            for rate in options['rates'] or [1000, 10000]:
+                for name, solve in (('optimal', solve_zone), ('greedy', greedy_zone)):
+                    self.stdout.write(f'Simulating {rate} orders/min with the {name} matcher...')
+                    results.append((rate, name, self.simulate(rate, solve, pool, workers, dispatch, options)))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.report(results, dispatch)
+
+    def simulate(self, rate, solve, pool, workers, dispatch, options):
+        def map_fn(function, problems):
+            return map_in_pool(pool, workers, function, problems)
+
+        rng = np.random.default_rng(options['seed'])
+        simulation = Simulation(
+            rate, int(rate * options['riders_per_order']), options['restaurants'], dispatch, rng,
+            busy_minutes=options['busy_minutes'],
+        )
+        window = dispatch['WINDOW_SECONDS'] / 60
+        for step in range(int(options['minutes'] / window)):
+            simulation.step(step * window, map_fn, solve)
+        simulation.stats['backlog'] = len(simulation.pending['restaurant'])
+        simulation.stats['created'] = simulation.created
+        return simulation.stats
+
+    def report(self, results, dispatch):
+        header = (
+            f"{'rate/min':>9} {'matcher':<8}{'assigned':>9}{'backlog':>8}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}"
+            f"{'delay s':>8}{'pickup':>8}{'food wait':>10}{'delivery':>9}{'batch':>6}"
+        )
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for rate, name, stats in results:
+            latency = sorted(seconds * 1000 for seconds in stats['latency'])
+            self.stdout.write(
+                f"{rate:>9} {name:<8}{len(stats['delivery']):>9}{stats['backlog']:>8}"
+                f"{percentile(latency, 50):>8.1f}{percentile(latency, 95):>8.1f}{percentile(latency, 99):>8.1f}"
+                f"{statistics.mean(stats['delay'] or [0]):>8.1f}{statistics.mean(stats['pickup'] or [0]):>8.1f}"
+                f"{statistics.mean(stats['food_wait'] or [0]):>10.2f}{statistics.mean(stats['delivery'] or [0]):>9.1f}"
+                f"{statistics.mean(stats['batch'] or [0]):>6.2f}"
+            )
+        self.stdout.write('')
+        self.stdout.write(
+            f"Latency is per {dispatch['WINDOW_SECONDS']}s window. Delay is the seconds a batch "
+            'waited for a rider once due; other times are minutes (delivery from order placement).'
+        )
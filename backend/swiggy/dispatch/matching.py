@@ -0,0 +1,288 @@
+import numpy as np
+
+from restaurants.eta import EARTH_RADIUS_KM
+
+# Cost of a rider/bundle pair that must never be matched
+INFEASIBLE = 1e9
+
+
+def distance_matrix_km(lats_a, lngs_a, lats_b, lngs_b):
+    """
+    Great-circle distances between every point of ``a`` and every point of
+    ``b``, in kilometres.
+
+    Returns:
+        numpy.ndarray: Shape ``(len(a), len(b))``
+    """
+    lat1 = np.radians(np.asarray(lats_a, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lats_b, dtype=np.float64))[None, :]
+    lng1 = np.radians(np.asarray(lngs_a, dtype=np.float64))[:, None]
+    dlng = np.radians(np.asarray(lngs_b, dtype=np.float64))[None, :] - lng1
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def travel_minutes(km, options):
+    return km * options['ROUTE_FACTOR'] / options['RIDER_SPEED_KMH'] * 60
+
+
+def linear_assignment(cost):
+    """
+    Minimum-cost matching of rows to columns (each used at most once),
+    by shortest augmenting paths with dual potentials (Jonker-Volgenant).
+
+    Rows are added one at a time; each finds its cheapest augmenting path
+    with vectorized scans over the columns, so a problem with ``n`` rows
+    costs at most ``n**2`` numpy operations of ``m`` elements and usually
+    far fewer.
+
+    Args:
+        cost (numpy.ndarray): ``(n, m)`` matrix of finite costs
+
+    Returns:
+        tuple: ``(rows, columns)`` index arrays of the matched pairs; all
+        ``min(n, m)`` rows or columns are matched
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    u, v = np.zeros(n), np.zeros(m)
+    column_of = np.full(n, -1)
+    row_of = np.full(m, -1)
+
+    for current in range(n):
+        shortest = np.full(m, np.inf)
+        path = np.full(m, -1)
+        scanned_rows = np.zeros(n, dtype=bool)
+        scanned = np.zeros(m, dtype=bool)
+        row, sink, reached = current, -1, 0.0
+        while sink < 0:
+            scanned_rows[row] = True
+            reduced = reached + cost[row] - u[row] - v
+            better = ~scanned & (reduced < shortest)
+            path[better] = row
+            shortest[better] = reduced[better]
+            column = int(np.argmin(np.where(scanned, np.inf, shortest)))
+            reached = shortest[column]
+            scanned[column] = True
+            if row_of[column] < 0:
+                sink = column
+            else:
+                row = row_of[column]
+
+        u[current] += reached
+        others = scanned_rows.copy()
+        others[current] = False
+        u[others] += reached - shortest[column_of[others]]
+        v[scanned] -= reached - shortest[scanned]
+
+        column = sink
+        while True:
+            row = path[column]
+            row_of[column] = row
+            column_of[row], column = column, column_of[row]
+            if row == current:
+                break
+
+    rows = np.arange(n)
+    if transposed:
+        return column_of, rows
+    return rows, column_of
+
+
+def make_batches(orders, options):
+    """
+    Group orders a single rider can carry together: same restaurant, ready
+    within ``BATCH_READY_SLACK_MINUTES`` of the first order of the batch,
+    and dropping off within ``BATCH_MAX_SPREAD_KM`` of its dropoff.
+
+    Args:
+        orders (dict): Parallel arrays ``restaurant``, ``ready`` (minutes
+            from now), ``drop_lat`` and ``drop_lng``
+
+    Returns:
+        list: Index arrays into ``orders``, one per batch
+    """
+    order = np.lexsort((orders['ready'], orders['restaurant']))
+    restaurants = orders['restaurant'][order]
+    boundaries = np.flatnonzero(np.diff(restaurants)) + 1
+    batches = []
+    for group in np.split(order, boundaries):
+        if len(group) == 1:
+            batches.append(group)
+            continue
+        spread = distance_matrix_km(orders['drop_lat'][group], orders['drop_lng'][group],
+                                    orders['drop_lat'][group], orders['drop_lng'][group])
+        ready = orders['ready'][group]
+        open_batches = []
+        for position in range(len(group)):
+            for members in open_batches:
+                seed = members[0]
+                if (len(members) < options['MAX_BATCH_SIZE']
+                        and ready[position] - ready[seed] <= options['BATCH_READY_SLACK_MINUTES']
+                        and spread[seed, position] <= options['BATCH_MAX_SPREAD_KM']):
+                    members.append(position)
+                    break
+            else:
+                open_batches.append([position])
+        batches.extend(group[members] for members in open_batches)
+    return batches
+
+
+def route_minutes(pickup_lat, pickup_lng, drop_lats, drop_lngs, options):
+    """
+    Minutes from pickup to each dropoff along a nearest-neighbour route.
+
+    Returns:
+        tuple: ``(visit order, minutes at each stop in that order)``
+    """
+    remaining = list(range(len(drop_lats)))
+    lat, lng = pickup_lat, pickup_lng
+    visits, minutes, elapsed = [], [], 0.0
+    while remaining:
+        km = distance_matrix_km([lat], [lng], [drop_lats[i] for i in remaining], [drop_lngs[i] for i in remaining])[0]
+        nearest = int(np.argmin(km))
+        elapsed += travel_minutes(km[nearest], options)
+        stop = remaining.pop(nearest)
+        visits.append(stop)
+        minutes.append(elapsed)
+        lat, lng = drop_lats[stop], drop_lngs[stop]
+    return visits, minutes
+
+
+def pair_costs(bundles, riders, options):
+    """
+    Cost of sending each rider to each bundle's pickup: travel time, plus
+    weighted minutes food waits for a late rider or an early rider waits
+    for food. Pairs farther apart than ``MAX_PICKUP_KM`` are infeasible.
+
+    Returns:
+        tuple: ``(cost, pickup travel minutes)`` matrices, bundles x riders
+    """
+    km = distance_matrix_km(bundles['lat'], bundles['lng'], riders['lat'], riders['lng'])
+    arrival = travel_minutes(km, options)
+    lateness = arrival - bundles['ready'][:, None]
+    cost = (
+        arrival
+        + options['FOOD_WAIT_WEIGHT'] * np.maximum(lateness, 0)
+        + options['RIDER_WAIT_WEIGHT'] * np.maximum(-lateness, 0)
+    )
+    cost[km > options['MAX_PICKUP_KM']] = INFEASIBLE
+    return cost, arrival
+
+
+def solve_zone(problem):
+    """
+    Match the bundles of one zone to its riders. Runs in the dispatch
+    process pool, so it takes and returns plain arrays only.
+
+    Returns:
+        tuple: ``(bundle indices, rider indices, pickup minutes)`` of the
+        feasible pairs, as indices into the problem's arrays
+    """
+    bundles, riders, options = problem
+    if not len(bundles['lat']) or not len(riders['lat']):
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([])
+    cost, arrival = pair_costs(bundles, riders, options)
+    rows, columns = linear_assignment(cost)
+    feasible = cost[rows, columns] < INFEASIBLE
+    rows, columns = rows[feasible], columns[feasible]
+    return rows, columns, arrival[rows, columns]
+
+
+def greedy_zone(problem):
+    """
+    ``solve_zone`` with greedy matching (cheapest remaining pair first),
+    the usual nearest-rider baseline the simulator compares against.
+    """
+    bundles, riders, options = problem
+    empty = np.array([], dtype=np.int64)
+    if not len(bundles['lat']) or not len(riders['lat']):
+        return empty, empty, np.array([])
+    cost, arrival = pair_costs(bundles, riders, options)
+    rows, columns = np.unravel_index(np.argsort(cost, axis=None, kind='stable'), cost.shape)
+    used_rows, used_columns, pairs = set(), set(), []
+    for row, column in zip(rows.tolist(), columns.tolist()):
+        if cost[row, column] >= INFEASIBLE or len(pairs) == min(cost.shape):
+            break
+        if row not in used_rows and column not in used_columns:
+            used_rows.add(row)
+            used_columns.add(column)
+            pairs.append((row, column))
+    rows = np.array([pair[0] for pair in pairs], dtype=np.int64)
+    columns = np.array([pair[1] for pair in pairs], dtype=np.int64)
+    return rows, columns, arrival[rows, columns]
+
+
+def zone_keys(lats, lngs, size):
+    return list(zip(np.floor(np.asarray(lats) / size).astype(np.int64).tolist(),
+                    np.floor(np.asarray(lngs) / size).astype(np.int64).tolist()))
+
+
+def _subset(columns, indices):
+    return {name: values[indices] for name, values in columns.items()}
+
+
+def plan_window(orders, riders, options, map_fn=map, solve=solve_zone):
+    """
+    Batch one window of pending orders and assign the batches to riders.
+
+    Batches and riders are partitioned into square zones of
+    ``ZONE_DEGREES`` by location and each zone is solved independently
+    with ``solve`` (``map_fn`` may be a process pool's ``map``). Batches
+    left unmatched near zone edges are then matched once more against
+    every rider still idle within reach.
+
+    Args:
+        orders (dict): Parallel arrays ``restaurant``, ``ready``,
+            ``pickup_lat``, ``pickup_lng``, ``drop_lat``, ``drop_lng``
+        riders (dict): Parallel arrays ``lat`` and ``lng``
+
+    Returns:
+        list: ``(order indices, rider index, pickup minutes)`` per assigned batch
+    """
+    # Batches ready later than the lead time wait (and may still grow)
+    batches = [
+        batch for batch in make_batches(orders, options)
+        if orders['ready'][batch].max() <= options['ASSIGN_LEAD_MINUTES']
+    ]
+    if not batches or not len(riders['lat']):
+        return []
+    first = np.array([batch[0] for batch in batches])
+    bundles = {
+        'lat': orders['pickup_lat'][first],
+        'lng': orders['pickup_lng'][first],
+        'ready': np.array([orders['ready'][batch].max() for batch in batches]),
+    }
+
+    zones = {}
+    for index, key in enumerate(zone_keys(bundles['lat'], bundles['lng'], options['ZONE_DEGREES'])):
+        zones.setdefault(key, ([], []))[0].append(index)
+    for index, key in enumerate(zone_keys(riders['lat'], riders['lng'], options['ZONE_DEGREES'])):
+        if key in zones:
+            zones[key][1].append(index)
+    members = [(np.array(b), np.array(r, dtype=np.int64)) for b, r in zones.values()]
+    problems = [(_subset(bundles, b), _subset(riders, r), options) for b, r in members]
+
+    assignments = []
+    matched_bundles, matched_riders = set(), set()
+    for (bundle_ids, rider_ids), (rows, columns, pickup) in zip(members, map_fn(solve, problems)):
+        for row, column, minutes in zip(rows.tolist(), columns.tolist(), pickup.tolist()):
+            matched_bundles.add(int(bundle_ids[row]))
+            matched_riders.add(int(rider_ids[column]))
+            assignments.append((batches[bundle_ids[row]], int(rider_ids[column]), minutes))
+
+    leftover = np.array([i for i in range(len(batches)) if i not in matched_bundles], dtype=np.int64)
+    idle = np.array([i for i in range(len(riders['lat'])) if i not in matched_riders], dtype=np.int64)
+    if len(leftover) and len(idle):
+        km = distance_matrix_km(bundles['lat'][leftover], bundles['lng'][leftover],
+                                riders['lat'][idle], riders['lng'][idle])
+        idle = idle[(km <= options['MAX_PICKUP_KM']).any(axis=0)]
+        rows, columns, pickup = solve((_subset(bundles, leftover), _subset(riders, idle), options))
+        for row, column, minutes in zip(rows.tolist(), columns.tolist(), pickup.tolist()):
+            assignments.append((batches[leftover[row]], int(idle[column]), minutes))
+    return assignments
+
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('user_auth', '0011_user_search_trigram_indexes'),
+        ('restaurants', '0004_opening_hours'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rider',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('is_available', models.BooleanField(default=False)),
+                ('location_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rider', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DeliveryTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(unique=True)),
+                ('pickup_latitude', models.FloatField()),
+                ('pickup_longitude', models.FloatField()),
+                ('dropoff_latitude', models.FloatField()),
+                ('dropoff_longitude', models.FloatField()),
+                ('ready_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('picked_up', 'Picked up'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('batch', models.CharField(blank=True, max_length=32)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('assigned_at', models.DateTimeField(blank=True, null=True)),
+                ('address', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='user_auth.address')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_tasks', to='restaurants.restaurant')),
+                ('rider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='dispatch.rider')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='rider',
+            index=models.Index(fields=['is_available', 'location_updated_at'], name='rider_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverytask',
+            index=models.Index(fields=['status', 'created_at'], name='delivery_task_status_idx'),
+        ),
+    ]
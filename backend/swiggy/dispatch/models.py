@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import models
+
+
+class Rider(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, related_name='rider', on_delete=models.CASCADE)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Off while on a delivery or off shift; only the dispatcher sets it off
+    # for deliveries, with a conditional update
+    is_available = models.BooleanField(default=False)
+    location_updated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_available', 'location_updated_at'], name='rider_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"Rider {self.user_id}"
+
+
+class DeliveryTask(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('assigned', 'Assigned'),
+        ('picked_up', 'Picked up'),
+        ('delivered', 'Delivered'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    # One per order to deliver; coordinates are copied at creation so
+    # dispatch never joins the catalog or address book
+    order_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='delivery_tasks', on_delete=models.CASCADE)
+    address = models.ForeignKey('user_auth.Address', null=True, on_delete=models.SET_NULL)
+    restaurant = models.ForeignKey('restaurants.Restaurant', related_name='delivery_tasks', on_delete=models.CASCADE)
+    pickup_latitude = models.FloatField()
+    pickup_longitude = models.FloatField()
+    dropoff_latitude = models.FloatField()
+    dropoff_longitude = models.FloatField()
+    ready_at = models.DateTimeField()  # When the food is expected to be ready for pickup
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rider = models.ForeignKey(Rider, null=True, blank=True, related_name='tasks', on_delete=models.SET_NULL)
+    batch = models.CharField(max_length=32, blank=True)  # Tasks carried together share a batch
+    created_at = models.DateTimeField(auto_now_add=True)
+    assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='delivery_task_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id} ({self.status})"
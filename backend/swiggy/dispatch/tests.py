@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from restaurants.models import Restaurant
+from user_auth import tokens
+from user_auth.models import Address, User
+
+from .models import DeliveryTask
+
+TASKS_URL = '/api/dispatch/tasks/'
+
+
+class DeliveryTaskCreateTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user('orders@example.com', 'secret-pass', phone='9000000020', role='admin')
+        self.customer = User.objects.create_user('eater@example.com', 'secret-pass', phone='9000000021')
+        self.address = Address.objects.create(user=self.customer, latitude=12.97, longitude=77.59)
+        self.restaurant = Restaurant.objects.create(pk=501, name='Dosa Point', latitude=12.93, longitude=77.62)
+        token = tokens.ServiceRefreshToken.for_user(admin).access_token
+        tokens.get_writer().flush()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def order(self, **fields):
+        body = {'order_id': 9001, 'user_id': self.customer.pk, 'address_id': self.address.pk,
+                'restaurant_id': self.restaurant.pk, **fields}
+        return self.client.post(TASKS_URL, body, content_type='application/json', **self.auth)
+
+    def test_queues_a_pending_task(self):
+        response = self.order()
+        self.assertEqual(response.status_code, 201)
+        task = DeliveryTask.objects.get(order_id=9001)
+        self.assertEqual((task.status, task.pickup_latitude, task.dropoff_latitude), ('pending', 12.93, 12.97))
+
+        self.assertEqual(self.order().status_code, 409)
+        self.assertEqual(DeliveryTask.objects.count(), 1)
+
+    def test_rejects_bad_ids_and_foreign_addresses(self):
+        for order_id in ('abc', 0, 2 ** 63):
+            with self.subTest(order_id=order_id):
+                self.assertEqual(self.order(order_id=order_id).status_code, 400)
+        other = User.objects.create_user('other@example.com', 'secret-pass', phone='9000000022')
+        self.assertEqual(self.order(user_id=other.pk).status_code, 404)
+
+    def test_requires_coordinates(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(latitude=None)
+        self.assertEqual(self.order().status_code, 409)
+
+    def test_admins_only(self):
+        response = self.client.post(TASKS_URL, {}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('tasks/', views.DeliveryTaskCreateView.as_view(), name='delivery_task_create'),
+    path('rider/location/', views.RiderLocationView.as_view(), name='rider_location'),
+    path('rider/tasks/', views.RiderTasksView.as_view(), name='rider_tasks'),
+    path('rider/tasks/<int:pk>/status/', views.RiderTaskStatusView.as_view(), name='rider_task_status'),
+]
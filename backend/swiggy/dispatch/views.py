@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from realtime.events import publish_order_status
+from restaurants.models import Restaurant
+from user_auth.models import Address
+from user_auth.views import IsAdmin
+
+from .dispatcher import create_task
+from .models import DeliveryTask, Rider
+
+# Largest value a bigint primary key or order id can hold
+MAX_ID = 2 ** 63 - 1
+
+# Status a rider may move an assigned task to, from the statuses allowed before it
+RIDER_TRANSITIONS = {'picked_up': ('assigned',), 'delivered': ('assigned', 'picked_up')}
+
+
+def parse_id(value):
+    """An id from the request body; ValueError unless it is in 1..MAX_ID."""
+    value = int(value)
+    if not 1 <= value <= MAX_ID:
+        raise ValueError(value)
+    return value
+
+
+class IsRider(permissions.BasePermission):
+    message = 'Only riders can use this endpoint.'
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and Rider.objects.filter(user=request.user).exists()
+
+
+# Orders handed over for delivery, by the order service with an admin
+# token; the dispatcher picks them up in its next window
+class DeliveryTaskCreateView(APIView):
+    permission_classes = [IsAdmin]
+    # The insert runs in a savepoint, so a duplicate order rolls back cleanly
+    query_budget = 7
+
+    def post(self, request):
+        try:
+            order_id = parse_id(request.data['order_id'])
+            address = Address.objects.select_related('user').get(
+                pk=parse_id(request.data['address_id']), user_id=parse_id(request.data['user_id']),
+            )
+            restaurant = Restaurant.objects.get(pk=parse_id(request.data['restaurant_id']))
+        except (KeyError, TypeError, ValueError):
+            return Response({'detail': 'order_id, user_id, address_id and restaurant_id are required integers.'},
+                            status=400)
+        except (Address.DoesNotExist, Restaurant.DoesNotExist):
+            return Response({'detail': 'Address or restaurant not found.'}, status=404)
+
+        if request.data.get('ready_at'):
+            ready_at = parse_datetime(str(request.data['ready_at']))
+            if ready_at is None or timezone.is_naive(ready_at):
+                return Response({'detail': 'ready_at must be an ISO 8601 time with an offset.'}, status=400)
+        else:
+            ready_at = timezone.now() + timedelta(minutes=restaurant.prep_time)
+
+        try:
+            with transaction.atomic():
+                task = create_task(order_id, address.user, address, restaurant, ready_at)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=409)
+        except IntegrityError:
+            return Response({'detail': 'Order is already queued for dispatch.'}, status=409)
+        return Response({'id': task.pk, 'order_id': order_id, 'status': task.status}, status=201)
+
+
+# Location pings and going on/off shift; the dispatcher only matches riders
+# that reported a location within RIDER_STALE_SECONDS
+class RiderLocationView(APIView):
+    permission_classes = [IsRider]
+    query_budget = 4
+
+    def post(self, request):
+        try:
+            latitude, longitude = float(request.data['latitude']), float(request.data['longitude'])
+        except (KeyError, TypeError, ValueError):
+            return Response({'detail': 'latitude and longitude are required numbers.'}, status=400)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({'detail': 'latitude or longitude out of range.'}, status=400)
+
+        changes = {'latitude': latitude, 'longitude': longitude, 'location_updated_at': timezone.now()}
+        if 'is_available' in request.data:
+            # Going available is refused while deliveries are still open
+            available = request.data['is_available'] in (True, 'true', '1')
+            busy = DeliveryTask.objects.filter(rider__user=request.user, status__in=('assigned', 'picked_up'))
+            if available and busy.exists():
+                return Response({'detail': 'Finish your current deliveries first.'}, status=409)
+            changes['is_available'] = available
+        Rider.objects.filter(user=request.user).update(**changes)
+        return Response(status=204)
+
+
+# The rider's open deliveries, grouped by batch
+class RiderTasksView(APIView):
+    permission_classes = [IsRider]
+    query_budget = 3
+
+    def get(self, request):
+        tasks = DeliveryTask.objects.filter(
+            rider__user=request.user, status__in=('assigned', 'picked_up'),
+        ).order_by('assigned_at', 'id').values(
+            'id', 'order_id', 'batch', 'status', 'pickup_latitude', 'pickup_longitude',
+            'dropoff_latitude', 'dropoff_longitude', 'ready_at',
+        )
+        return Response({'results': list(tasks)})
+
+
+# Pickup and delivery confirmations; the rider is free again once the
+# whole batch is delivered
+class RiderTaskStatusView(APIView):
+    permission_classes = [IsRider]
+    query_budget = 7
+
+    def post(self, request, pk):
+        status = request.data.get('status')
+        if status not in RIDER_TRANSITIONS:
+            return Response({'detail': f"status must be one of: {', '.join(RIDER_TRANSITIONS)}."}, status=400)
+        try:
+            task = DeliveryTask.objects.get(pk=pk, rider__user=request.user)
+        except DeliveryTask.DoesNotExist:
+            return Response({'detail': 'Task not found.'}, status=404)
+
+        with transaction.atomic():
+            allowed = DeliveryTask.objects.filter(pk=task.pk, status__in=RIDER_TRANSITIONS[status])
+            if not allowed.update(status=status):
+                return Response({'detail': f'Task is {task.status}.'}, status=409)
+            if status == 'delivered' and not DeliveryTask.objects.filter(
+                rider_id=task.rider_id, status__in=('assigned', 'picked_up'),
+            ).exists():
+                Rider.objects.filter(pk=task.rider_id).update(is_available=True)
+            transaction.on_commit(lambda: publish_order_status(task.user_id, task.order_id, status))
+        return Response({'id': task.pk, 'status': status})
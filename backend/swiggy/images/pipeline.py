@@ -0,0 +1,143 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 16
+
+# Sent with ``sender=model`` and ``pk`` once new variants are stored
+variants_ready = Signal()
+
+
+def content_hash(file_obj):
+    """Return a short sha256 digest of a file's bytes, leaving it rewound."""
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(64 * 1024), b''):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+@deconstructible
+class HashedUploadTo:
+    """
+    ``upload_to`` callable naming uploads after their content hash.
+
+    Identical uploads map to the same name, and a name never changes its
+    content, so served files can be cached forever.
+    """
+
+    def __init__(self, prefix, field_name):
+        self.prefix = prefix
+        self.field_name = field_name
+
+    def __call__(self, instance, filename):
+        ext = os.path.splitext(filename)[1].lower()
+        digest = content_hash(getattr(instance, self.field_name).file)
+        return f'{self.prefix}/{digest}{ext}'
+
+    def __eq__(self, other):
+        return isinstance(other, HashedUploadTo) and (self.prefix, self.field_name) == (other.prefix, other.field_name)
+
+
+def render_variants(source_name, storage):
+    """
+    Resize a stored image into every configured width, encoded as WebP.
+
+    Widths larger than the original are skipped rather than upscaled.
+
+    Returns:
+        dict: ``{'source': source_name, 'widths': {width: stored_name}}``
+    """
+    # Pillow is only needed by the worker threads, not at startup
+    from PIL import Image, ImageOps
+
+    options = settings.IMAGE_PIPELINE
+    with storage.open(source_name, 'rb') as fh:
+        image = ImageOps.exif_transpose(Image.open(fh))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    base = os.path.splitext(source_name)[0]
+    variants = {}
+    for width in sorted(options['WIDTHS']):
+        if width > image.width and variants:
+            break
+        resized = image.copy()
+        resized.thumbnail((width, max(1, image.height * width // image.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, 'WEBP', quality=options['QUALITY'], method=4)
+        name = f'{base}_w{width}.webp'
+        if not storage.exists(name):
+            storage.save(name, ContentFile(buffer.getvalue()))
+        variants[str(width)] = name
+    return {'source': source_name, 'widths': variants}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE['WORKERS'],
+                    thread_name_prefix='image-pipeline',
+                )
+    return _executor
+
+
+def process_field(model_label, pk, field_name, variants_field):
+    """Render variants for one row and store them, unless the image changed meanwhile."""
+    model = apps.get_model(model_label)
+    try:
+        row = model.objects.filter(pk=pk).values(field_name).first()
+        if not row or not row[field_name]:
+            return
+        source_name = row[field_name]
+        storage = model._meta.get_field(field_name).storage
+        variants = render_variants(source_name, storage)
+        if model.objects.filter(pk=pk, **{field_name: source_name}).update(**{variants_field: variants}):
+            variants_ready.send(sender=model, pk=pk)
+    except Exception:
+        logger.exception('Image processing failed for %s pk=%s', model_label, pk)
+    finally:
+        # Worker threads are not request-scoped, so nothing else closes this
+        connection.close()
+
+
+def register(model, field_name, variants_field):
+    """
+    Generate resized variants in the background whenever ``field_name`` of
+    ``model`` gets a new image. Variants are stored on ``variants_field``
+    (a JSONField) once ready; the saving request does not wait for them.
+    """
+    model_label = model._meta.label
+
+    def on_save(sender, instance, **kwargs):
+        image = getattr(instance, field_name)
+        variants = getattr(instance, variants_field) or {}
+        if not image or variants.get('source') == image.name:
+            return
+        transaction.on_commit(
+            lambda: get_executor().submit(process_field, model_label, instance.pk, field_name, variants_field)
+        )
+
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'images:{model_label}.{field_name}')
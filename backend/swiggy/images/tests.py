@@ -0,0 +1,151 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+from user_auth.models import User
+
+from . import pipeline
+
+CONTENT = b'0123456789'
+HASHED_NAME = 'profile_pics/0123456789abcdef.png'
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ServeMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.media_root, 'profile_pics'))
+        self.path = os.path.join(self.media_root, HASHED_NAME)
+        with open(self.path, 'wb') as fh:
+            fh.write(CONTENT)
+
+    def get(self, path=HASHED_NAME, **headers):
+        return self.client.get(f'/media/{path}', **headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_ranges(self):
+        for header, content_range, body in (
+            ('bytes=2-5', 'bytes 2-5/10', b'2345'),
+            ('bytes=7-', 'bytes 7-9/10', b'789'),
+            ('bytes=-3', 'bytes 7-9/10', b'789'),
+            ('bytes=8-100', 'bytes 8-9/10', b'89'),
+        ):
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(body)))
+                self.assertEqual(self.body(response), body)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=10-', 'bytes=20-30', 'bytes=5-2'):
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_malformed_range_serves_the_whole_file(self):
+        for header in ('bytes=a-b', 'bytes=-', 'bytes=0-1,4-5', 'items=0-1'):
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), CONTENT)
+
+    def test_stale_if_range_serves_the_whole_file(self):
+        response = self.get(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        first = self.get()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        mtime = os.stat(self.path).st_mtime
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(mtime - 3600)).status_code, 200)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first['ETag']).get('Cache-Control'), first['Cache-Control'])
+
+    def test_mutable_names_get_a_short_lifetime(self):
+        with open(os.path.join(self.media_root, 'logo.png'), 'wb') as fh:
+            fh.write(CONTENT)
+        self.assertNotIn('immutable', self.get('logo.png')['Cache-Control'])
+
+    def test_rejects_paths_outside_media_root(self):
+        with open(os.path.join(os.path.dirname(self.media_root), 'secret.txt'), 'wb') as fh:
+            fh.write(b'secret')
+        self.addCleanup(os.remove, fh.name)
+        for path in ('../secret.txt', 'profile_pics/../../secret.txt', '%2e%2e/secret.txt', '/etc/passwd'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+        self.assertEqual(self.get('profile_pics').status_code, 404)
+        self.assertEqual(self.get('missing.png').status_code, 404)
+
+    def test_safe_methods_only(self):
+        self.assertEqual(self.client.head(f'/media/{HASHED_NAME}').status_code, 200)
+        self.assertEqual(self.client.post(f'/media/{HASHED_NAME}').status_code, 405)
+
+
+def png(width=800, height=400):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class VariantPipelineTests(MediaTestCase):
+    def test_upload_queues_variant_generation(self):
+        user = User.objects.create_user('pics@example.com', 'secret-pass', phone='9000000090')
+        executor = mock.Mock()
+        with mock.patch.object(pipeline, 'get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                user.profile_picture = SimpleUploadedFile('me.png', png(), content_type='image/png')
+                user.save()
+        executor.submit.assert_called_once_with(
+            pipeline.process_field, 'user_auth.User', user.pk, 'profile_picture', 'profile_picture_variants',
+        )
+        # Stored under its content hash
+        self.assertRegex(user.profile_picture.name, r'^profile_pics/[0-9a-f]{16}\.png$')
+
+        # Saving again with variants for this image queues nothing
+        executor.reset_mock()
+        with mock.patch.object(pipeline, 'get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                user.profile_picture_variants = {'source': user.profile_picture.name, 'widths': {}}
+                user.save()
+        executor.submit.assert_not_called()
+
+    def test_renders_each_width_without_upscaling(self):
+        storage = FileSystemStorage(location=self.media_root)
+        name = storage.save('profile_pics/0123456789abcdef.png', io.BytesIO(png(width=400, height=200)))
+        variants = pipeline.render_variants(name, storage)
+        self.assertEqual(variants['source'], name)
+        self.assertEqual(variants['widths'], {
+            '160': 'profile_pics/0123456789abcdef_w160.webp',
+            '320': 'profile_pics/0123456789abcdef_w320.webp',
+        })
+        for stored in variants['widths'].values():
+            self.assertTrue(storage.exists(stored))
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<path:path>', views.serve_media, name='serve_media'),
+]
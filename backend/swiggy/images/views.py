@@ -0,0 +1,119 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+HASHED_NAME_RE = re.compile(r'/[0-9a-f]{16}(_w\d+)?\.[a-z0-9]+$')
+
+
+def cache_control_for(path):
+    # Content-hashed names never change content, so they can be cached forever
+    if HASHED_NAME_RE.search('/' + path):
+        return f'public, max-age={settings.IMAGE_PIPELINE["IMMUTABLE_MAX_AGE"]}, immutable'
+    return f'public, max-age={settings.IMAGE_PIPELINE["MUTABLE_MAX_AGE"]}'
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``bytes=`` range.
+
+    Returns:
+        tuple: (start, end) inclusive, or None when the header should be
+        ignored. Raises ValueError for an unsatisfiable range.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def iter_file(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Stream a file from MEDIA_ROOT with conditional and range request support.
+
+    Unlike ``django.views.static.serve`` this is meant for production use:
+    it answers ``If-Modified-Since``/``If-None-Match`` with 304, honours
+    single ``Range`` requests with 206 and sets long cache lifetimes on
+    content-hashed names.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404('Not found.')
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Not found.')
+    if not os.path.isfile(fullpath):
+        raise Http404('Not found.')
+
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    headers = {
+        'Last-Modified': http_date(stat.st_mtime),
+        'ETag': etag,
+        'Cache-Control': cache_control_for(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if (if_none_match and etag in if_none_match) or (
+        not if_none_match
+        and not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime)
+    ):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(iter_file(fullpath, start, length), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+
+    response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    for name, value in headers.items():
+        response[name] = value
+    return response
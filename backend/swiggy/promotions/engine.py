@@ -0,0 +1,318 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.caching import get_tiered_cache
+from restaurants.models import MenuItem
+
+from .models import Promotion, PromotionUsage
+
+PROMOTIONS_NAMESPACE = 'promotions'
+
+DEFINITION_FIELDS = (
+    'id', 'code', 'description', 'discount_type', 'discount_value', 'max_discount', 'min_cart_value',
+    'cuisines', 'first_order_only', 'per_user_limit', 'total_limit', 'starts_at', 'ends_at',
+)
+
+
+class PromotionUnavailable(Exception):
+    """The promotion cannot be redeemed (any more) by this user."""
+
+
+@dataclass(frozen=True)
+class Cart:
+    """Everything the rules look at, priced once per request."""
+    restaurant_id: int
+    cuisines: frozenset
+    subtotal: int  # Paise
+    now: datetime
+    first_order: bool = True
+    usage: dict = field(default_factory=dict)  # Promotion id -> redemptions by this user
+
+
+@dataclass(frozen=True)
+class CompiledPromotion:
+    id: int
+    code: str
+    description: str
+    per_user_limit: Optional[int]
+    total_limit: Optional[int]
+    applies: Callable
+    discount: Callable
+
+
+def normalize_cuisine(name):
+    return name.strip().lower()
+
+
+def _all_of(checks):
+    """One predicate short-circuiting through ``checks`` in order."""
+    if not checks:
+        return lambda cart: True
+    first, rest = checks[0], _all_of(checks[1:]) if len(checks) > 1 else None
+    if rest is None:
+        return first
+    return lambda cart: first(cart) and rest(cart)
+
+
+def compile_promotion(definition):
+    """
+    Turn a promotion definition (a dict of ``Promotion`` fields plus a
+    ``restaurants`` list of ids) into closures.
+
+    Only the rules a promotion actually sets become checks, cheapest and
+    most selective first, so evaluation does no work for unused rules. The
+    restaurant scope is not checked here: it is what the index is keyed
+    on. Cuisines are checked only for promotions scoped to restaurants as
+    well, since otherwise they are also an index key.
+
+    Returns:
+        CompiledPromotion
+    """
+    promotion_id = definition['id']
+    checks = []
+
+    minimum = definition['min_cart_value']
+    if minimum:
+        checks.append(lambda cart: cart.subtotal >= minimum)
+
+    starts_at, ends_at = definition['starts_at'], definition['ends_at']
+    if starts_at is not None:
+        checks.append(lambda cart: cart.now >= starts_at)
+    if ends_at is not None:
+        checks.append(lambda cart: cart.now < ends_at)
+
+    cuisines = frozenset(normalize_cuisine(c) for c in definition['cuisines'])
+    if cuisines and definition['restaurants']:
+        checks.append(lambda cart: not cuisines.isdisjoint(cart.cuisines))
+
+    if definition['first_order_only']:
+        checks.append(lambda cart: cart.first_order)
+
+    limit = definition['per_user_limit']
+    if limit is not None:
+        checks.append(lambda cart: cart.usage.get(promotion_id, 0) < limit)
+
+    # Capped at the subtotal, like flat discounts
+    value, cap = definition['discount_value'], definition['max_discount']
+    if definition['discount_type'] == 'percent':
+        if cap is None:
+            def discount(subtotal):
+                return min(subtotal * value // 100, subtotal)
+        else:
+            def discount(subtotal):
+                return min(subtotal * value // 100, cap, subtotal)
+    else:
+        def discount(subtotal):
+            return min(value, subtotal)
+
+    return CompiledPromotion(
+        id=promotion_id,
+        code=definition['code'],
+        description=definition['description'],
+        per_user_limit=limit,
+        total_limit=definition['total_limit'],
+        applies=_all_of(checks),
+        discount=discount,
+    )
+
+
+class PromotionIndex:
+    """
+    Compiled promotions bucketed by what they are scoped to: restaurant
+    ids, cuisines (for promotions not tied to restaurants), or nothing.
+    A cart only looks at the buckets of its restaurant and cuisines.
+    """
+
+    def __init__(self, definitions):
+        self.by_restaurant = {}
+        self.by_cuisine = {}
+        self.universal = []
+        self.by_code = {}
+        for definition in definitions:
+            promotion = compile_promotion(definition)
+            self.by_code[promotion.code] = promotion
+            if definition['restaurants']:
+                for restaurant_id in definition['restaurants']:
+                    self.by_restaurant.setdefault(restaurant_id, []).append(promotion)
+            elif definition['cuisines']:
+                for cuisine in {normalize_cuisine(c) for c in definition['cuisines']}:
+                    self.by_cuisine.setdefault(cuisine, []).append(promotion)
+            else:
+                self.universal.append(promotion)
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def candidates(self, cart):
+        yield from self.by_restaurant.get(cart.restaurant_id, ())
+        yield from self.universal
+        if len(cart.cuisines) == 1:
+            yield from self.by_cuisine.get(next(iter(cart.cuisines)), ())
+            return
+        # A promotion listing several of the cart's cuisines sits in several buckets
+        seen = set()
+        for cuisine in cart.cuisines:
+            for promotion in self.by_cuisine.get(cuisine, ()):
+                if promotion.id not in seen:
+                    seen.add(promotion.id)
+                    yield promotion
+
+    def evaluate(self, cart):
+        """
+        Every promotion applicable to ``cart`` in one pass over its
+        candidates.
+
+        Returns:
+            list: ``(promotion, discount)`` pairs, largest discount first
+        """
+        offers = [
+            (promotion, promotion.discount(cart.subtotal))
+            for promotion in self.candidates(cart) if promotion.applies(cart)
+        ]
+        offers.sort(key=lambda offer: (-offer[1], offer[0].code))
+        return offers
+
+    def applies(self, code, cart):
+        """The compiled promotion for ``code`` if it applies to ``cart``."""
+        promotion = self.by_code.get(code)
+        if promotion is None or not any(candidate is promotion for candidate in self.candidates(cart)):
+            return None
+        return promotion if promotion.applies(cart) else None
+
+
+def load_definitions(now=None):
+    """Active, not yet ended and not exhausted promotions as definitions."""
+    now = now or timezone.now()
+    rows = list(
+        Promotion.objects.filter(is_active=True)
+        .filter(Q(ends_at__isnull=True) | Q(ends_at__gt=now))
+        .filter(Q(total_limit__isnull=True) | Q(redeemed_count__lt=F('total_limit')))
+        .values(*DEFINITION_FIELDS)
+    )
+    scopes = {}
+    through = Promotion.restaurants.through.objects.filter(promotion__is_active=True)
+    for promotion_id, restaurant_id in through.values_list('promotion_id', 'restaurant_id').iterator(chunk_size=5000):
+        scopes.setdefault(promotion_id, []).append(restaurant_id)
+    for row in rows:
+        row['restaurants'] = scopes.get(row['id'], [])
+    return rows
+
+
+class PromotionBook:
+    """
+    The compiled index, built once per process and rebuilt when the shared
+    promotions version changes (checked through the tiered cache, so at
+    most every few seconds).
+    """
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        version = get_tiered_cache().namespace_version(PROMOTIONS_NAMESPACE)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._index = PromotionIndex(load_definitions())
+                    self._version = version
+        return self._index
+
+
+_book = None
+_book_lock = threading.Lock()
+
+
+def get_promotion_book():
+    global _book
+    if _book is None:
+        with _book_lock:
+            if _book is None:
+                _book = PromotionBook()
+    return _book
+
+
+def bump_promotions_version():
+    get_tiered_cache().bump_namespace(PROMOTIONS_NAMESPACE)
+
+
+def user_usage(user):
+    """
+    Redemptions per promotion for ``user``, and whether this is their first
+    order. Orders are not stored yet, so a first order is one placed before
+    any promotion was redeemed.
+    """
+    usage = dict(PromotionUsage.objects.filter(user=user, count__gt=0).values_list('promotion_id', 'count'))
+    return usage, not usage
+
+
+def build_cart(user, restaurant_id, quantities):
+    """
+    Price a cart from the catalog in one query and attach the user's
+    redemption history.
+
+    Args:
+        quantities (dict): Menu item id -> quantity
+
+    Raises:
+        ValueError: An item does not exist or belongs to another restaurant
+    """
+    rows = list(
+        MenuItem.objects.filter(restaurant_id=restaurant_id, id__in=list(quantities))
+        .values_list('id', 'price', 'restaurant__cuisines')
+    )
+    if len(rows) != len(quantities):
+        raise ValueError('Every item must be on the menu of restaurant_id.')
+    usage, first_order = user_usage(user)
+    return Cart(
+        restaurant_id=restaurant_id,
+        cuisines=frozenset(normalize_cuisine(c) for c in rows[0][2]),
+        subtotal=sum(price * quantities[item_id] for item_id, price, _ in rows),
+        now=timezone.now(),
+        first_order=first_order,
+        usage=usage,
+    )
+
+
+def redeem(promotion, user):
+    """
+    Count one redemption of ``promotion`` by ``user``.
+
+    Both limits are enforced by conditional increments in the database
+    (``count < limit``), so concurrent redemptions cannot exceed them no
+    matter what the caller evaluated beforehand.
+
+    Raises:
+        PromotionUnavailable: A limit was reached
+    """
+    with transaction.atomic():
+        promotions = Promotion.objects.filter(pk=promotion.id, is_active=True)
+        if promotion.total_limit is not None:
+            promotions = promotions.filter(redeemed_count__lt=F('total_limit'))
+        if not promotions.update(redeemed_count=F('redeemed_count') + 1):
+            raise PromotionUnavailable('This promotion has been fully redeemed.')
+
+        usages = PromotionUsage.objects.filter(promotion_id=promotion.id, user=user)
+        if promotion.per_user_limit is not None:
+            usages = usages.filter(count__lt=promotion.per_user_limit)
+        if not usages.update(count=F('count') + 1, last_redeemed_at=timezone.now()):
+            try:
+                with transaction.atomic():
+                    PromotionUsage.objects.create(promotion_id=promotion.id, user=user, count=1)
+            except IntegrityError:
+                # The row exists: at the limit, or created concurrently since the update
+                if not usages.update(count=F('count') + 1, last_redeemed_at=timezone.now()):
+                    raise PromotionUnavailable('You have already used this promotion the maximum number of times.')
+
+        if promotion.total_limit is not None:
+            # Drop exhausted promotions from every process's index
+            remaining = Promotion.objects.filter(pk=promotion.id, redeemed_count__lt=F('total_limit'))
+            if not remaining.exists():
+                transaction.on_commit(bump_promotions_version)
@@ -0,0 +1,135 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.benchmarking import percentile
+from promotions.engine import Cart, PromotionIndex
+
+CUISINES = [
+    'north indian', 'south indian', 'chinese', 'pizzas', 'biryani', 'burgers', 'desserts', 'beverages',
+    'italian', 'continental', 'street food', 'kebabs', 'thalis', 'bakery', 'ice cream', 'healthy food',
+]
+
+
+def generate_definitions(count, restaurants, rng, now):
+    """
+    Promotions shaped like a real catalog: nearly all restaurant-scoped,
+    some per cuisine and a few platform-wide.
+    """
+    definitions = []
+    for promotion_id in range(1, count + 1):
+        scope = rng.random()
+        percent = rng.random() < 0.6
+        definitions.append({
+            'id': promotion_id,
+            'code': f'PROMO{promotion_id}',
+            'description': '',
+            'discount_type': 'percent' if percent else 'flat',
+            'discount_value': rng.choice([10, 15, 20, 30, 50]) if percent else rng.choice([5000, 7500, 10000, 15000]),
+            'max_discount': rng.choice([None, 10000, 15000]) if percent else None,
+            'min_cart_value': rng.choice([0, 19900, 29900, 49900]),
+            'restaurants': rng.sample(range(1, restaurants + 1), rng.randint(1, 5)) if scope < 0.97 else [],
+            'cuisines': rng.sample(CUISINES, rng.randint(1, 2)) if 0.97 <= scope < 0.995 else [],
+            'first_order_only': rng.random() < 0.1,
+            'per_user_limit': rng.choice([None, 1, 3]),
+            'total_limit': rng.choice([None, 1000]),
+            'starts_at': now - timedelta(days=1) if rng.random() < 0.5 else None,
+            'ends_at': now + timedelta(days=rng.choice([-1, 7, 30])) if rng.random() < 0.5 else None,
+        })
+    return definitions
+
+
+def interpret(definition, cart):
+    """Evaluate one definition from its fields, as a rules table would."""
+    if definition['restaurants'] and cart.restaurant_id not in definition['restaurants']:
+        return None
+    if definition['cuisines'] and cart.cuisines.isdisjoint(c.lower() for c in definition['cuisines']):
+        return None
+    if cart.subtotal < definition['min_cart_value']:
+        return None
+    if definition['starts_at'] is not None and cart.now < definition['starts_at']:
+        return None
+    if definition['ends_at'] is not None and cart.now >= definition['ends_at']:
+        return None
+    if definition['first_order_only'] and not cart.first_order:
+        return None
+    limit = definition['per_user_limit']
+    if limit is not None and cart.usage.get(definition['id'], 0) >= limit:
+        return None
+    if definition['discount_type'] == 'percent':
+        discount = min(cart.subtotal * definition['discount_value'] // 100, cart.subtotal)
+        return discount if definition['max_discount'] is None else min(discount, definition['max_discount'])
+    return min(definition['discount_value'], cart.subtotal)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark cart evaluation against generated in-memory promotions: '
+        'compile time, per-cart latency of the compiled index, and the same '
+        'carts evaluated by interpreting every promotion for comparison.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--promotions', type=int, default=10000, help='Active promotions to generate.')
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument('--carts', type=int, default=2000, help='Carts to evaluate.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        definitions = generate_definitions(options['promotions'], options['restaurants'], rng, now)
+
+        started = time.perf_counter()
+        index = PromotionIndex(definitions)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        carts = []
+        for _ in range(options['carts']):
+            first_order = rng.random() < 0.2
+            carts.append(Cart(
+                restaurant_id=rng.randint(1, options['restaurants']),
+                cuisines=frozenset(rng.sample(CUISINES, rng.randint(1, 3))),
+                subtotal=rng.randint(5, 40) * 2500,
+                now=now,
+                first_order=first_order,
+                usage={} if first_order else {rng.randint(1, len(definitions)): 1 for _ in range(5)},
+            ))
+
+        compiled, interpreted, candidates, offers = [], [], [], []
+        for cart in carts:
+            started = time.perf_counter()
+            result = index.evaluate(cart)
+            compiled.append((time.perf_counter() - started) * 1e6)
+
+            started = time.perf_counter()
+            expected = [
+                (definition['code'], discount) for definition in definitions
+                if (discount := interpret(definition, cart)) is not None
+            ]
+            interpreted.append((time.perf_counter() - started) * 1e6)
+
+            if sorted(expected) != sorted((promotion.code, discount) for promotion, discount in result):
+                self.stderr.write(self.style.ERROR(f'Mismatch for {cart}'))
+                return
+            candidates.append(sum(1 for _ in index.candidates(cart)))
+            offers.append(len(result))
+
+        self.stdout.write(f'{len(index)} promotions compiled in {compile_ms:.1f} ms')
+        self.stdout.write(
+            f'{statistics.mean(candidates):.1f} candidates and {statistics.mean(offers):.1f} offers per cart'
+        )
+        header = f"{'evaluation':<14}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}{'carts/s':>12}"
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, samples in (('compiled', compiled), ('interpreted', interpreted)):
+            ordered = sorted(samples)
+            self.stdout.write(
+                f'{name:<14}{percentile(ordered, 50):>10.1f}{percentile(ordered, 95):>10.1f}'
+                f'{percentile(ordered, 99):>10.1f}{1e6 / statistics.mean(samples):>12.0f}'
+            )
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('restaurants', '0003_catalog_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=40, unique=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('discount_type', models.CharField(choices=[('percent', 'Percent'), ('flat', 'Flat')], max_length=10)),
+                ('discount_value', models.PositiveIntegerField()),
+                ('max_discount', models.PositiveIntegerField(blank=True, null=True)),
+                ('min_cart_value', models.PositiveIntegerField(default=0)),
+                ('cuisines', models.JSONField(blank=True, default=list)),
+                ('first_order_only', models.BooleanField(default=False)),
+                ('per_user_limit', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_limit', models.PositiveIntegerField(blank=True, null=True)),
+                ('redeemed_count', models.PositiveIntegerField(default=0)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurants', models.ManyToManyField(blank=True, related_name='promotions', to='restaurants.restaurant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PromotionUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_redeemed_at', models.DateTimeField(auto_now=True)),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='promotions.promotion')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotion_usages', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('promotion', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+def clamp_percent_discounts(apps, schema_editor):
+    # Rows saved before the constraint: over 100% becomes 100%, and a 0%
+    # offer, which never discounted anything, is switched off
+    Promotion = apps.get_model('promotions', 'Promotion')
+    percent = Promotion.objects.filter(discount_type='percent')
+    percent.filter(discount_value__gt=100).update(discount_value=100)
+    percent.filter(discount_value__lt=1).update(discount_value=1, is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_percent_discounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='promotion',
+            constraint=models.CheckConstraint(check=models.Q(('discount_type', 'flat'), models.Q(('discount_value__gte', 1), ('discount_value__lte', 100)), _connector='OR'), name='promotion_percent_between_1_and_100', violation_error_message='A percent discount must be between 1 and 100.'),
+        ),
+    ]
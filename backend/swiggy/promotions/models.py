@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import models
+
+
+class Promotion(models.Model):
+    DISCOUNT_CHOICES = [('percent', 'Percent'), ('flat', 'Flat')]
+
+    code = models.CharField(max_length=40, unique=True)
+    description = models.CharField(max_length=255, blank=True)
+    discount_type = models.CharField(max_length=10, choices=DISCOUNT_CHOICES)
+    discount_value = models.PositiveIntegerField()  # Percent, or paise when flat
+    max_discount = models.PositiveIntegerField(null=True, blank=True)  # Paise cap for percent offers
+    min_cart_value = models.PositiveIntegerField(default=0)  # Paise
+    # Empty scopes mean every restaurant / every cuisine
+    restaurants = models.ManyToManyField('restaurants.Restaurant', blank=True, related_name='promotions')
+    cuisines = models.JSONField(default=list, blank=True)
+    first_order_only = models.BooleanField(default=False)
+    per_user_limit = models.PositiveIntegerField(null=True, blank=True)
+    total_limit = models.PositiveIntegerField(null=True, blank=True)
+    redeemed_count = models.PositiveIntegerField(default=0)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(discount_type='flat') | models.Q(discount_value__gte=1, discount_value__lte=100),
+                name='promotion_percent_between_1_and_100',
+                violation_error_message='A percent discount must be between 1 and 100.',
+            ),
+        ]
+
+    def __str__(self):
+        return self.code
+
+
+class PromotionUsage(models.Model):
+    # One counter per user and promotion, only ever changed by conditional
+    # UPDATE ... SET count = count + 1, so concurrent redemptions cannot
+    # overshoot per_user_limit
+    promotion = models.ForeignKey(Promotion, related_name='usages', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='promotion_usages', on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+    last_redeemed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [('promotion', 'user')]
+
+    def __str__(self):
+        return f"{self.promotion_id} by {self.user_id} ({self.count})"
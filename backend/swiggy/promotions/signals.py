@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .engine import bump_promotions_version
+from .models import Promotion
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.restaurants.through)
+def recompile_promotions(sender, action='post_save', **kwargs):
+    if not action.startswith('post_'):
+        return
+    # Every process rebuilds its compiled index on the next evaluation
+    transaction.on_commit(bump_promotions_version)
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from .engine import PromotionUnavailable, compile_promotion, load_definitions, redeem
+from .models import Promotion, PromotionUsage
+
+
+def definition(**fields):
+    return {
+        'id': 1, 'code': 'TEST', 'description': '', 'discount_type': 'percent', 'discount_value': 10,
+        'max_discount': None, 'min_cart_value': 0, 'restaurants': [], 'cuisines': [],
+        'first_order_only': False, 'per_user_limit': None, 'total_limit': None,
+        'starts_at': None, 'ends_at': None, **fields,
+    }
+
+
+class DiscountTests(SimpleTestCase):
+    def test_percent_discount_is_capped_at_subtotal(self):
+        promotion = compile_promotion(definition(discount_value=150))
+        self.assertEqual(promotion.discount(10000), 10000)
+        promotion = compile_promotion(definition(discount_value=150, max_discount=50000))
+        self.assertEqual(promotion.discount(10000), 10000)
+
+    def test_percent_discount_respects_max_discount(self):
+        promotion = compile_promotion(definition(discount_value=50, max_discount=3000))
+        self.assertEqual(promotion.discount(10000), 3000)
+
+    def test_flat_discount_is_capped_at_subtotal(self):
+        promotion = compile_promotion(definition(discount_type='flat', discount_value=15000))
+        self.assertEqual(promotion.discount(10000), 10000)
+
+
+class PromotionModelTests(TestCase):
+    def test_percent_must_be_between_1_and_100(self):
+        for value in (0, 101, 150):
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                Promotion(code=f'P{value}', discount_type='percent', discount_value=value).full_clean()
+        Promotion(code='P100', discount_type='percent', discount_value=100).full_clean()
+
+    def test_flat_discount_is_not_limited_to_100(self):
+        Promotion(code='FLAT', discount_type='flat', discount_value=15000).full_clean()
+
+
+class RedemptionLimitTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(f'promo{i}@example.com', 'secret-pass', phone=f'900000010{i}')
+            for i in range(3)
+        ]
+
+    def compiled(self, **fields):
+        Promotion.objects.create(code='LIMITED', discount_type='flat', discount_value=5000, **fields)
+        return compile_promotion(load_definitions()[0])
+
+    def test_per_user_limit(self):
+        promotion = self.compiled(per_user_limit=2)
+        redeem(promotion, self.users[0])
+        redeem(promotion, self.users[0])
+        with self.assertRaises(PromotionUnavailable):
+            redeem(promotion, self.users[0])
+        redeem(promotion, self.users[1])
+        self.assertEqual(PromotionUsage.objects.get(user=self.users[0]).count, 2)
+        # The refused redemption did not count against the total either
+        self.assertEqual(Promotion.objects.get().redeemed_count, 3)
+
+    def test_total_limit(self):
+        promotion = self.compiled(total_limit=2)
+        redeem(promotion, self.users[0])
+        redeem(promotion, self.users[1])
+        with self.assertRaises(PromotionUnavailable):
+            redeem(promotion, self.users[2])
+        self.assertEqual(Promotion.objects.get().redeemed_count, 2)
+        self.assertFalse(PromotionUsage.objects.filter(user=self.users[2]).exists())
+        # Exhausted promotions drop out of the index
+        self.assertEqual(load_definitions(), [])
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('evaluate/', views.EvaluateCartView.as_view(), name='promotion_evaluate'),
+    path('redeem/', views.RedeemPromotionView.as_view(), name='promotion_redeem'),
+]
@@ -0,0 +1,94 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .engine import PromotionUnavailable, build_cart, get_promotion_book, redeem
+
+MAX_CART_ITEMS = 100
+
+
+def parse_cart(data):
+    """
+    Validate a ``{restaurant_id, items: [{menu_item_id, quantity}]}`` body.
+
+    Returns:
+        tuple: ``(restaurant_id, {menu_item_id: quantity})``
+
+    Raises:
+        ValueError: With a message for the client
+    """
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        raise ValueError('items must be a non-empty list.')
+    if len(items) > MAX_CART_ITEMS:
+        raise ValueError(f'At most {MAX_CART_ITEMS} items per cart.')
+    try:
+        restaurant_id = int(data['restaurant_id'])
+        quantities = {}
+        for item in items:
+            item_id, quantity = int(item['menu_item_id']), int(item.get('quantity', 1))
+            if quantity < 1:
+                raise ValueError
+            quantities[item_id] = quantities.get(item_id, 0) + quantity
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Each item needs an integer menu_item_id and a positive quantity, '
+                         'and restaurant_id is required.')
+    return restaurant_id, quantities
+
+
+def serialize_offer(promotion, discount):
+    return {'code': promotion.code, 'description': promotion.description, 'discount': discount}
+
+
+# Every offer applicable to a cart, priced server-side from the menu
+class EvaluateCartView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    # Two more when this process recompiles the promotions index
+    query_budget = 5
+
+    def post(self, request):
+        try:
+            cart = build_cart(request.user, *parse_cart(request.data))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+
+        offers = get_promotion_book().index().evaluate(cart)
+        best = offers[0] if offers else None
+        return Response({
+            'subtotal': cart.subtotal,
+            'offers': [serialize_offer(promotion, discount) for promotion, discount in offers],
+            'best': serialize_offer(*best) if best else None,
+            'total': cart.subtotal - (best[1] if best else 0),
+        })
+
+
+# Apply one promotion to a cart and count the redemption against its limits
+class RedeemPromotionView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    # Evaluation reads, then the counter updates and their savepoints
+    query_budget = 10
+
+    def post(self, request):
+        code = request.data.get('code')
+        if not isinstance(code, str) or not code:
+            return Response({'detail': 'code is required.'}, status=400)
+        try:
+            cart = build_cart(request.user, *parse_cart(request.data))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+
+        promotion = get_promotion_book().index().applies(code, cart)
+        if promotion is None:
+            return Response({'detail': 'This promotion does not apply to this cart.'}, status=400)
+        try:
+            redeem(promotion, request.user)
+        except PromotionUnavailable as e:
+            return Response({'detail': str(e)}, status=409)
+
+        discount = promotion.discount(cart.subtotal)
+        return Response({
+            'code': promotion.code,
+            'subtotal': cart.subtotal,
+            'discount': discount,
+            'total': cart.subtotal - discount,
+        })
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    A single streaming client's mailbox.
+
+    Messages go into a bounded deque so a slow or stalled client can never
+    hold more than ``maxlen`` events; the oldest ones are dropped instead.
+    """
+    __slots__ = ('messages', 'event', 'closed')
+
+    def __init__(self, maxlen):
+        self.messages = deque(maxlen=maxlen)
+        self.event = asyncio.Event()
+        self.closed = False
+
+    def push(self, message):
+        self.messages.append(message)
+        self.event.set()
+
+    def close(self):
+        self.closed = True
+        self.event.set()
+
+
+class LocalBroker:
+    """
+    In-process pub/sub used by a single ASGI worker (and by tests).
+
+    ``publish`` may be called from any thread: Django sync views run in a
+    worker thread under ASGI, so delivery is handed to the event loop that
+    owns the subscriptions.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._loop = None
+
+    def subscribe(self, channel, subscription):
+        self._loop = asyncio.get_running_loop()
+        self._channels.setdefault(channel, set()).add(subscription)
+
+    def unsubscribe(self, channel, subscription):
+        subscribers = self._channels.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._channels[channel]
+
+    def publish(self, channel, message):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(channel, message)
+        else:
+            loop.call_soon_threadsafe(self._fanout, channel, message)
+
+    def _fanout(self, channel, message):
+        for subscription in tuple(self._channels.get(channel, ())):
+            subscription.push(message)
+
+    def subscriber_count(self):
+        return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+class RedisBroker(LocalBroker):
+    """
+    Cross-process pub/sub for multi-worker deployments.
+
+    Each worker keeps one Redis pattern subscription and fans messages out
+    to its own local subscribers, so connections never talk to Redis
+    individually. Requires the optional ``redis`` package.
+    """
+
+    def __init__(self, url=None, prefix='realtime:'):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured('RedisBroker requires the "redis" package.') from exc
+        self._url = url or settings.REALTIME.get('REDIS_URL')
+        self._prefix = prefix
+        self._publisher = redis.Redis.from_url(self._url)
+        self._listener = None
+
+    def subscribe(self, channel, subscription):
+        super().subscribe(channel, subscription)
+        if self._listener is None:
+            self._listener = self._loop.create_task(self._listen())
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self._url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(f'{self._prefix}*')
+        async for item in pubsub.listen():
+            if item['type'] != 'pmessage':
+                continue
+            channel = item['channel'].decode()[len(self._prefix):]
+            self._fanout(channel, item['data'].decode())
+
+    def publish(self, channel, message):
+        self._publisher.publish(f'{self._prefix}{channel}', message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by ``REALTIME['BROKER']``."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME['BROKER'])()
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    _broker = None
+
+
+def encode_event(event, data, event_id=None):
+    """Serialize one Server-Sent Event frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
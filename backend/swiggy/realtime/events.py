@@ -0,0 +1,29 @@
+import itertools
+
+from django.utils import timezone
+
+from .backends import encode_event, get_broker
+
+ORDER_STATUS_EVENT = 'order_status'
+
+_sequence = itertools.count(1)
+
+
+def user_channel(user_id):
+    return f'orders:user:{user_id}'
+
+
+def publish_order_status(user_id, order_id, status, **extra):
+    """
+    Push an order status change to every open stream of ``user_id``.
+
+    Safe to call from sync views; delivery happens on the ASGI event loop.
+    """
+    payload = {
+        'order_id': order_id,
+        'status': status,
+        'at': timezone.now().isoformat(),
+        **extra,
+    }
+    frame = encode_event(ORDER_STATUS_EVENT, payload, event_id=next(_sequence))
+    get_broker().publish(user_channel(user_id), frame)
@@ -0,0 +1,106 @@
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.settings import api_settings
+
+from realtime.backends import get_broker
+from realtime.events import publish_order_status
+from realtime.streaming import StreamingRouter
+
+
+class Command(BaseCommand):
+    help = (
+        'Open N idle order-status streams against the ASGI app in-process, '
+        'then report memory per connection and fan-out latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=None,
+                            help='Distinct users the connections are spread over (default: one per connection).')
+        parser.add_argument('--max-bytes-per-connection', type=int, default=16384,
+                            help='Fail if the traced memory per idle connection exceeds this budget.')
+
+    def handle(self, *args, **options):
+        users = options['users'] or options['connections']
+        # Signing reads the key ring from the database, which the event loop must not do
+        tokens = []
+        for user_id in range(1, users + 1):
+            token = api_settings.AUTH_TOKEN_CLASSES[0]()
+            token[api_settings.USER_ID_CLAIM] = user_id
+            tokens.append(str(token))
+        result = asyncio.run(self.run(options['connections'], tokens))
+        per_connection = result['bytes'] / options['connections']
+
+        self.stdout.write(f"connections:           {options['connections']}")
+        self.stdout.write(f"open time:             {result['open_seconds']:.2f}s")
+        self.stdout.write(f"memory per connection: {per_connection:,.0f} bytes")
+        self.stdout.write(f"fan-out to all:        {result['fanout_seconds'] * 1000:.1f}ms")
+        self.stdout.write(f"events delivered:      {result['delivered']}")
+
+        if result['delivered'] != options['connections']:
+            raise CommandError('Not every connection received the published event.')
+        if per_connection > options['max_bytes_per_connection']:
+            raise CommandError(
+                f"Idle connection footprint {per_connection:,.0f}B exceeds "
+                f"budget of {options['max_bytes_per_connection']:,}B."
+            )
+        self.stdout.write(self.style.SUCCESS('Streaming load test passed.'))
+
+    async def run(self, connections, tokens):
+        app = StreamingRouter(django_application=None)
+        users = len(tokens)
+
+        delivered = 0
+        all_delivered = asyncio.Event()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal delivered
+            if message['type'] == 'http.response.body' and b'event: order_status' in message.get('body', b''):
+                delivered += 1
+                if delivered == connections:
+                    all_delivered.set()
+
+        def scope(index):
+            return {
+                'type': 'http',
+                'method': 'GET',
+                'path': '/api/stream/orders/',
+                'query_string': f'token={tokens[index % users]}'.encode(),
+                'headers': [],
+            }
+
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(app(scope(i), receive, send)) for i in range(connections)]
+        while get_broker().subscriber_count() < connections:
+            await asyncio.sleep(0.01)
+        open_seconds = time.perf_counter() - started
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for user_id in range(1, users + 1):
+            publish_order_status(user_id, order_id=user_id, status='PREPARING')
+        await asyncio.wait_for(all_delivered.wait(), timeout=60)
+        fanout_seconds = time.perf_counter() - started
+
+        disconnect.set()
+        await asyncio.gather(*tasks)
+        return {
+            'bytes': used,
+            'open_seconds': open_seconds,
+            'fanout_seconds': fanout_seconds,
+            'delivered': delivered,
+        }
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .backends import Subscription, get_broker
+from .events import user_channel
+
+STREAM_PREFIX = '/api/stream/'
+
+
+def authenticate_scope(scope):
+    """
+    Resolve the user id for a streaming request from its access token.
+
+    Browsers' ``EventSource`` cannot set headers, so ``?token=`` is accepted
+    alongside ``Authorization: Bearer``. Only the token signature and claims
+    are checked; no database query is made per connection, except when the
+    signing keys were rotated and the key ring reloads, so async callers
+    run this through ``sync_to_async``.
+    """
+    raw = None
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+                raw = parts[1]
+            break
+    if raw is None:
+        raw = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not raw:
+        return None
+    try:
+        token = api_settings.AUTH_TOKEN_CLASSES[0](raw)
+    except TokenError:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+async def _send_json(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+
+async def order_status_stream(scope, receive, send):
+    """Server-Sent Events endpoint streaming the caller's order status changes."""
+    if scope['method'] != 'GET':
+        await _send_json(send, 405, {'detail': 'Method not allowed.'})
+        return
+
+    user_id = await sync_to_async(authenticate_scope)(scope)
+    if user_id is None:
+        await _send_json(send, 401, {'detail': 'Authentication credentials were not provided or are invalid.'})
+        return
+
+    options = settings.REALTIME
+    broker = get_broker()
+    channel = user_channel(user_id)
+    subscription = Subscription(options['QUEUE_SIZE'])
+    loop = asyncio.get_running_loop()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                subscription.close()
+                return
+
+    def heartbeat():
+        subscription.push(': ping\n\n')
+        nonlocal timer
+        timer = loop.call_later(options['HEARTBEAT_SECONDS'], heartbeat)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': f'retry: {options["RETRY_MS"]}\n\n'.encode(),
+        'more_body': True,
+    })
+
+    broker.subscribe(channel, subscription)
+    watcher = loop.create_task(watch_disconnect())
+    timer = loop.call_later(options['HEARTBEAT_SECONDS'], heartbeat)
+    try:
+        while True:
+            await subscription.event.wait()
+            subscription.event.clear()
+            if subscription.closed:
+                break
+            messages = subscription.messages
+            chunk = ''.join(messages)
+            messages.clear()
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    finally:
+        timer.cancel()
+        watcher.cancel()
+        broker.unsubscribe(channel, subscription)
+
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+ROUTES = {
+    f'{STREAM_PREFIX}orders/': order_status_stream,
+}
+
+
+class StreamingRouter:
+    """
+    Wraps the Django ASGI application and serves streaming endpoints
+    directly, so long-lived connections never occupy a sync worker thread.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].startswith(STREAM_PREFIX):
+            handler = ROUTES.get(scope['path'])
+            if handler is None:
+                await _send_json(send, 404, {'detail': 'Not found.'})
+                return
+            await handler(scope, receive, send)
+            return
+        await self.django_application(scope, receive, send)
@@ -0,0 +1,69 @@
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase
+
+from user_auth import tokens
+from user_auth.models import User
+
+from .events import user_channel
+from .streaming import STREAM_PREFIX, StreamingRouter, authenticate_scope
+
+ORDERS_PATH = f'{STREAM_PREFIX}orders/'
+
+
+def scope(query_string=b'', headers=()):
+    return {'type': 'http', 'method': 'GET', 'path': ORDERS_PATH, 'query_string': query_string,
+            'headers': list(headers)}
+
+
+class StreamAuthTests(TransactionTestCase):
+    # Transactional: authentication runs in sync_to_async, off the test's connection
+    def setUp(self):
+        self.user = User.objects.create_user('stream@example.com', 'secret-pass', phone='9000000030')
+        refresh = tokens.ServiceRefreshToken.for_user(self.user)
+        tokens.get_writer().flush()
+        self.access, self.refresh = str(refresh.access_token), str(refresh)
+
+    def stream(self, request_scope):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def unused(*args):
+            raise AssertionError('streaming requests must not reach Django')
+
+        async_to_sync(StreamingRouter(unused))(request_scope, receive, send)
+        return sent
+
+    def test_bearer_header_and_query_token(self):
+        # The claim is a string; it must name the channel orders publish to
+        for request_scope in (
+            scope(headers=[(b'authorization', f'Bearer {self.access}'.encode())]),
+            scope(f'token={self.access}'.encode()),
+        ):
+            with self.subTest(request_scope=request_scope):
+                self.assertEqual(user_channel(authenticate_scope(request_scope)), user_channel(self.user.pk))
+
+    def test_rejects_missing_and_invalid_tokens(self):
+        for request_scope in (
+            scope(),
+            scope(b'token=not-a-jwt'),
+            scope(f'token={self.refresh}'.encode()),
+            scope(headers=[(b'authorization', f'Basic {self.access}'.encode())]),
+        ):
+            with self.subTest(request_scope=request_scope):
+                self.assertIsNone(authenticate_scope(request_scope))
+
+    def test_stream_opens_for_the_token_holder(self):
+        sent = self.stream(scope(f'token={self.access}'.encode()))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        # The client disconnected, so the stream ends
+        self.assertEqual(sent[-1], {'type': 'http.response.body', 'body': b''})
+
+    def test_stream_refuses_unauthenticated_clients(self):
+        sent = self.stream(scope(b'token=not-a-jwt'))
+        self.assertEqual(sent[0]['status'], 401)
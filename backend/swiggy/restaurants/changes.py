@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import CatalogChange, CatalogCompaction
+
+RESTAURANT = 'restaurant'
+MENU_ITEM = 'menu_item'
+
+
+def record_change(entity, entity_id, op='upsert'):
+    """
+    Append a change once the surrounding transaction commits, so a row is
+    never visible to clients before the data it describes.
+    """
+    transaction.on_commit(
+        lambda: CatalogChange.objects.create(entity=entity, entity_id=entity_id, op=op)
+    )
+
+
+def encode_token(epoch, version):
+    return f'{epoch}.{version}'
+
+
+def decode_token(token):
+    """
+    Split a version token into the compaction epoch it was issued in and
+    the change log version. Raises ValueError on malformed tokens.
+    """
+    epoch, version = (int(part) for part in token.split('.'))
+    if epoch < 0 or version < 0:
+        raise ValueError(token)
+    return epoch, version
+
+
+def changes_since(token, limit):
+    """
+    The next page of the change log after version ``token``.
+
+    Tokens carry the id of the latest compaction run when they were
+    issued; a client is sent back to the start only if a later run dropped
+    tombstones it had not read yet. Without a token the client bootstraps
+    from version 0, which replays the (compacted) log and so the whole
+    catalog.
+
+    Rows are read in id order up to the first one still inside the settle
+    window, so the returned version never moves past an id whose insert
+    may not be visible yet. Several changes to one entity collapse into
+    its latest operation.
+
+    Returns:
+        dict: ``version`` token to resume from, ``has_more``, ``reset``
+        (the client must drop its local catalog and apply this page from
+        scratch) and ``upserts``/``deletes`` as ``{entity: [ids]}``
+    """
+    latest_epoch = CatalogCompaction.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    epoch, since = decode_token(token) if token else (latest_epoch, 0)
+    reset = bool(since) and epoch < latest_epoch and CatalogCompaction.objects.filter(
+        id__gt=epoch, horizon__gt=since,
+    ).exists()
+    if reset:
+        since = 0
+
+    rows = list(
+        CatalogChange.objects.filter(id__gt=since).order_by('id')
+        .values_list('id', 'entity', 'entity_id', 'op', 'created_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cutoff = timezone.now() - timedelta(seconds=settings.CATALOG_CHANGES['SETTLE_SECONDS'])
+    for position, row in enumerate(rows):
+        if row[4] > cutoff:
+            rows, has_more = rows[:position], False
+            break
+
+    if not rows and since:
+        # A token from beyond the end of the log (e.g. after a restore)
+        head = CatalogChange.objects.aggregate(head=Max('id'))['head'] or 0
+        if since > head:
+            # Start over from version 0 on the next page
+            rows, since, has_more, reset = [], 0, True, True
+
+    latest = {}
+    for change_id, entity, entity_id, op, _ in rows:
+        latest[(entity, entity_id)] = op
+    upserts = {RESTAURANT: [], MENU_ITEM: []}
+    deletes = {RESTAURANT: [], MENU_ITEM: []}
+    for (entity, entity_id), op in latest.items():
+        (upserts if op == 'upsert' else deletes)[entity].append(entity_id)
+
+    return {
+        'version': encode_token(latest_epoch, rows[-1][0] if rows else since),
+        'has_more': has_more,
+        'reset': reset,
+        'upserts': upserts,
+        'deletes': deletes,
+    }
+
+
+def compact(batch_size=5000, now=None):
+    """
+    Drop change rows superseded by a newer row for the same entity, and
+    tombstones older than ``TOMBSTONE_RETENTION_DAYS``.
+
+    Superseded rows are never needed: any client behind them is also
+    behind the newer row. Dropping old tombstones is lossy, so the highest
+    id removed becomes the horizon below which clients must resync.
+
+    Returns:
+        CatalogCompaction: The recorded run; its id is the new epoch
+    """
+    now = now or timezone.now()
+    newer = CatalogChange.objects.filter(
+        entity=OuterRef('entity'), entity_id=OuterRef('entity_id'), id__gt=OuterRef('id'),
+    )
+    superseded = CatalogChange.objects.filter(Exists(newer))
+    expired = CatalogChange.objects.filter(
+        op='delete',
+        created_at__lt=now - timedelta(days=settings.CATALOG_CHANGES['TOMBSTONE_RETENTION_DAYS']),
+    )
+
+    removed = 0
+    horizon = CatalogCompaction.objects.order_by('-id').values_list('horizon', flat=True).first() or 0
+    for queryset, lossy in ((superseded, False), (expired, True)):
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            removed += CatalogChange.objects.filter(id__in=ids).delete()[0]
+            if lossy:
+                horizon = max(horizon, ids[-1])
+    return CatalogCompaction.objects.create(horizon=horizon, removed=removed)
@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Restaurant
+
+EARTH_RADIUS_KM = 6371.0088
+CATALOG_VERSION_KEY = 'restaurants:geo:version'
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """
+    Great-circle distance from one point to many, in kilometres.
+
+    Args:
+        lat, lng: Origin in degrees
+        lats, lngs: numpy arrays of destinations in degrees
+
+    Returns:
+        numpy.ndarray: Distances, same shape as ``lats``
+    """
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def geo_cell(lat, lng, size=None):
+    """Quantize a coordinate onto the square grid used for cache keys."""
+    size = size or settings.DELIVERY['CELL_DEGREES']
+    return f'{math.floor(lat / size)}:{math.floor(lng / size)}'
+
+
+def catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, 1, timeout=None)
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 2, timeout=None)
+
+
+def load_catalog():
+    """
+    Column arrays of every open, geocoded restaurant.
+
+    Cached per catalog version so a cache miss on an ETA lookup costs numpy
+    work only, not a table scan.
+    """
+    key = f'restaurants:geo:catalog:{catalog_version()}'
+    catalog = cache.get(key)
+    if catalog is None:
+        rows = list(
+            Restaurant.objects.filter(is_open=True, latitude__isnull=False, longitude__isnull=False)
+            .values_list('id', 'latitude', 'longitude', 'prep_time')
+        )
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        catalog = {
+            'ids': columns[:, 0].astype(np.int64),
+            'lats': columns[:, 1],
+            'lngs': columns[:, 2],
+            'prep': columns[:, 3],
+        }
+        cache.set(key, catalog, timeout=settings.DELIVERY['CACHE_TIMEOUT'])
+    return catalog
+
+
+def fee_for_distances(distances):
+    """
+    Apply the zone fee table to an array of distances.
+
+    ``DELIVERY['ZONES']`` is a list of ``(max_km, fee)`` rows sorted by
+    distance; anything beyond the last zone is not serviceable (NaN fee).
+    """
+    zones = settings.DELIVERY['ZONES']
+    limits = np.array([limit for limit, _ in zones], dtype=np.float64)
+    fees = np.array([fee for _, fee in zones] + [np.nan], dtype=np.float64)
+    return fees[np.searchsorted(limits, distances, side='left')]
+
+
+def compute_quotes(lat, lng, catalog):
+    """
+    Distance, ETA and fee from one point to every restaurant in ``catalog``,
+    in a single vectorized pass. Unserviceable restaurants are dropped and
+    the result is sorted by ETA.
+    """
+    options = settings.DELIVERY
+    distances = haversine_km(lat, lng, catalog['lats'], catalog['lngs'])
+    fees = fee_for_distances(distances)
+    serviceable = ~np.isnan(fees)
+
+    distances = distances[serviceable]
+    travel = distances * options['ROUTE_FACTOR'] / options['RIDER_SPEED_KMH'] * 60
+    etas = np.ceil(catalog['prep'][serviceable] + options['PICKUP_MINUTES'] + travel)
+    order = np.lexsort((distances, etas))
+    return {
+        'ids': catalog['ids'][serviceable][order],
+        'distance_km': np.round(distances[order], 1),
+        'eta_minutes': etas[order].astype(np.int64),
+        'fee': fees[serviceable][order],
+    }
+
+
+def quotes_for_address(address):
+    """
+    ETA-sorted quotes for a saved ``Address``, cached per (address, geo cell)
+    so the cache naturally misses once the address is moved.
+    """
+    if address.latitude is None or address.longitude is None:
+        return None
+    cell = geo_cell(address.latitude, address.longitude)
+    key = f'restaurants:eta:{address.pk}:{cell}:{catalog_version()}'
+    quotes = cache.get(key)
+    if quotes is None:
+        quotes = compute_quotes(address.latitude, address.longitude, load_catalog())
+        cache.set(key, quotes, timeout=settings.DELIVERY['CACHE_TIMEOUT'])
+    return quotes
@@ -0,0 +1,222 @@
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from core.caching import get_tiered_cache
+
+from .models import OpeningHours, OpeningHoursOverride
+
+HOURS_NAMESPACE = 'restaurants:hours'
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def schedule_zone():
+    return ZoneInfo(settings.OPENING_HOURS['TIME_ZONE'])
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def day_interval(opens_at, closes_at):
+    """
+    ``(start, end)`` minutes from the opening day's midnight; ``end`` goes
+    past 1440 for intervals running past midnight. Equal times mean open
+    around the clock.
+    """
+    start, end = _minutes(opens_at), _minutes(closes_at)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+class HoursIndex:
+    """
+    Weekly opening hours of every scheduled restaurant, compiled into
+    fixed-size buckets of the week.
+
+    For each bucket a packed bitmap marks the restaurants open for the
+    whole bucket, and the few intervals starting or ending inside it are
+    kept as ``(start, end)`` minute-of-week pairs. "Open at minute m" is
+    one bitmap row plus a vectorized comparison against that bucket's
+    boundary intervals, whatever the number of restaurants.
+
+    Holiday overrides for the dates around the build day are compiled
+    alongside and applied to the handful of restaurants they concern.
+    """
+
+    def __init__(self, hours, overrides, bucket_minutes, first_override_date, last_override_date):
+        """
+        Args:
+            hours: ``(restaurant_id, weekday, opens_at, closes_at)`` rows
+            overrides: ``compile_overrides`` output for the dates in
+                ``[first_override_date, last_override_date]``
+        """
+        self.bucket_minutes = bucket_minutes
+        self.ids = np.array(sorted({row[0] for row in hours}), dtype=np.int64)
+        positions = {restaurant_id: position for position, restaurant_id in enumerate(self.ids.tolist())}
+        self.scheduled = frozenset(positions)
+        buckets = -(-MINUTES_PER_WEEK // bucket_minutes)
+
+        # Per restaurant and weekday, for resolving overrides
+        self.weekly = {}
+        pieces = []
+        for restaurant_id, weekday, opens_at, closes_at in hours:
+            start, end = day_interval(opens_at, closes_at)
+            self.weekly.setdefault((restaurant_id, weekday), []).append((start, end))
+            start, end = start + weekday * MINUTES_PER_DAY, end + weekday * MINUTES_PER_DAY
+            row = positions[restaurant_id]
+            if end > MINUTES_PER_WEEK:
+                # Sunday night into Monday morning
+                pieces.append((row, 0, end - MINUTES_PER_WEEK))
+                end = MINUTES_PER_WEEK
+            pieces.append((row, start, end))
+        rows, starts, ends = np.array(pieces, dtype=np.int64).reshape(-1, 3).T
+
+        # Buckets an interval covers entirely, marked with +1/-1 at its
+        # first and past-the-last bucket and summed down each column
+        first_full, last_full = -(-starts // bucket_minutes), ends // bucket_minutes
+        covers = first_full < last_full
+        counts = np.zeros((buckets + 1, len(self.ids)), dtype=np.int16)
+        np.add.at(counts, (first_full[covers], rows[covers]), 1)
+        np.add.at(counts, (last_full[covers], rows[covers]), -1)
+        self.full = np.packbits(np.cumsum(counts, axis=0)[:-1] > 0, axis=1)
+
+        # Buckets an interval starts or ends inside of
+        edges = []
+        for bucket in (starts // bucket_minutes, (ends - 1) // bucket_minutes):
+            partial = (bucket < first_full) | (bucket >= last_full)
+            edges.append(np.stack([bucket, rows, starts, ends], axis=1)[partial])
+        edges = np.unique(np.concatenate(edges), axis=0)
+        self.edge_offsets = np.searchsorted(edges[:, 0], np.arange(buckets + 1))
+        self.edge_rows, self.edge_starts, self.edge_ends = edges[:, 1], edges[:, 2], edges[:, 3]
+
+        self.first_override_date, self.last_override_date = first_override_date, last_override_date
+        self.days = {}
+        day = first_override_date + timedelta(days=1)
+        while day <= last_override_date:
+            self.days[day] = self.compile_day(day, overrides)
+            day += timedelta(days=1)
+
+    def open_mask(self, minute):
+        """Which of ``self.ids`` are open at minute-of-week ``minute`` on a regular week."""
+        bucket = minute // self.bucket_minutes
+        mask = np.unpackbits(self.full[bucket], count=len(self.ids)).astype(bool)
+        lo, hi = self.edge_offsets[bucket], self.edge_offsets[bucket + 1]
+        hit = (self.edge_starts[lo:hi] <= minute) & (minute < self.edge_ends[lo:hi])
+        mask[self.edge_rows[lo:hi][hit]] = True
+        return mask
+
+    def _intervals(self, restaurant_id, day, overrides):
+        if restaurant_id in overrides.get(day, {}):
+            return overrides[day][restaurant_id]
+        if restaurant_id in self.scheduled:
+            return self.weekly.get((restaurant_id, day.weekday()), ())
+        return ((0, MINUTES_PER_DAY),)
+
+    def compile_day(self, day, overrides):
+        """
+        The restaurants with an override on ``day`` or the day before, and
+        every interval that can be open on ``day`` for them (including the
+        previous evening's), in minutes from ``day``'s midnight.
+
+        Returns:
+            tuple: ``(restaurant ids, rows, starts, ends)`` arrays
+        """
+        previous = day - timedelta(days=1)
+        affected = sorted(set(overrides.get(day, {})) | set(overrides.get(previous, {})))
+        intervals = []
+        for position, restaurant_id in enumerate(affected):
+            for start, end in self._intervals(restaurant_id, day, overrides):
+                intervals.append((position, start, end))
+            for start, end in self._intervals(restaurant_id, previous, overrides):
+                intervals.append((position, start - MINUTES_PER_DAY, end - MINUTES_PER_DAY))
+        rows, starts, ends = np.array(intervals, dtype=np.int64).reshape(-1, 3).T
+        return np.array(affected, dtype=np.int64), rows, starts, ends
+
+    def closed_ids(self, at):
+        """
+        Ids of restaurants closed at the aware datetime ``at``. Restaurants
+        without a weekly schedule are only ever closed by an override.
+
+        Returns:
+            numpy.ndarray: Sorted restaurant ids
+        """
+        local = at.astimezone(schedule_zone())
+        minute_of_day = _minutes(local)
+        closed = self.ids[~self.open_mask(local.weekday() * MINUTES_PER_DAY + minute_of_day)]
+
+        day = local.date()
+        compiled = self.days.get(day)
+        if compiled is None:
+            compiled = self.compile_day(day, load_overrides(day - timedelta(days=1), day))
+        affected, rows, starts, ends = compiled
+        if not len(affected):
+            return closed
+        is_open = np.zeros(len(affected), dtype=bool)
+        is_open[rows[(starts <= minute_of_day) & (minute_of_day < ends)]] = True
+        closed = np.setdiff1d(closed, affected, assume_unique=True)
+        return np.union1d(closed, affected[~is_open])
+
+
+def compile_overrides(rows):
+    """``{date: {restaurant_id: [(start, end), ...]}}``; an empty list means closed."""
+    overrides = {}
+    for restaurant_id, date, opens_at, closes_at in rows:
+        intervals = overrides.setdefault(date, {}).setdefault(restaurant_id, [])
+        if opens_at is not None and closes_at is not None:
+            intervals.append(day_interval(opens_at, closes_at))
+    return overrides
+
+
+def load_overrides(first_date, last_date):
+    return compile_overrides(
+        OpeningHoursOverride.objects.filter(date__range=(first_date, last_date))
+        .values_list('restaurant_id', 'date', 'opens_at', 'closes_at')
+    )
+
+
+def build_index(today):
+    options = settings.OPENING_HOURS
+    first, last = today - timedelta(days=1), today + timedelta(days=options['OVERRIDE_DAYS'])
+    return HoursIndex(
+        list(OpeningHours.objects.values_list('restaurant_id', 'weekday', 'opens_at', 'closes_at')),
+        load_overrides(first, last),
+        options['BUCKET_MINUTES'],
+        first,
+        last,
+    )
+
+
+def get_hours_index():
+    """
+    The compiled index, cached per schedule version and local day (so the
+    window of compiled overrides moves along).
+    """
+    cache = get_tiered_cache()
+    today = timezone.now().astimezone(schedule_zone()).date()
+    key = cache.versioned_key(HOURS_NAMESPACE, f'index:{today.isoformat()}')
+    return cache.get_or_set(key, lambda: build_index(today), timeout=settings.OPENING_HOURS['CACHE_TIMEOUT'])
+
+
+def bump_hours_version():
+    get_tiered_cache().bump_namespace(HOURS_NAMESPACE)
+
+
+def only_open(columns, at):
+    """
+    Drop the rows of a listing or quotes dict (parallel numpy arrays keyed
+    by name, with restaurant ``ids``) whose restaurant is closed at ``at``.
+    """
+    closed = get_hours_index().closed_ids(at)
+    if not len(closed):
+        return columns
+    keep = ~np.isin(columns['ids'], closed, assume_unique=True)
+    return {
+        name: value[keep] if isinstance(value, np.ndarray) else value
+        for name, value in columns.items()
+    }
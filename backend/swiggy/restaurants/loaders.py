@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.instrumentation import record_cache
+
+from .models import Restaurant
+from .serializers import RestaurantCardSerializer
+
+# Cached in place of a row so unknown ids do not hit the database again
+MISSING = '__missing__'
+
+
+def restaurant_cache_key(restaurant_id):
+    return f'restaurant:card:{restaurant_id}'
+
+
+class RestaurantLoader:
+    """
+    DataLoader-style coalescer for restaurant cards.
+
+    Ids requested with ``load_many`` during one request window are collected
+    and de-duplicated; ``dispatch`` then resolves everything still pending
+    from the per-id cache first and the rest with a single ``id__in`` query.
+
+    Usage:
+        loader = RestaurantLoader.for_request(request)
+        loader.load_many(ids)
+        cards = loader.dispatch()
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout if timeout is not None else settings.RESTAURANT_CACHE_TIMEOUT
+        self._pending = set()
+        self._resolved = {}
+        self.queries = 0
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the loader shared by everything rendering this request."""
+        loader = getattr(request, '_restaurant_loader', None)
+        if loader is None:
+            loader = cls()
+            request._restaurant_loader = loader
+        return loader
+
+    def load_many(self, ids):
+        self._pending.update(i for i in ids if i not in self._resolved)
+
+    def dispatch(self):
+        pending, self._pending = self._pending, set()
+        if pending:
+            keys = {restaurant_cache_key(i): i for i in pending}
+            hits = cache.get_many(keys)
+            for key, value in hits.items():
+                self._resolved[keys[key]] = None if value == MISSING else value
+                pending.discard(keys[key])
+            record_cache(hits=len(hits), misses=len(pending))
+
+        if pending:
+            self.queries += 1
+            rows = Restaurant.objects.filter(id__in=pending)
+            fetched = {row.id: row for row in rows}
+            to_cache = {}
+            for restaurant_id in pending:
+                row = fetched.get(restaurant_id)
+                data = dict(RestaurantCardSerializer(row).data) if row else None
+                self._resolved[restaurant_id] = data
+                to_cache[restaurant_cache_key(restaurant_id)] = MISSING if data is None else data
+            cache.set_many(to_cache, timeout=self.timeout)
+        return self._resolved
+
+    def get(self, restaurant_id):
+        if restaurant_id not in self._resolved:
+            self.load_many([restaurant_id])
+            self.dispatch()
+        return self._resolved[restaurant_id]
+
+
+def invalidate_restaurants(ids):
+    cache.delete_many([restaurant_cache_key(i) for i in ids])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.changes import compact
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact the catalog change log: drop rows superseded by a newer change to '
+        'the same restaurant or menu item, and deletes older than '
+        'CATALOG_CHANGES["TOMBSTONE_RETENTION_DAYS"]. Safe to run at any time, '
+        'e.g. nightly from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        run = compact(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {run.removed} change rows; clients behind version {run.horizon} will resync.'
+        ))
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Restaurant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('cloudinary_image_id', models.CharField(blank=True, max_length=255)),
+                ('locality', models.CharField(blank=True, max_length=255)),
+                ('area_name', models.CharField(blank=True, max_length=255)),
+                ('cuisines', models.JSONField(blank=True, default=list)),
+                ('cost_for_two', models.PositiveIntegerField(default=0)),
+                ('avg_rating', models.DecimalField(decimal_places=1, default=0, max_digits=2)),
+                ('total_ratings', models.PositiveIntegerField(default=0)),
+                ('delivery_time', models.PositiveIntegerField(default=0)),
+                ('is_open', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('price', models.PositiveIntegerField(default=0)),
+                ('image_id', models.CharField(blank=True, max_length=255)),
+                ('is_veg', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_items', to='restaurants.restaurant')),
+            ],
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # One upsert per existing row, so syncing from version 0 yields the
+    # whole catalog
+    CatalogChange = apps.get_model('restaurants', 'CatalogChange')
+    for model_name, entity in (('Restaurant', 'restaurant'), ('MenuItem', 'menu_item')):
+        ids = apps.get_model('restaurants', model_name).objects.order_by('id').values_list('id', flat=True)
+        CatalogChange.objects.bulk_create(
+            (CatalogChange(entity=entity, entity_id=pk, op='upsert') for pk in ids.iterator(chunk_size=5000)),
+            batch_size=5000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_restaurant_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.BigIntegerField(default=0)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('restaurant', 'Restaurant'), ('menu_item', 'Menu item')], max_length=20)),
+                ('entity_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entity', 'entity_id', 'id'], name='catalog_change_entity_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
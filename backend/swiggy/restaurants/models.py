@@ -0,0 +1,115 @@
+from django.db import models
+
+
+class Restaurant(models.Model):
+    # Primary keys mirror the catalog ids the frontend already uses
+    name = models.CharField(max_length=255)
+    cloudinary_image_id = models.CharField(max_length=255, blank=True)
+    locality = models.CharField(max_length=255, blank=True)
+    area_name = models.CharField(max_length=255, blank=True)
+    cuisines = models.JSONField(default=list, blank=True)
+    cost_for_two = models.PositiveIntegerField(default=0)
+    avg_rating = models.DecimalField(max_digits=2, decimal_places=1, default=0)
+    total_ratings = models.PositiveIntegerField(default=0)
+    delivery_time = models.PositiveIntegerField(default=0)
+    prep_time = models.PositiveIntegerField(default=15)  # Minutes before a rider can pick up
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    is_open = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Changes to these move a restaurant on the map or in or out of listings
+    GEO_FIELDS = ('latitude', 'longitude', 'prep_time', 'is_open')
+    # Changes to these only reorder ranked listings
+    RANKING_FIELDS = ('avg_rating', 'total_ratings', 'cost_for_two')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember tracked fields as loaded so signals can detect transitions
+        instance._loaded_state = {
+            name: value for name, value in zip(field_names, values) if name in cls.GEO_FIELDS + cls.RANKING_FIELDS
+        }
+        return instance
+
+    def __str__(self):
+        return self.name
+
+
+class MenuItem(models.Model):
+    restaurant = models.ForeignKey(Restaurant, related_name='menu_items', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    price = models.PositiveIntegerField(default=0)  # In paise, as in the catalog payload
+    image_id = models.CharField(max_length=255, blank=True)
+    is_veg = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.name}"
+
+
+class OpeningHours(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+
+    # Local time in OPENING_HOURS['TIME_ZONE']. An interval closing at or
+    # before its opening time runs past midnight. Restaurants without any
+    # rows are not restricted by a schedule
+    restaurant = models.ForeignKey(Restaurant, related_name='opening_hours', on_delete=models.CASCADE)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    opens_at = models.TimeField()
+    closes_at = models.TimeField()
+
+    class Meta:
+        ordering = ['restaurant', 'weekday', 'opens_at']
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.get_weekday_display()} {self.opens_at}-{self.closes_at}"
+
+
+class OpeningHoursOverride(models.Model):
+    # Replaces the weekly intervals starting on this date (holidays,
+    # special hours). A row without times closes the restaurant all day
+    restaurant = models.ForeignKey(Restaurant, related_name='hours_overrides', on_delete=models.CASCADE)
+    date = models.DateField(db_index=True)
+    opens_at = models.TimeField(null=True, blank=True)
+    closes_at = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.date} {self.opens_at or 'closed'}-{self.closes_at or ''}"
+
+
+class CatalogChange(models.Model):
+    # Append-only change log; the id is the version clients sync from.
+    # Compaction keeps only the newest row per entity
+    ENTITY_CHOICES = [('restaurant', 'Restaurant'), ('menu_item', 'Menu item')]
+    OP_CHOICES = [('upsert', 'Upsert'), ('delete', 'Delete')]
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entity', 'entity_id', 'id'], name='catalog_change_entity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {self.op} {self.entity} {self.entity_id}"
+
+
+class CatalogCompaction(models.Model):
+    # Versions below horizon may have lost tombstones; older clients resync
+    horizon = models.BigIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"horizon {self.horizon} ({self.removed} rows removed)"
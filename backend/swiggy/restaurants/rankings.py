@@ -0,0 +1,230 @@
+import numpy as np
+from django.conf import settings
+
+from core.caching import get_tiered_cache
+
+from .eta import catalog_version, compute_quotes, geo_cell, load_catalog
+from .models import Restaurant
+from .trending import trending_scores
+
+SEQUENCE_KEY = 'restaurants:ranking:seq'
+SORT_KEYS = ('rating', 'eta', 'cost', 'popularity', 'trending')
+
+
+def _delta_key(seq):
+    return f'restaurants:ranking:delta:{seq}'
+
+
+def listing_key(cell, sort):
+    return f'restaurants:ranking:{cell}:{sort}:{catalog_version()}'
+
+
+def rank_values(sort, avg_rating, total_ratings, cost_for_two, eta_minutes, distance_km):
+    """
+    One ascending float64 per restaurant for ``sort``, packing the primary
+    and tie-breaking criteria so a listing is a single sorted array (all
+    packed values stay below 2**53, so they are exact):
+
+    - ``rating``: highest rating, then most ratings
+    - ``eta``: fastest delivery, then nearest
+    - ``cost``: cheapest for two, then fastest
+    - ``popularity``: most ratings, then highest rating
+
+    ``trending`` listings are derived from the ``eta`` listing instead, see
+    ``trending_listing``.
+    """
+    rating = np.round(np.asarray(avg_rating, dtype=np.float64) * 10)
+    total = np.asarray(total_ratings, dtype=np.float64)
+    if sort == 'rating':
+        return -(rating * 1e10 + np.minimum(total, 1e10 - 1))
+    if sort == 'eta':
+        return np.asarray(eta_minutes, dtype=np.float64) * 1e4 + np.round(np.asarray(distance_km) * 10)
+    if sort == 'cost':
+        return np.asarray(cost_for_two, dtype=np.float64) * 1e4 + np.minimum(eta_minutes, 9999)
+    if sort == 'popularity':
+        return -(total * 100 + rating)
+    raise ValueError(f'Unknown sort: {sort}')
+
+
+def current_seq():
+    return get_tiered_cache().get(SEQUENCE_KEY) or 0
+
+
+def record_score_change(restaurant):
+    """
+    Queue a rating/cost change for cached listings to patch in on their
+    next read, instead of rebuilding every listing of every cell.
+    """
+    cache = get_tiered_cache()
+    seq = cache.incr(SEQUENCE_KEY, timeout=None)
+    cache.set(
+        _delta_key(seq),
+        (restaurant.pk, float(restaurant.avg_rating), restaurant.total_ratings, restaurant.cost_for_two),
+        timeout=settings.RANKINGS['DELTA_TIMEOUT'],
+    )
+
+
+def _build(lat, lng, sort, seq):
+    quotes = compute_quotes(lat, lng, load_catalog())
+    ids = quotes['ids']
+    scores = {
+        row[0]: row[1:] for row in
+        Restaurant.objects.filter(id__in=ids.tolist()).values_list('id', 'avg_rating', 'total_ratings', 'cost_for_two')
+    }
+    present = np.array([i in scores for i in ids.tolist()], dtype=bool)
+    ids = ids[present]
+    rows = [scores[i] for i in ids.tolist()]
+    avg_rating = np.array([float(row[0]) for row in rows], dtype=np.float64)
+    total_ratings = np.array([row[1] for row in rows], dtype=np.float64)
+    cost_for_two = np.array([row[2] for row in rows], dtype=np.float64)
+    eta, distance, fee = quotes['eta_minutes'][present], quotes['distance_km'][present], quotes['fee'][present]
+
+    values = rank_values(sort, avg_rating, total_ratings, cost_for_two, eta, distance)
+    order = np.lexsort((ids, values))
+    return {
+        'seq': seq,
+        'values': values[order],
+        'ids': ids[order],
+        'avg_rating': avg_rating[order],
+        'total_ratings': total_ratings[order],
+        'cost_for_two': cost_for_two[order],
+        'eta_minutes': eta[order],
+        'distance_km': distance[order],
+        'fee': fee[order],
+    }
+
+
+def _apply_deltas(listing, sort, deltas):
+    """
+    Move each changed restaurant to its new position: one removal and one
+    ``searchsorted`` insertion per change, on copies of the arrays (cached
+    listings may be shared with other threads through the local tier).
+    """
+    listing = dict(listing)
+    for restaurant_id, avg_rating, total_ratings, cost_for_two in deltas:
+        positions = np.flatnonzero(listing['ids'] == restaurant_id)
+        if not len(positions):
+            continue
+        old = positions[0]
+        row = {name: array[old] for name, array in listing.items() if isinstance(array, np.ndarray)}
+        row.update(avg_rating=avg_rating, total_ratings=total_ratings, cost_for_two=cost_for_two)
+        row['values'] = rank_values(
+            sort, row['avg_rating'], row['total_ratings'], row['cost_for_two'], row['eta_minutes'], row['distance_km'],
+        ).item()
+        remaining = {name: np.delete(array, old) for name, array in listing.items() if isinstance(array, np.ndarray)}
+        new = _position(remaining['values'], remaining['ids'], row['values'], restaurant_id)
+        for name, array in remaining.items():
+            listing[name] = np.insert(array, new, row[name])
+    return listing
+
+
+def _catch_up(cache, listing, sort, seq, max_deltas):
+    """Patch ``listing`` up to ``seq``, or return None if it must be rebuilt."""
+    wanted = [_delta_key(s) for s in range(listing['seq'] + 1, seq + 1)]
+    # Empty when the counter went backwards (evicted or flushed)
+    if not wanted or len(wanted) > max_deltas:
+        return None
+    deltas = cache.get_many(wanted)
+    if len(deltas) < len(wanted):
+        return None
+    listing = _apply_deltas(listing, sort, [deltas[key] for key in wanted])
+    listing['seq'] = seq
+    return listing
+
+
+def _position(values, ids, value, restaurant_id):
+    """Index of the first entry ordered after ``(value, restaurant_id)``."""
+    start = np.searchsorted(values, value, side='left')
+    end = np.searchsorted(values, value, side='right')
+    return start + int(np.searchsorted(ids[start:end], restaurant_id, side='right'))
+
+
+def get_listing(lat, lng, sort):
+    """
+    The ranked listing of the geo cell containing ``(lat, lng)``.
+
+    Listings are cached per cell, sort key and catalog version (so opening,
+    closing or moving a restaurant rebuilds them), and rating/cost changes
+    are patched in from the delta queue. A listing rebuilds from scratch
+    only when deltas it needs have expired or the queue is too far ahead.
+    ETAs, distances and fees are measured from the cell, not the exact point.
+    """
+    if sort == 'trending':
+        return trending_listing(lat, lng)
+    options = settings.RANKINGS
+    cache = get_tiered_cache()
+    cell = geo_cell(lat, lng)
+    key = listing_key(cell, sort)
+    seq = current_seq()
+    listing = cache.get(key)
+
+    if listing is not None and listing['seq'] != seq:
+        listing = _catch_up(cache, listing, sort, seq, options['MAX_DELTAS'])
+        if listing is not None:
+            cache.set(key, listing, timeout=options['CACHE_TIMEOUT'])
+
+    if listing is None:
+        # Center of the cell, so every point in it shares the listing
+        size = settings.DELIVERY['CELL_DEGREES']
+        row, column = (int(part) for part in cell.split(':'))
+        listing = _build((row + 0.5) * size, (column + 0.5) * size, sort, seq)
+        cache.set(key, listing, timeout=options['CACHE_TIMEOUT'])
+    return listing
+
+
+def trending_listing(lat, lng):
+    """
+    The cell's ``eta`` listing reordered by trending score (fastest first
+    among equals), rebuilt from the event counters every ``MERGED_TTL``.
+    """
+    cache = get_tiered_cache()
+    key = listing_key(geo_cell(lat, lng), 'trending')
+    listing = cache.get(key)
+    if listing is None:
+        base = get_listing(lat, lng, 'eta')
+        scores = np.minimum(np.array(trending_scores(base['ids'].tolist()), dtype=np.float64), 1e7)
+        # eta values stay below 1e8, so the score leads and ETA breaks ties
+        values = -scores * 1e8 + base['values']
+        order = np.lexsort((base['ids'], values))
+        listing = {name: array[order] for name, array in base.items() if isinstance(array, np.ndarray)}
+        listing.update(seq=base['seq'], values=values[order])
+        cache.set(key, listing, timeout=settings.COUNTERS['MERGED_TTL'])
+    return listing
+
+
+def encode_cursor(value, restaurant_id):
+    return f'{value!r}_{restaurant_id}'
+
+
+def decode_cursor(cursor):
+    value, restaurant_id = cursor.rsplit('_', 1)
+    return float(value), int(restaurant_id)
+
+
+def read_page(listing, sort, limit, cursor=None, min_rating=None):
+    """
+    One page of ``listing`` after ``cursor``: two binary searches and a
+    slice. ``min_rating`` is a range bound on the rating listing, where
+    ratings are the leading sort criterion.
+
+    Returns:
+        tuple: ``(rows, next_cursor, count)``; ``next_cursor`` is None on
+        the last page
+    """
+    end = len(listing['ids'])
+    if min_rating is not None and sort == 'rating':
+        # Every packed value at or below this has at least min_rating
+        end = int(np.searchsorted(listing['values'], -(round(min_rating * 10) * 1e10), side='right'))
+    start = 0 if cursor is None else _position(listing['values'], listing['ids'], *cursor)
+    stop = min(start + limit, end)
+    rows = [
+        {
+            'id': int(listing['ids'][i]),
+            'distance_km': float(listing['distance_km'][i]),
+            'eta_minutes': int(listing['eta_minutes'][i]),
+            'delivery_fee': float(listing['fee'][i]),
+        }
+        for i in range(start, stop)
+    ]
+    next_cursor = encode_cursor(float(listing['values'][stop - 1]), rows[-1]['id']) if rows and stop < end else None
+    return rows, next_cursor, end
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
+from .models import MenuItem, Restaurant
+
+
+class RestaurantCardSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Restaurant
+        fields = [
+            'id', 'name', 'cloudinary_image_id', 'locality', 'area_name', 'cuisines',
+            'cost_for_two', 'avg_rating', 'total_ratings', 'delivery_time', 'is_open',
+        ]
+
+
+class MenuItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = MenuItem
+        fields = ['id', 'restaurant', 'name', 'description', 'category', 'price', 'image_id', 'is_veg']
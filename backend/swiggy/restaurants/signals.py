@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .changes import MENU_ITEM, RESTAURANT, record_change
+from .loaders import invalidate_restaurants
+from .models import MenuItem, OpeningHours, OpeningHoursOverride, Restaurant
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, instance, created=False, **kwargs):
+    # Imported here so numpy is not loaded at startup by every process
+    from .eta import bump_catalog_version
+    from .rankings import record_score_change
+
+    invalidate_restaurants([instance.pk])
+    loaded = getattr(instance, '_loaded_state', None)
+    if created or kwargs['signal'] is post_delete or loaded is None:
+        bump_catalog_version()
+        return
+    changed = {name for name, value in loaded.items() if getattr(instance, name) != value}
+    if changed & set(Restaurant.GEO_FIELDS):
+        bump_catalog_version()
+    elif changed & set(Restaurant.RANKING_FIELDS):
+        # Rating updates reorder cached listings without invalidating them
+        transaction.on_commit(lambda: record_score_change(instance))
+    instance._loaded_state = {name: getattr(instance, name) for name in loaded}
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+def log_catalog_upsert(sender, instance, **kwargs):
+    record_change(RESTAURANT if sender is Restaurant else MENU_ITEM, instance.pk)
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+def log_catalog_delete(sender, instance, **kwargs):
+    record_change(RESTAURANT if sender is Restaurant else MENU_ITEM, instance.pk, op='delete')
+
+
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=OpeningHoursOverride)
+@receiver(post_delete, sender=OpeningHoursOverride)
+def recompile_hours(sender, **kwargs):
+    # Imported here so numpy is not loaded at startup by every process
+    from .hours import bump_hours_version
+
+    transaction.on_commit(bump_hours_version)
@@ -0,0 +1,262 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.caching import get_tiered_cache
+from user_auth import tokens
+from user_auth.models import Address, User
+
+from .changes import MENU_ITEM, RESTAURANT, changes_since, compact, encode_token
+from .eta import geo_cell
+from .hours import HoursIndex, compile_overrides, schedule_zone
+from .models import CatalogChange, Restaurant
+from .rankings import current_seq, decode_cursor, get_listing, listing_key, read_page
+
+BATCH_URL = '/api/restaurants/batch/'
+LIST_URL = '/api/restaurants/'
+CHANGES_URL = '/api/restaurants/changes/'
+
+
+def log(*changes, age=60):
+    """Change rows, old enough to be past the settle window."""
+    rows = CatalogChange.objects.bulk_create([
+        CatalogChange(entity=entity, entity_id=entity_id, op=op) for entity, entity_id, op in changes
+    ])
+    CatalogChange.objects.filter(id__in=[row.id for row in rows]).update(
+        created_at=timezone.now() - timedelta(seconds=age),
+    )
+
+
+class RestaurantBatchTests(TestCase):
+    def setUp(self):
+        Restaurant.objects.create(pk=7, name='Idli House')
+
+    def test_returns_found_and_missing_in_request_order(self):
+        response = self.client.get(BATCH_URL, {'ids': '8, 7,8'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([card['id'] for card in body['results']], [7])
+        self.assertEqual(body['missing'], [8])
+
+    def test_rejects_ids_outside_the_bigint_range(self):
+        for ids in ('abc', '0', '-5', str(2 ** 63), f'7,{10 ** 30}'):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.client.get(BATCH_URL, {'ids': ids}).status_code, 400)
+
+
+class RestaurantListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('nearby@example.com', 'secret-pass', phone='9000000040')
+        self.address = Address.objects.create(user=user, latitude=12.97, longitude=77.59)
+        for pk in range(1, 4):
+            Restaurant.objects.create(pk=pk, name=f'Nearby {pk}', latitude=12.97 + pk / 1000, longitude=77.59)
+        token = tokens.ServiceRefreshToken.for_user(user).access_token
+        tokens.get_writer().flush()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def page(self, limit):
+        response = self.client.get(LIST_URL, {'address_id': self.address.pk, 'limit': limit}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return [card['id'] for card in response.json()['results']]
+
+    def test_pages_by_eta(self):
+        self.assertEqual(self.page(2), [1, 2])
+
+    def test_limit_below_one_returns_one_row(self):
+        # A negative limit must not slice to the end of the catalog
+        for limit in (0, -1):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.page(limit), [1])
+
+
+class RankingTests(TestCase):
+    # Center of a geo cell, so the listing is built from this exact point
+    LAT, LNG = 12.975, 77.595
+
+    def setUp(self):
+        cache.clear()
+        get_tiered_cache().clear()
+        for pk, rating, total, cost in (
+            (1, '4.0', 100, 300), (2, '4.5', 20, 400), (3, '3.9', 300, 200), (4, '4.0', 50, 250), (5, '3.5', 10, 600),
+        ):
+            Restaurant.objects.create(
+                pk=pk, name=f'Ranked {pk}', latitude=12.97 + pk / 1000, longitude=77.59,
+                avg_rating=Decimal(rating), total_ratings=total, cost_for_two=cost,
+            )
+
+    def test_score_changes_reorder_like_a_rebuild(self):
+        sorts = ('rating', 'cost', 'popularity')
+        for sort in sorts:
+            get_listing(self.LAT, self.LNG, sort)
+        with self.captureOnCommitCallbacks(execute=True):
+            # The last one ties restaurant 2 on every criterion, so ids break the tie
+            for pk, rating, total, cost in ((1, '4.9', 10, 500), (4, '3.0', 500, 150), (3, '4.5', 20, 400)):
+                restaurant = Restaurant.objects.get(pk=pk)
+                restaurant.avg_rating, restaurant.total_ratings, restaurant.cost_for_two = Decimal(rating), total, cost
+                restaurant.save()
+
+        for sort in sorts:
+            with self.subTest(sort=sort):
+                with self.assertNumQueries(0):
+                    patched = get_listing(self.LAT, self.LNG, sort)
+                self.assertEqual(patched['seq'], current_seq())
+                get_tiered_cache().delete(listing_key(geo_cell(self.LAT, self.LNG), sort))
+                rebuilt = get_listing(self.LAT, self.LNG, sort)
+                for name in ('ids', 'values', 'avg_rating', 'total_ratings', 'cost_for_two', 'eta_minutes'):
+                    self.assertEqual(patched[name].tolist(), rebuilt[name].tolist(), name)
+        self.assertEqual(patched['ids'].tolist(), [4, 2, 3, 1, 5])
+        self.assertEqual(get_listing(self.LAT, self.LNG, 'rating')['ids'].tolist(), [1, 2, 3, 5, 4])
+
+    def test_cursor_pages_through_the_listing(self):
+        listing = get_listing(self.LAT, self.LNG, 'rating')
+        seen, cursor = [], None
+        while True:
+            rows, next_cursor, count = read_page(listing, 'rating', 2, cursor)
+            self.assertEqual(count, 5)
+            seen.extend(row['id'] for row in rows)
+            if next_cursor is None:
+                break
+            cursor = decode_cursor(next_cursor)
+        self.assertEqual(seen, [2, 1, 4, 3, 5])
+
+    def test_min_rating_bounds_the_rating_listing(self):
+        listing = get_listing(self.LAT, self.LNG, 'rating')
+        rows, next_cursor, count = read_page(listing, 'rating', 2, min_rating=4.0)
+        self.assertEqual(([row['id'] for row in rows], count), ([2, 1], 3))
+        rows, next_cursor, _ = read_page(listing, 'rating', 2, decode_cursor(next_cursor), min_rating=4.0)
+        self.assertEqual(([row['id'] for row in rows], next_cursor), ([4], None))
+        self.assertEqual(read_page(listing, 'rating', 10, min_rating=4.6)[::2], ([], 0))
+
+
+class HoursIndexTests(SimpleTestCase):
+    # Built on Monday 2026-10-19, so overrides up to 2026-11-02 are compiled
+    TODAY = date(2026, 10, 19)
+
+    def index(self, overrides=()):
+        hours = [
+            (1, 4, time(18), time(2)),  # Friday night into Saturday
+            (2, 6, time(20), time(3)),  # Sunday night into Monday
+            (3, 0, time(9, 10), time(17, 20)),  # Mondays, boundaries inside buckets
+        ]
+        # Restaurant 4 has no weekly schedule
+        return HoursIndex(
+            hours, compile_overrides(overrides), 15, self.TODAY - timedelta(days=1), self.TODAY + timedelta(days=14),
+        )
+
+    def closed(self, index, day, at):
+        return index.closed_ids(datetime.combine(day, at, tzinfo=schedule_zone())).tolist()
+
+    def test_overnight_and_week_wrapping_intervals(self):
+        index = self.index()
+        for day, at, closed in (
+            (date(2026, 10, 30), time(17, 59), [1, 2, 3]),
+            (date(2026, 10, 30), time(19), [2, 3]),
+            (date(2026, 10, 31), time(1, 59), [2, 3]),
+            (date(2026, 10, 31), time(2), [1, 2, 3]),
+            (date(2026, 11, 1), time(23), [1, 3]),
+            (date(2026, 11, 2), time(2, 30), [1, 3]),
+            (date(2026, 11, 2), time(3), [1, 2, 3]),
+            (date(2026, 11, 2), time(9, 5), [1, 2, 3]),
+            (date(2026, 11, 2), time(9, 10), [1, 2]),
+            (date(2026, 11, 2), time(17, 19), [1, 2]),
+            (date(2026, 11, 2), time(17, 20), [1, 2, 3]),
+        ):
+            with self.subTest(day=day, at=at):
+                self.assertEqual(self.closed(index, day, at), closed)
+        # Read in the schedule's time zone: 23:30 on Sunday in Kolkata
+        self.assertEqual(index.closed_ids(datetime(2026, 11, 1, 18, tzinfo=ZoneInfo('UTC'))).tolist(), [1, 3])
+
+    def test_holiday_overrides(self):
+        index = self.index([
+            (1, date(2026, 10, 23), None, None),
+            (3, date(2026, 10, 26), time(12), time(22)),
+            (4, date(2026, 10, 21), time(10), time(12)),
+        ])
+        for day, at, closed in (
+            # Closed all Friday, including the night running into Saturday
+            (date(2026, 10, 23), time(19), [1, 2, 3]),
+            (date(2026, 10, 24), time(1), [1, 2, 3]),
+            # Other hours on one Monday, the usual ones on the next
+            (date(2026, 10, 26), time(10), [1, 2, 3]),
+            (date(2026, 10, 26), time(20), [1, 2]),
+            (date(2026, 11, 2), time(10), [1, 2]),
+            # Unscheduled restaurants are only closed by an override
+            (date(2026, 10, 21), time(11), [1, 2, 3]),
+            (date(2026, 10, 21), time(13), [1, 2, 3, 4]),
+            (date(2026, 10, 22), time(13), [1, 2, 3]),
+        ):
+            with self.subTest(day=day, at=at):
+                self.assertEqual(self.closed(index, day, at), closed)
+
+
+class ChangeFeedTests(TestCase):
+    def test_pages_and_resumes_from_the_version(self):
+        log(*[(RESTAURANT, i, 'upsert') for i in range(1, 6)])
+        first = changes_since(None, 3)
+        self.assertTrue(first['has_more'])
+        self.assertEqual(first['upserts'][RESTAURANT], [1, 2, 3])
+        second = changes_since(first['version'], 3)
+        self.assertEqual((second['has_more'], second['reset']), (False, False))
+        self.assertEqual(second['upserts'][RESTAURANT], [4, 5])
+        self.assertEqual(changes_since(second['version'], 3)['version'], second['version'])
+
+    def test_collapses_to_the_latest_operation(self):
+        log((RESTAURANT, 1, 'upsert'), (MENU_ITEM, 9, 'upsert'), (RESTAURANT, 1, 'delete'))
+        page = changes_since(None, 10)
+        self.assertEqual(page['upserts'], {RESTAURANT: [], MENU_ITEM: [9]})
+        self.assertEqual(page['deletes'], {RESTAURANT: [1], MENU_ITEM: []})
+
+    def test_holds_back_rows_inside_the_settle_window(self):
+        log((RESTAURANT, 1, 'upsert'))
+        log((RESTAURANT, 2, 'upsert'), age=0)
+        log((RESTAURANT, 3, 'upsert'))
+        page = changes_since(None, 10)
+        self.assertEqual(page['upserts'][RESTAURANT], [1])
+        self.assertFalse(page['has_more'])
+
+    def test_compaction_of_superseded_rows_keeps_clients(self):
+        log((RESTAURANT, 1, 'upsert'), (RESTAURANT, 2, 'upsert'))
+        version = changes_since(None, 10)['version']
+        log((RESTAURANT, 1, 'upsert'))
+        compact()
+        page = changes_since(version, 10)
+        self.assertFalse(page['reset'])
+        self.assertEqual(page['upserts'][RESTAURANT], [1])
+
+    def test_client_behind_dropped_tombstones_resets(self):
+        log((RESTAURANT, 1, 'upsert'))
+        version = changes_since(None, 10)['version']
+        log((RESTAURANT, 2, 'delete'), age=40 * 24 * 3600)
+        log((RESTAURANT, 3, 'upsert'))
+        compact()
+        page = changes_since(version, 10)
+        self.assertTrue(page['reset'])
+        # Replayed from the start, without the tombstone the client never saw
+        self.assertEqual(page['upserts'][RESTAURANT], [1, 3])
+        self.assertEqual(page['deletes'][RESTAURANT], [])
+        # The new token carries the new epoch, so no second reset
+        self.assertFalse(changes_since(page['version'], 10)['reset'])
+
+    def test_client_ahead_of_compaction_horizon_does_not_reset(self):
+        log((RESTAURANT, 1, 'delete'), age=40 * 24 * 3600)
+        log((RESTAURANT, 2, 'upsert'))
+        version = changes_since(None, 10)['version']
+        compact()
+        self.assertFalse(changes_since(version, 10)['reset'])
+
+    def test_token_beyond_the_log_starts_over(self):
+        log((RESTAURANT, 1, 'upsert'))
+        page = changes_since(encode_token(0, 1000), 10)
+        self.assertEqual((page['reset'], page['has_more'], page['version']), (True, True, encode_token(0, 0)))
+        self.assertEqual(changes_since(page['version'], 10)['upserts'][RESTAURANT], [1])
+
+    def test_malformed_tokens(self):
+        for token in ('abc', '1', '1.2.3', '-1.5'):
+            with self.subTest(token=token), self.assertRaises(ValueError):
+                changes_since(token, 10)
+        self.assertEqual(self.client.get(CHANGES_URL, {'since': 'abc'}).status_code, 400)
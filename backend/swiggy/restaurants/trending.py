@@ -0,0 +1,59 @@
+import numpy as np
+from django.conf import settings
+
+from core.counters import get_counters
+from core.sketches import HyperLogLog
+
+from .eta import load_catalog
+
+EVENTS = ('menu_view', 'cart_add')
+
+
+def record_event(event, restaurant_id, user_key):
+    get_counters().record(event, restaurant_id, user_key)
+
+
+def listed(restaurant_ids):
+    """Whether each id is a listed (open, geocoded) restaurant, from the cached catalog."""
+    return np.isin(restaurant_ids, load_catalog()['ids']).tolist()
+
+
+def trending_scores(restaurant_ids):
+    """Weighted event counts over the window for each id (0 when unseen)."""
+    counters = get_counters()
+    weights = settings.COUNTERS['TRENDING_WEIGHTS']
+    windows = [(counters.window(event), weight) for event, weight in weights.items()]
+    return [
+        sum(window.counts.estimate(str(restaurant_id)) * weight for window, weight in windows)
+        for restaurant_id in restaurant_ids
+    ]
+
+
+def top_trending(limit, event=None):
+    """
+    The restaurants with the highest trending score, or the most ``event``
+    occurrences when one event type is given.
+
+    Returns:
+        list: dicts with ``id``, ``score`` and ``unique_users`` (estimates)
+    """
+    counters = get_counters()
+    weights = {event: 1} if event else settings.COUNTERS['TRENDING_WEIGHTS']
+    windows = [(counters.window(name), weight) for name, weight in weights.items()]
+    candidates = set().union(*(window.key_users for window, _ in windows))
+
+    scored = []
+    for key in candidates:
+        score = sum(window.counts.estimate(key) * weight for window, weight in windows)
+        scored.append((score, key))
+    scored.sort(key=lambda pair: (-pair[0], int(pair[1])))
+
+    results = []
+    for score, key in scored[:limit]:
+        # Merged into a fresh counter; the window sketches are shared and cached
+        users = HyperLogLog(settings.COUNTERS['KEY_HLL_PRECISION'])
+        for window, _ in windows:
+            if key in window.key_users:
+                users.merge(window.key_users[key])
+        results.append({'id': int(key), 'score': score, 'unique_users': users.count()})
+    return results
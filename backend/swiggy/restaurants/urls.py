@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.RestaurantListView.as_view(), name='restaurant_list'),
+    path('batch/', views.RestaurantBatchView.as_view(), name='restaurant_batch'),
+    path('ranked/', views.RankedRestaurantsView.as_view(), name='restaurant_ranked'),
+    path('trending/', views.TrendingRestaurantsView.as_view(), name='restaurant_trending'),
+    path('events/', views.RestaurantEventsView.as_view(), name='restaurant_events'),
+    path('changes/', views.CatalogChangesView.as_view(), name='catalog_changes'),
+]
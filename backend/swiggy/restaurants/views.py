@@ -0,0 +1,297 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
+
+from user_auth.models import Address
+
+from .changes import MENU_ITEM, RESTAURANT, changes_since
+from .eta import quotes_for_address
+from .hours import only_open, schedule_zone
+from .loaders import RestaurantLoader
+from .models import MenuItem
+from .rankings import SORT_KEYS, decode_cursor, get_listing, read_page
+from .serializers import MenuItemSerializer
+from .trending import EVENTS, listed, record_event, top_trending
+
+MAX_BATCH_IDS = 100
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_EVENTS = 100
+# Largest value a bigint primary key can hold; larger ids fail in the database
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_ids(raw):
+    """
+    Parse a comma-separated id list, preserving first-seen order.
+
+    Raises:
+        ValueError: An id is not an integer in 1..MAX_ID
+    """
+    ids = []
+    seen = set()
+    for part in raw.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        value = int(part)
+        if not 1 <= value <= MAX_ID:
+            raise ValueError(part)
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+    return ids
+
+
+def parse_open_at(params):
+    """
+    The moment listings should be filtered to open restaurants at:
+    ``open_now=1``, or an ISO 8601 ``open_at`` (naive times are in the
+    schedules' time zone). None when neither is given.
+
+    Raises:
+        ValueError: ``open_at`` is not a datetime
+    """
+    if params.get('open_at'):
+        at = parse_datetime(params['open_at'])
+        if at is None:
+            raise ValueError(params['open_at'])
+        return at if timezone.is_aware(at) else timezone.make_aware(at, schedule_zone())
+    if params.get('open_now') in ('1', 'true'):
+        return timezone.now()
+    return None
+
+
+# Batch restaurant cards - one round trip for a whole listing page
+class RestaurantBatchView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            ids = parse_ids(request.query_params.get('ids', ''))
+        except ValueError:
+            return Response({'detail': 'ids must be a comma-separated list of positive integers.'}, status=400)
+        if not ids:
+            return Response({'detail': 'ids is required.'}, status=400)
+        if len(ids) > MAX_BATCH_IDS:
+            return Response({'detail': f'At most {MAX_BATCH_IDS} ids per request.'}, status=400)
+
+        loader = RestaurantLoader.for_request(request)
+        loader.load_many(ids)
+        resolved = loader.dispatch()
+
+        return Response({
+            'results': [resolved[i] for i in ids if resolved[i] is not None],
+            'missing': [i for i in ids if resolved[i] is None],
+        })
+
+
+# Restaurants deliverable to one of the user's addresses, sorted by ETA
+# (open_now / open_at filter as in RankedRestaurantsView)
+class RestaurantListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            address_id = int(request.query_params.get('address_id', ''))
+            limit = max(min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE), 1)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'detail': 'address_id, limit and offset must be integers.'}, status=400)
+        try:
+            open_at = parse_open_at(request.query_params)
+        except ValueError:
+            return Response({'detail': 'open_at must be an ISO 8601 datetime.'}, status=400)
+
+        try:
+            address = Address.objects.get(id=address_id, user=request.user)
+        except Address.DoesNotExist:
+            return Response({'detail': 'Address not found.'}, status=404)
+
+        quotes = quotes_for_address(address)
+        if quotes is None:
+            return Response({'detail': 'Address has no coordinates yet.'}, status=409)
+        if open_at is not None:
+            quotes = only_open(quotes, open_at)
+
+        page = slice(offset, offset + limit)
+        ids = quotes['ids'][page].tolist()
+        loader = RestaurantLoader.for_request(request)
+        loader.load_many(ids)
+        cards = loader.dispatch()
+
+        results = []
+        for restaurant_id, distance, eta, fee in zip(
+            ids,
+            quotes['distance_km'][page].tolist(),
+            quotes['eta_minutes'][page].tolist(),
+            quotes['fee'][page].tolist(),
+        ):
+            card = cards.get(restaurant_id)
+            if card is None:
+                continue
+            results.append({**card, 'distance_km': distance, 'eta_minutes': eta, 'delivery_fee': fee})
+
+        return Response({'count': len(quotes['ids']), 'results': results})
+
+
+# Restaurants near a point or saved address in one ranked order
+# (rating, eta, cost, popularity or trending), paginated with a keyset cursor,
+# optionally only those open now or at open_at
+class RankedRestaurantsView(APIView):
+    permission_classes = [permissions.AllowAny]
+    # Cold path: the user and the address, the catalog and scores when the
+    # cell's listing is rebuilt, opening hours and overrides when their
+    # index is, and the cards
+    query_budget = 7
+
+    def get(self, request):
+        params = request.query_params
+        sort = params.get('sort', 'rating')
+        if sort not in SORT_KEYS:
+            return Response({'detail': f"sort must be one of: {', '.join(SORT_KEYS)}."}, status=400)
+        try:
+            limit = max(min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE), 1)
+            min_rating = float(params['min_rating']) if params.get('min_rating') else None
+            cursor = decode_cursor(params['cursor']) if params.get('cursor') else None
+            open_at = parse_open_at(params)
+        except ValueError:
+            return Response({'detail': 'limit, min_rating, cursor or open_at are malformed.'}, status=400)
+        if min_rating is not None and sort != 'rating':
+            return Response({'detail': 'min_rating is only supported with sort=rating.'}, status=400)
+
+        if params.get('address_id'):
+            if not request.user.is_authenticated:
+                return Response({'detail': 'Authentication required for address_id.'}, status=401)
+            try:
+                address = Address.objects.get(id=int(params['address_id']), user=request.user)
+            except (ValueError, Address.DoesNotExist):
+                return Response({'detail': 'Address not found.'}, status=404)
+            lat, lng = address.latitude, address.longitude
+            if lat is None or lng is None:
+                return Response({'detail': 'Address has no coordinates yet.'}, status=409)
+        else:
+            try:
+                lat, lng = float(params['lat']), float(params['lng'])
+            except (KeyError, ValueError):
+                return Response({'detail': 'address_id or lat and lng are required.'}, status=400)
+
+        listing = get_listing(lat, lng, sort)
+        if open_at is not None:
+            listing = only_open(listing, open_at)
+        rows, next_cursor, count = read_page(listing, sort, limit, cursor, min_rating)
+        loader = RestaurantLoader.for_request(request)
+        loader.load_many([row['id'] for row in rows])
+        cards = loader.dispatch()
+
+        return Response({
+            'sort': sort,
+            'count': count,
+            'next_cursor': next_cursor,
+            'results': [{**cards[row['id']], **row} for row in rows if cards.get(row['id']) is not None],
+        })
+
+
+# Menu view / cart add beacons; counted in memory, never written per event
+class RestaurantEventsView(APIView):
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'restaurant_events'
+    # The user, and the catalog on a cache miss
+    query_budget = 2
+
+    def post(self, request):
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({'detail': 'events must be a non-empty list.'}, status=400)
+        if len(events) > MAX_EVENTS:
+            return Response({'detail': f'At most {MAX_EVENTS} events per request.'}, status=400)
+
+        parsed = []
+        for event in events:
+            try:
+                kind, restaurant_id = event['type'], int(event['restaurant_id'])
+            except (KeyError, TypeError, ValueError):
+                return Response({'detail': 'Each event needs a type and an integer restaurant_id.'}, status=400)
+            if kind not in EVENTS:
+                return Response({'detail': f"type must be one of: {', '.join(EVENTS)}."}, status=400)
+            parsed.append((kind, restaurant_id))
+        # Ids of no listed restaurant would only crowd real ones out of the sketches
+        parsed = [event for event, known in zip(parsed, listed([r for _, r in parsed])) if known]
+
+        # Unique users are counted per account, or per client address when anonymous
+        if request.user.is_authenticated:
+            user_key = f'user:{request.user.pk}'
+        else:
+            user_key = f"ip:{request.META.get('REMOTE_ADDR', '')}"
+        for kind, restaurant_id in parsed:
+            record_event(kind, restaurant_id, user_key)
+        return Response({'accepted': len(parsed)}, status=202)
+
+
+# Restaurants with the most views and cart adds over the last hour
+class TrendingRestaurantsView(APIView):
+    permission_classes = [permissions.AllowAny]
+    query_budget = 2
+
+    def get(self, request):
+        event = request.query_params.get('event') or None
+        if event is not None and event not in EVENTS:
+            return Response({'detail': f"event must be one of: {', '.join(EVENTS)}."}, status=400)
+        try:
+            limit = max(min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE), 1)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=400)
+
+        trending = top_trending(limit, event)
+        loader = RestaurantLoader.for_request(request)
+        loader.load_many([row['id'] for row in trending])
+        cards = loader.dispatch()
+        options = settings.COUNTERS
+        return Response({
+            'window_minutes': options['BUCKET_SECONDS'] * options['WINDOW_BUCKETS'] // 60,
+            'results': [{**cards[row['id']], **row} for row in trending if cards.get(row['id']) is not None],
+        })
+
+
+# Catalog changes since a client-held version, for offline delta sync
+class CatalogChangesView(APIView):
+    permission_classes = [permissions.AllowAny]
+    query_budget = 4
+
+    def get(self, request):
+        options = settings.CATALOG_CHANGES
+        try:
+            limit = min(int(request.query_params.get('limit', options['PAGE_SIZE'])), options['MAX_PAGE_SIZE'])
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=400)
+        try:
+            page = changes_since(request.query_params.get('since') or None, max(limit, 1))
+        except ValueError:
+            return Response({'detail': 'since must be a version token returned by this endpoint.'}, status=400)
+
+        loader = RestaurantLoader.for_request(request)
+        loader.load_many(page['upserts'][RESTAURANT])
+        cards = loader.dispatch()
+        menu_ids = page['upserts'][MENU_ITEM]
+        menu_items = MenuItemSerializer(MenuItem.objects.filter(id__in=menu_ids), many=True).data if menu_ids else []
+
+        # Rows deleted after this page was logged show up as deletes now
+        found_items = {item['id'] for item in menu_items}
+        deleted_restaurants = page['deletes'][RESTAURANT] + [
+            i for i in page['upserts'][RESTAURANT] if cards.get(i) is None
+        ]
+        deleted_items = page['deletes'][MENU_ITEM] + [i for i in menu_ids if i not in found_items]
+
+        return Response({
+            'version': page['version'],
+            'has_more': page['has_more'],
+            'reset': page['reset'],
+            'restaurants': [cards[i] for i in page['upserts'][RESTAURANT] if cards.get(i) is not None],
+            'menu_items': menu_items,
+            'deleted': {'restaurants': deleted_restaurants, 'menu_items': deleted_items},
+        })
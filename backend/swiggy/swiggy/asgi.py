@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'swiggy.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from realtime.streaming import StreamingRouter  # noqa: E402  (needs apps loaded)
+
+application = StreamingRouter(django_application)
+
+if settings.PREWARM_ON_BOOT:
+    from core.startup import prewarm
+
+    prewarm()
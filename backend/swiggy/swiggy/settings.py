@@ -12,10 +12,18 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# "full" keeps the admin and browsable API; "api" is a lean profile for
+# JWT-only workers that skips unused apps, middleware and the .env lookup
+SETTINGS_PROFILE = os.getenv('SETTINGS_PROFILE', 'full')
+if SETTINGS_PROFILE not in ('full', 'api'):
+    raise ValueError(f'Unknown SETTINGS_PROFILE: {SETTINGS_PROFILE}')
+
+# Load environment variables from .env file (API workers get theirs from
+# the process environment)
+if SETTINGS_PROFILE == 'full':
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,12 +58,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third-party apps
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     # Local apps
     'user_auth',
+    'realtime',
+    'restaurants',
+    'promotions',
+    'dispatch',
+    'images',
+    'core',
     'corsheaders',
 ]
 
@@ -66,6 +81,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Scopes of views with ScopedRateThrottle, per user or client address
+    'DEFAULT_THROTTLE_RATES': {
+        'restaurant_events': os.getenv('RESTAURANT_EVENTS_RATE', '120/min'),
+    },
 }
 
 from datetime import timedelta
@@ -76,12 +95,249 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Tokens are signed by user_auth.keys (RS256/EdDSA with a kid header),
+    # falling back to HS256 with SECRET_KEY until the first key is rotated in
+    'AUTH_TOKEN_CLASSES': ('user_auth.tokens.ServiceAccessToken',),
+    'TOKEN_OBTAIN_SERIALIZER': 'user_auth.serializers.ServiceTokenObtainPairSerializer',
+}
+
+# Asymmetric signing keys, published at /.well-known/jwks.json so other
+# services verify tokens locally. A rotated-in key is published PUBLISH_AHEAD
+# before it signs (more than JWKS_MAX_AGE, so cached key sets already have
+# it) and the key it replaces verifies until its last token expires
+SIGNING_KEYS = {
+    'ALGORITHM': os.getenv('JWT_SIGNING_ALGORITHM', 'RS256'),  # RS256 or EdDSA
+    'RSA_KEY_SIZE': 2048,
+    'ROTATION_DAYS': 30,
+    'PUBLISH_AHEAD': timedelta(hours=2),
+    'JWKS_MAX_AGE': 3600,
+    'VERIFY_GRACE_SECONDS': 300,
+    'UNKNOWN_KID_RELOAD_SECONDS': 30,
+    # HS256 tokens from before the first key; once it exists they are
+    # rejected unless this is on. Turn it on for one refresh lifetime when
+    # switching an existing deployment over, so its users stay signed in
+    'ACCEPT_HS256': os.getenv('JWT_ACCEPT_HS256', 'False') == 'True',
+    'PASSPHRASE': os.getenv('JWT_KEY_PASSPHRASE', ''),
+}
+
+# Shared cache: Redis when CACHE_REDIS_URL is set, otherwise a per-process
+# LocMemCache (local development and tests). Deployments with more than one
+# worker need Redis: rate limits, lockouts and token revocation markers only
+# reach every worker through it (refresh tokens fall back to the database)
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+            'KEY_PREFIX': 'swiggy',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'swiggy',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# In-process tier in front of CACHES[ALIAS] (see core.caching.TieredCache).
+# LOCAL_TTL bounds how long another worker can serve a value after it was
+# invalidated
+TIERED_CACHE = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_ENTRIES': int(os.getenv('TIERED_CACHE_LOCAL_MAX_ENTRIES', 10000)),
+    'LOCAL_TTL': float(os.getenv('TIERED_CACHE_LOCAL_TTL', 5)),
+    'LOCK_TIMEOUT': 10,  # Single-flight recompute lock
+}
+
+# Refresh service (user_auth.tokens): revocation is checked against cache
+# markers and a Bloom filter of blacklisted JTIs, and token rows are
+# written behind in batches
+REFRESH_TOKENS = {
+    'WRITE_BEHIND': os.getenv('REFRESH_WRITE_BEHIND', 'True') == 'True',
+    'WRITE_BEHIND_BATCH': 500,
+    'WRITE_BEHIND_INTERVAL': 1.0,  # Seconds between flushes
+    'BLOOM_CAPACITY': 100000,
+    'BLOOM_ERROR_RATE': 0.001,
+    'BLOOM_REBUILD_SECONDS': 300,
+    'USER_STATE_TIMEOUT': 300,  # Cached is_active per user
+}
+
+# Signup/verification/login rollups (user_auth.rollups), counted in memory
+# and applied to the daily and hourly rows every FLUSH_SECONDS
+USER_ROLLUPS = {
+    'BACKGROUND_FLUSH': os.getenv('USER_ROLLUPS_BACKGROUND_FLUSH', 'True') == 'True',
+    'FLUSH_SECONDS': 2.0,
+}
+
+# Admin audit log (user_auth.audit): entries are written behind in batches
+# into a table partitioned by month on PostgreSQL. manage.py audit_partitions
+# (daily from cron) creates MONTHS_AHEAD partitions and drops those older
+# than RETAIN_MONTHS
+AUDIT_LOG = {
+    'BACKGROUND_FLUSH': os.getenv('AUDIT_LOG_BACKGROUND_FLUSH', 'True') == 'True',
+    'BATCH_SIZE': 200,
+    'FLUSH_SECONDS': 2.0,
+    'MAX_PENDING': 10000,  # Kept across failed writes before the oldest are dropped
+    'MONTHS_AHEAD': 3,
+    'RETAIN_MONTHS': int(os.getenv('AUDIT_LOG_RETAIN_MONTHS', 24)),
+}
+
+# Scheduled purge (manage.py purge_stale_data, daily from cron) of accounts
+# never verified within UNVERIFIED_RETENTION_DAYS, refresh tokens expired
+# EXPIRED_TOKEN_GRACE_DAYS ago and orphaned addresses. Rows are deleted
+# BATCH_SIZE at a time, each batch in its own short transaction
+DATA_RETENTION = {
+    'UNVERIFIED_RETENTION_DAYS': int(os.getenv('UNVERIFIED_RETENTION_DAYS', 7)),
+    'EXPIRED_TOKEN_GRACE_DAYS': 1,
+    'BATCH_SIZE': 1000,
+    'PAUSE_SECONDS': 0.05,  # Between batches
+    'MAX_SECONDS': 600,  # Per run; the next run picks up the rest
+}
+
+# Admin user search (?q=): pg_trgm GIN indexes on PostgreSQL, an in-process
+# n-gram index elsewhere. The threshold applies to the fallback; PostgreSQL
+# uses pg_trgm.word_similarity_threshold, which defaults to the same 0.6
+USER_SEARCH = {
+    'MIN_QUERY_LENGTH': 3,
+    'MAX_RESULTS': 50,
+    'SIMILARITY_THRESHOLD': 0.6,
+    'NGRAM_REBUILD_SECONDS': 300,
+}
+
+# Real-time streaming (Server-Sent Events served by swiggy.asgi)
+REALTIME = {
+    'BROKER': os.getenv('REALTIME_BROKER', 'realtime.backends.LocalBroker'),
+    'REDIS_URL': os.getenv('REALTIME_REDIS_URL'),
+    'QUEUE_SIZE': 32,
+    'HEARTBEAT_SECONDS': 25,
+    'RETRY_MS': 3000,
+}
+
+# Per-id cache lifetime for restaurant cards (seconds)
+RESTAURANT_CACHE_TIMEOUT = int(os.getenv('RESTAURANT_CACHE_TIMEOUT', 300))
+
+# Ranked listings (/api/restaurants/ranked/), cached per geo cell and sort
+# key. Rating and cost changes are queued as deltas and patched into cached
+# listings on read; a listing more than MAX_DELTAS behind is rebuilt
+RANKINGS = {
+    'CACHE_TIMEOUT': 600,
+    'DELTA_TIMEOUT': 900,
+    'MAX_DELTAS': 200,
+}
+
+# Sliding-window event counters (menu views, cart adds) kept in count-min
+# sketches and HyperLogLogs, sharded per worker and merged through the cache
+COUNTERS = {
+    'BUCKET_SECONDS': 300,
+    'WINDOW_BUCKETS': 12,  # One hour
+    'CMS_WIDTH': 1024,
+    'CMS_DEPTH': 4,
+    'HLL_PRECISION': 12,  # Unique users per event type
+    'KEY_HLL_PRECISION': 6,  # Unique users per tracked restaurant
+    'CANDIDATES': 300,  # Heaviest restaurants tracked per shard for top-k
+    'FLUSH_SECONDS': 10,
+    'MERGED_TTL': 30,
+    'BACKGROUND_FLUSH': os.getenv('COUNTERS_BACKGROUND_FLUSH', 'True') == 'True',
+    # Trending score per restaurant: weighted sum of event counts
+    'TRENDING_WEIGHTS': {'menu_view': 1, 'cart_add': 5},
+}
+
+# Opening hours, compiled into a minute-of-week index for "open now"
+# filtering of listings. Schedules are in one local time zone
+OPENING_HOURS = {
+    'TIME_ZONE': os.getenv('OPENING_HOURS_TIME_ZONE', 'Asia/Kolkata'),
+    'BUCKET_MINUTES': 15,
+    'OVERRIDE_DAYS': 14,  # Holiday overrides compiled ahead; later dates are read on demand
+    'CACHE_TIMEOUT': 3600,
+}
+
+# Catalog change feed (/api/restaurants/changes/) for offline clients
+CATALOG_CHANGES = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    # Rows younger than this are held back, so a slower concurrent insert
+    # with a lower id cannot be skipped by a client that synced past it
+    'SETTLE_SECONDS': 2,
+    # Deletes are kept this long; clients that last synced earlier resync
+    'TOMBSTONE_RETENTION_DAYS': 30,
+}
+
+# Delivery ETA / fee engine
+DELIVERY = {
+    # (max distance in km, fee in rupees); farther than the last zone is unserviceable
+    'ZONES': [(3, 20), (6, 35), (10, 55), (15, 80)],
+    'RIDER_SPEED_KMH': 20,
+    'ROUTE_FACTOR': 1.3,  # Road distance vs. straight-line distance
+    'PICKUP_MINUTES': 5,
+    'CELL_DEGREES': 0.01,  # Roughly 1km grid for cached quotes
+    'CACHE_TIMEOUT': 600,
+}
+
+# Rider dispatch (manage.py run_dispatcher). Pending deliveries are batched
+# and matched to idle riders every WINDOW_SECONDS; each zone of
+# ZONE_DEGREES is solved separately in a pool of WORKERS processes
+DISPATCH = {
+    'WINDOW_SECONDS': 10,
+    'MAX_TASKS_PER_WINDOW': 5000,
+    'ZONE_DEGREES': 0.05,  # Roughly 5km
+    'MAX_PICKUP_KM': 5,
+    'ASSIGN_LEAD_MINUTES': 10,  # Batches are assigned once their food is ready this soon
+    'MAX_BATCH_SIZE': 3,
+    'BATCH_READY_SLACK_MINUTES': 5,
+    'BATCH_MAX_SPREAD_KM': 1.5,  # Between dropoffs of one batch
+    # Cost per minute of food waiting for a late rider / rider waiting for food
+    'FOOD_WAIT_WEIGHT': 2.0,
+    'RIDER_WAIT_WEIGHT': 0.5,
+    'RIDER_STALE_SECONDS': 120,
+    'WORKERS': int(os.getenv('DISPATCH_WORKERS', 2)),
+}
+
+# Address geocoding (results are cached permanently in GeocodeCache). The
+# public Nominatim allows one request per second, so it is queried one at a
+# time; raise the limits only for a self-hosted instance
+PUBLIC_NOMINATIM_URL = 'https://nominatim.openstreetmap.org/search'
+GEOCODER_URL = os.getenv('GEOCODER_URL', PUBLIC_NOMINATIM_URL)
+GEOCODING = {
+    'BACKEND': os.getenv('GEOCODER_BACKEND', 'user_auth.geocoding.NominatimGeocoder'),
+    'URL': GEOCODER_URL,
+    'USER_AGENT': os.getenv('GEOCODER_USER_AGENT', 'swiggy-backend/1.0'),
+    'TIMEOUT': 10,
+    'MAX_CONCURRENCY': int(os.getenv('GEOCODER_MAX_CONCURRENCY', 1 if GEOCODER_URL == PUBLIC_NOMINATIM_URL else 4)),
+    # Seconds between requests from one process
+    'MIN_INTERVAL': float(os.getenv('GEOCODER_MIN_INTERVAL', 1.0 if GEOCODER_URL == PUBLIC_NOMINATIM_URL else 0)),
+    # south, west, north, east used by StubGeocoder
+    'STUB_BOUNDS': (22.9, 72.45, 23.15, 72.7),
+}
+
+# Request instrumentation: per-view query budget overruns are logged and
+# flagged in a response header. ENFORCE raises instead, after the view has
+# committed, so it is for the test runner (which turns it on) and benchmarks
+QUERY_BUDGETS = {
+    'ENFORCE': os.getenv('QUERY_BUDGET_ENFORCE') == 'True',
+}
+TEST_RUNNER = 'core.testing.TestRunner'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# OTP verification gate: per-email attempt limits and lockouts live in
+# the cache so brute-force traffic is refused before it reaches the database
+OTP_GATE = {
+    'MAX_ATTEMPTS': 5,
+    'WINDOW_SECONDS': 15 * 60,
+    'LOCKOUT_SECONDS': 15 * 60,
+    'UNKNOWN_EMAIL_TTL': 5 * 60,
+    'REPLAY_TTL': 10 * 60,  # A retried successful verification gets the same response
 }
 
 # Custom user model
 AUTH_USER_MODEL = 'user_auth.User'
 
 MIDDLEWARE = [
+    'core.logs.RequestIdMiddleware',
+    'core.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Move CORS middleware before CommonMiddleware
@@ -160,6 +416,15 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded images are resized in the background into these widths (WebP)
+IMAGE_PIPELINE = {
+    'WIDTHS': (160, 320, 660),
+    'QUALITY': 80,
+    'WORKERS': int(os.getenv('IMAGE_PIPELINE_WORKERS', 2)),
+    'IMMUTABLE_MAX_AGE': 60 * 60 * 24 * 365,
+    'MUTABLE_MAX_AGE': 60 * 60,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -174,4 +439,52 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
-]
\ No newline at end of file
+]
+
+# Structured logging (core.logs): records are queued by the request thread
+# and formatted as JSON and written by a listener thread, so a slow sink
+# never blocks a request (records beyond the queue are dropped and counted).
+# INFO records of the loggers in sample_rates are kept at that rate, a whole
+# request at a time; every record carries the request's X-Request-ID
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'pipeline': {
+            '()': 'core.logs.PipelineHandler',
+            'sink': os.getenv('LOG_SINK', 'stdout'),  # stdout, stderr or a file path
+            'queue_size': 10000,
+            'sample_rates': {
+                'core.access': float(os.getenv('LOG_ACCESS_SAMPLE_RATE', 0.05)),
+            },
+        },
+    },
+    'root': {
+        'handlers': ['pipeline'],
+        'level': os.getenv('LOG_LEVEL', 'INFO'),
+    },
+}
+
+# Warm URL resolvers, serializers and the password hasher when a WSGI/ASGI
+# worker boots, so the first request doesn't pay for it
+PREWARM_ON_BOOT = os.getenv('PREWARM_ON_BOOT', 'True') == 'True'
+
+if SETTINGS_PROFILE == 'api':
+    # Authentication is JWT only, so sessions, messages, the admin and the
+    # HTML side of DRF are never used
+    API_PROFILE_EXCLUDED_APPS = {
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    }
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_PROFILE_EXCLUDED_APPS]
+    MIDDLEWARE = [
+        'core.logs.RequestIdMiddleware',
+        'core.instrumentation.PerformanceMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+    TEMPLATES = []
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('rest_framework.renderers.JSONRenderer',)
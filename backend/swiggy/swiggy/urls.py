@@ -15,20 +15,33 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenObtainPairView
+from core.views import metrics
+from user_auth.views import JWKSView, TokenRefreshView
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    
     # API URLs
     path('api/auth/', include('user_auth.urls')),
+    path('api/restaurants/', include('restaurants.urls')),
+    path('api/promotions/', include('promotions.urls')),
+    path('api/dispatch/', include('dispatch.urls')),
+
+    # Uploaded media (resized variants are served with immutable cache headers)
+    path(settings.MEDIA_URL.lstrip('/'), include('images.urls')),
     
     # JWT Token URLs
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics, name='metrics'),
 ]
+
+# The admin is left out of the lean API settings profile
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_auth'
+
+    def ready(self):
+        from images.pipeline import register
+        from .models import User
+        from . import signals  # noqa: F401
+
+        register(User, 'profile_picture', 'profile_picture_variants')
@@ -0,0 +1,250 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AdminAuditLog
+
+logger = logging.getLogger(__name__)
+
+TABLE = AdminAuditLog._meta.db_table
+
+
+class AuditWriter:
+    """
+    Write-behind buffer for ``AdminAuditLog`` entries. Admin views only
+    queue an entry; a background thread writes the queue with one
+    ``bulk_create`` every ``interval`` seconds or once ``batch_size``
+    entries are waiting.
+
+    Entries keep the time they were recorded, not the time they were
+    written. A failed write keeps its entries for the next flush, up to
+    ``max_pending``; entries still buffered when a process dies are lost.
+
+    On PostgreSQL the writer also creates the partition of any month it
+    has not written to before and finds missing, so entries are not
+    refused when the ``audit_partitions`` cron has lapsed.
+    """
+
+    def __init__(self, batch_size=200, interval=2.0, max_pending=10000, background=True):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.background = background
+        self._pending = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._months = set()  # Months known to have a partition
+
+    def record(self, actor, action, target_id=None, target_ids=(), filters=None, changes=None, affected=0):
+        """
+        Queue one admin action.
+
+        Args:
+            actor (User): The admin who acted
+            action (str): e.g. ``update``, ``delete`` or ``bulk_update``
+            target_id (int): The user acted on, for single-user actions
+            target_ids (list): Ids a bulk action listed explicitly
+            filters (dict): The filter a bulk action selected users with
+            changes (dict): Fields set, or details of what was deleted
+            affected (int): Users changed or deleted
+        """
+        entry = AdminAuditLog(
+            actor_id=actor.pk,
+            actor_email=actor.email,
+            action=action,
+            target_id=target_id,
+            target_ids=list(target_ids),
+            filters=filters or {},
+            changes=changes or {},
+            affected=affected,
+            created_at=timezone.now(),
+        )
+        with self._condition:
+            self._pending.append(entry)
+            if self.background:
+                self._ensure_thread()
+                if len(self._pending) >= self.batch_size:
+                    self._condition.notify()
+        if not self.background:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait(self.interval)
+            try:
+                self.flush()
+            finally:
+                # Not a request thread, so nothing else closes this
+                connection.close()
+
+    def flush(self):
+        """Write everything queued so far; safe to call from any thread."""
+        with self._flush_lock:
+            with self._condition:
+                entries, self._pending = self._pending, []
+            if not entries:
+                return
+            try:
+                self._ensure_months(entries)
+                AdminAuditLog.objects.bulk_create(entries, batch_size=self.batch_size)
+            except Exception:
+                logger.exception('Failed to write %d audit log entries', len(entries))
+                with self._condition:
+                    self._pending[:0] = entries
+                    overflow = len(self._pending) - self.max_pending
+                    if overflow > 0:
+                        del self._pending[:overflow]
+                        logger.error('Dropped %d audit log entries over AUDIT_LOG["MAX_PENDING"]', overflow)
+
+    def _ensure_months(self, entries):
+        if connection.vendor != 'postgresql':
+            return
+        months = {month_start(entry.created_at.year, entry.created_at.month) for entry in entries} - self._months
+        if not months:
+            return
+        missing = months - set(partitions())
+        for month in sorted(missing):
+            logger.warning('Creating missing audit partition %s; is audit_partitions running?', partition_name(month))
+            create_partition(month)
+        self._months |= months
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                options = settings.AUDIT_LOG
+                _writer = AuditWriter(
+                    batch_size=options['BATCH_SIZE'],
+                    interval=options['FLUSH_SECONDS'],
+                    max_pending=options['MAX_PENDING'],
+                    background=options['BACKGROUND_FLUSH'],
+                )
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def record(actor, action, **details):
+    """Queue an audit entry; see ``AuditWriter.record``."""
+    get_writer().record(actor, action, **details)
+
+
+def entries(actor_id=None, target_id=None, action=None, since=None, until=None):
+    """
+    Audit entries, newest first. Each filter is served by an index: actor
+    and target ids by ``(id, created_at)`` indexes, and on PostgreSQL a
+    bulk action's listed ids by a GIN index; time bounds also prune
+    partitions.
+    """
+    queryset = AdminAuditLog.objects.all()
+    if actor_id is not None:
+        queryset = queryset.filter(actor_id=actor_id)
+    if target_id is not None:
+        if connection.vendor == 'postgresql':
+            queryset = queryset.filter(Q(target_id=target_id) | Q(target_ids__contains=[target_id]))
+        else:
+            queryset = queryset.filter(target_id=target_id)
+    if action:
+        queryset = queryset.filter(action=action)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset.order_by('-created_at', '-id')
+
+
+def month_start(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def partitions():
+    """
+    Monthly partitions of the audit log.
+
+    Returns:
+        dict: ``{month start: partition name}``, oldest first
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass',
+            [TABLE],
+        )
+        names = sorted(row[0] for row in cursor.fetchall())
+    prefix = f'{TABLE}_p'
+    return {
+        datetime.strptime(name[len(prefix):], '%Y%m').replace(tzinfo=dt_timezone.utc): name
+        for name in names if name.startswith(prefix)
+    }
+
+
+def ensure_partitions(now, months_ahead):
+    """
+    Create the partitions for the current month and ``months_ahead`` after
+    it. The writer creates a missing month itself, but creating a
+    partition locks the whole table, so this runs well ahead of need.
+
+    Returns:
+        list: Names of the partitions created
+    """
+    existing = partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        start = month_start(now.year, now.month + offset)
+        if start not in existing:
+            create_partition(start)
+            created.append(partition_name(start))
+    return created
+
+
+def create_partition(start):
+    """Create the partition of the month beginning at ``start`` unless it exists."""
+    end = month_start(start.year, start.month + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {TABLE} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+
+
+def drop_partitions(now, retain_months, dry_run=False):
+    """
+    Drop whole partitions older than ``retain_months`` full months before
+    the current one. Dropping a partition is a catalog change, not a
+    delete of its rows, so it is instant and leaves no dead tuples.
+
+    Returns:
+        list: Names of the partitions dropped (or that would be)
+    """
+    cutoff = month_start(now.year, now.month - retain_months)
+    expired = [name for month, name in partitions().items() if month < cutoff]
+    if not dry_run:
+        with connection.cursor() as cursor:
+            for name in expired:
+                cursor.execute(f'DROP TABLE {name}')
+    return expired
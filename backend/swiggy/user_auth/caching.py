@@ -0,0 +1,65 @@
+from core.caching import get_tiered_cache
+
+PROFILE_NAMESPACE = 'user_auth:profile'
+DASHBOARD_CACHE_KEY = 'user_auth:admin:dashboard'
+# Per-user is_active flag read by the refresh service instead of the database
+TOKEN_USER_NAMESPACE = 'user_auth:token:user'
+
+# Cached profiles and dashboard payloads (seconds)
+PROFILE_CACHE_TIMEOUT = 600
+DASHBOARD_CACHE_TIMEOUT = 30
+
+# Past this many ids, bumping the namespace is cheaper than deleting keys
+BULK_INVALIDATION_THRESHOLD = 1000
+
+
+def profile_namespace_version():
+    return get_tiered_cache().namespace_version(PROFILE_NAMESPACE)
+
+
+def profile_cache_key(user_id):
+    return get_tiered_cache().versioned_key(PROFILE_NAMESPACE, user_id)
+
+
+def get_cached_profile(user_id):
+    return get_tiered_cache().get(profile_cache_key(user_id))
+
+
+def cache_profile(user_id, data):
+    get_tiered_cache().set(profile_cache_key(user_id), data, timeout=PROFILE_CACHE_TIMEOUT)
+
+
+def invalidate_profiles(user_ids=None):
+    """
+    Drop cached profiles for ``user_ids`` with one ``delete_many``, or for
+    every user at once (``None`` or a very large set) by bumping the
+    namespace version so old keys are never read again.
+    """
+    cache = get_tiered_cache()
+    if user_ids is not None and len(user_ids) <= BULK_INVALIDATION_THRESHOLD:
+        cache.delete_many([profile_cache_key(user_id) for user_id in user_ids])
+        return
+    cache.bump_namespace(PROFILE_NAMESPACE)
+
+
+def cached_dashboard(compute):
+    """The admin dashboard payload, recomputed by one caller at a time."""
+    return get_tiered_cache().get_or_set(DASHBOARD_CACHE_KEY, compute, timeout=DASHBOARD_CACHE_TIMEOUT)
+
+
+def token_user_cache_key(user_id):
+    return get_tiered_cache().versioned_key(TOKEN_USER_NAMESPACE, user_id)
+
+
+def invalidate_token_users(user_ids=None):
+    cache = get_tiered_cache()
+    if user_ids is not None and len(user_ids) <= BULK_INVALIDATION_THRESHOLD:
+        cache.delete_many([token_user_cache_key(user_id) for user_id in user_ids])
+        return
+    cache.bump_namespace(TOKEN_USER_NAMESPACE)
+
+
+def invalidate_user_caches(user_ids=None):
+    invalidate_profiles(user_ids)
+    invalidate_token_users(user_ids)
+    get_tiered_cache().delete(DASHBOARD_CACHE_KEY)
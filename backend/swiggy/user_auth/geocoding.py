@@ -0,0 +1,161 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import GeocodeCache
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_address(street_address='', city='', state='', zip_code=''):
+    """
+    Canonical cache key for a free-text address: lower-cased, punctuation
+    stripped, whitespace collapsed, empty parts dropped.
+    """
+    parts = []
+    for part in (street_address, city, state, zip_code):
+        part = _WHITESPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', (part or '').lower())).strip()
+        if part:
+            parts.append(part)
+    return ', '.join(parts)
+
+
+def normalize(address):
+    return normalize_address(address.street_address, address.city, address.state, address.zip_code)
+
+
+class NominatimGeocoder:
+    """
+    Geocoder backed by an OpenStreetMap Nominatim-compatible HTTP API.
+    Requests from every thread of a process are spaced at least
+    ``GEOCODING['MIN_INTERVAL']`` seconds apart.
+    """
+    name = 'nominatim'
+
+    def __init__(self):
+        options = settings.GEOCODING
+        self.url = options['URL']
+        self.timeout = options['TIMEOUT']
+        self.user_agent = options['USER_AGENT']
+        self.min_interval = options['MIN_INTERVAL']
+        self._next_request = 0.0
+        self._pace_lock = threading.Lock()
+
+    def _wait_turn(self):
+        with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def geocode(self, query):
+        if self.min_interval:
+            self._wait_turn()
+        request = Request(
+            f'{self.url}?{urlencode({"q": query, "format": "json", "limit": 1})}',
+            headers={'User-Agent': self.user_agent},
+        )
+        with urlopen(request, timeout=self.timeout) as response:
+            results = json.load(response)
+        if not results:
+            return None
+        return float(results[0]['lat']), float(results[0]['lon'])
+
+
+class StubGeocoder:
+    """
+    Deterministic, offline geocoder for tests and local development.
+
+    Every query maps to a stable point inside ``GEOCODING['STUB_BOUNDS']``;
+    queries containing ``unknown`` resolve to nothing.
+    """
+    name = 'stub'
+
+    def geocode(self, query):
+        if 'unknown' in query:
+            return None
+        south, west, north, east = settings.GEOCODING['STUB_BOUNDS']
+        digest = hashlib.sha256(query.encode()).digest()
+        lat_frac = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF
+        lng_frac = int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF
+        return south + (north - south) * lat_frac, west + (east - west) * lng_frac
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = import_string(settings.GEOCODING['BACKEND'])()
+    return _geocoder
+
+
+def cached_coordinates(keys):
+    """
+    Look up normalized addresses in the persistent cache with one query.
+
+    Returns:
+        dict: normalized address -> (lat, lng), or None for addresses the
+        geocoder already failed to resolve
+    """
+    return {
+        row.normalized_address: (row.latitude, row.longitude) if row.latitude is not None else None
+        for row in GeocodeCache.objects.filter(normalized_address__in=set(keys))
+    }
+
+
+def store_coordinates(results, provider):
+    """Persist geocoder results; unresolved addresses are cached as misses."""
+    GeocodeCache.objects.bulk_create(
+        [
+            GeocodeCache(
+                normalized_address=key,
+                latitude=coords[0] if coords else None,
+                longitude=coords[1] if coords else None,
+                provider=provider,
+            )
+            for key, coords in results.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def geocode(key):
+    """Resolve one normalized address, consulting the cache first."""
+    if not key:
+        return None
+    cached = cached_coordinates([key])
+    if key in cached:
+        return cached[key]
+    geocoder = get_geocoder()
+    coords = geocoder.geocode(key)
+    store_coordinates({key: coords}, geocoder.name)
+    return coords
+
+
+def apply_cached_coordinates(addresses):
+    """
+    Fill ``latitude``/``longitude`` on unsaved addresses from the cache
+    only; misses are left for the backfill command rather than calling the
+    geocoder on the request path.
+    """
+    keys = {id(address): normalize(address) for address in addresses}
+    cached = cached_coordinates(keys.values())
+    for address in addresses:
+        coords = cached.get(keys[id(address)])
+        if coords:
+            address.latitude, address.longitude = coords
+    return addresses
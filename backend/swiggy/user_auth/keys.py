@@ -0,0 +1,269 @@
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.caching import get_tiered_cache
+
+from .models import SigningKey
+
+KEYS_NAMESPACE = 'user_auth:signing_keys'
+
+
+def _passphrase():
+    # Private keys are stored encrypted; the passphrase never touches the database
+    configured = settings.SIGNING_KEYS['PASSPHRASE']
+    if configured:
+        return configured.encode()
+    return salted_hmac(KEYS_NAMESPACE, 'private-key-passphrase').hexdigest().encode()
+
+
+def _generate(algorithm):
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=settings.SIGNING_KEYS['RSA_KEY_SIZE'])
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f'Unsupported signing algorithm: {algorithm}')
+
+
+def _public_jwk(kid, algorithm, public_key):
+    exporter = RSAAlgorithm if algorithm == 'RS256' else OKPAlgorithm
+    return {**exporter.to_jwk(public_key, as_dict=True), 'kid': kid, 'alg': algorithm, 'use': 'sig'}
+
+
+@dataclass(frozen=True)
+class LoadedKey:
+    kid: str
+    algorithm: str
+    private_key: Optional[Any]
+    public_key: Any
+    jwk: dict
+    activated_at: datetime
+    retired_at: Optional[datetime]
+    expires_at: Optional[datetime]
+
+    def signs_at(self, now):
+        return self.private_key is not None and self.activated_at <= now and (
+            self.retired_at is None or now < self.retired_at
+        )
+
+    def verifies_at(self, now):
+        return self.expires_at is None or now < self.expires_at
+
+
+class KeyRing:
+    """
+    In-memory copy of the signing keys, parsed once per process.
+
+    Keys are reloaded when the shared key version changes (checked through
+    the tiered cache, so at most every few seconds) or when a token names
+    an unknown ``kid``, which is throttled so forged kids cannot turn into
+    database load.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _ensure_current(self, force=False):
+        version = get_tiered_cache().namespace_version(KEYS_NAMESPACE)
+        if not force and version == self._version:
+            return
+        if force and time.monotonic() - self._loaded_at < settings.SIGNING_KEYS['UNKNOWN_KID_RELOAD_SECONDS']:
+            return
+        with self._lock:
+            if not force and version == self._version:
+                return
+            self._keys = self._load()
+            self._version, self._loaded_at = version, time.monotonic()
+
+    @staticmethod
+    def _load():
+        now = timezone.now()
+        keys = {}
+        for row in SigningKey.objects.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now)):
+            public_key = serialization.load_pem_public_key(row.public_key.encode())
+            private_key = None
+            if row.retired_at is None or row.retired_at > now:
+                private_key = serialization.load_pem_private_key(row.private_key.encode(), password=_passphrase())
+            keys[row.kid] = LoadedKey(
+                kid=row.kid,
+                algorithm=row.algorithm,
+                private_key=private_key,
+                public_key=public_key,
+                jwk=_public_jwk(row.kid, row.algorithm, public_key),
+                activated_at=row.activated_at,
+                retired_at=row.retired_at,
+                expires_at=row.expires_at,
+            )
+        return keys
+
+    def signing_key(self):
+        """The most recently activated key that may sign now, or None."""
+        self._ensure_current()
+        now = timezone.now()
+        candidates = [key for key in self._keys.values() if key.signs_at(now)]
+        return max(candidates, key=lambda key: key.activated_at, default=None)
+
+    def verifying_key(self, kid):
+        self._ensure_current()
+        key = self._keys.get(kid)
+        if key is None:
+            self._ensure_current(force=True)
+            key = self._keys.get(kid)
+        if key is None or not key.verifies_at(timezone.now()):
+            return None
+        return key
+
+    def jwks(self):
+        """Public keys that may sign or still verify, including pre-published ones."""
+        self._ensure_current()
+        now = timezone.now()
+        return {'keys': [key.jwk for key in sorted(self._keys.values(), key=lambda key: key.kid) if key.verifies_at(now)]}
+
+
+def bump_key_version():
+    get_tiered_cache().bump_namespace(KEYS_NAMESPACE)
+
+
+def rotate_keys(algorithm=None, publish_ahead=None, now=None, compromised=False):
+    """
+    Create a new signing key and schedule the handover.
+
+    The new key is published in the JWKS immediately but only signs after
+    ``publish_ahead``, so verifiers that cached the JWKS have picked it up
+    by then. The key it replaces is retired at that moment and keeps
+    verifying until every token it signed has expired.
+
+    Args:
+        compromised (bool): The replaced key stops signing and verifying
+            now, and the new one signs at once; every token the old key
+            signed is rejected, so its users sign in again
+
+    Returns:
+        SigningKey: The new key
+    """
+    options = settings.SIGNING_KEYS
+    algorithm = algorithm or options['ALGORITHM']
+    now = now or timezone.now()
+    if compromised:
+        publish_ahead = timedelta(0)
+    activates = now + (options['PUBLISH_AHEAD'] if publish_ahead is None else publish_ahead)
+    token_lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    leeway = timedelta(seconds=options['VERIFY_GRACE_SECONDS'])
+    expires = now if compromised else activates + token_lifetime + leeway
+
+    private_key = _generate(algorithm)
+    with transaction.atomic():
+        SigningKey.objects.filter(retired_at__isnull=True).update(retired_at=activates, expires_at=expires)
+        key = SigningKey.objects.create(
+            kid=secrets.token_urlsafe(12),
+            algorithm=algorithm,
+            private_key=private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.BestAvailableEncryption(_passphrase()),
+            ).decode(),
+            public_key=private_key.public_key().public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+            ).decode(),
+            activated_at=activates,
+        )
+        transaction.on_commit(bump_key_version)
+    return key
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    simplejwt token backend that signs with the active key of the ring and
+    puts its ``kid`` in the header, and verifies by ``kid``.
+
+    Until the first key exists it falls back to HS256 with ``SIGNING_KEY``;
+    afterwards HS256 tokens are only accepted while ``ACCEPT_HS256`` is on.
+    """
+
+    def __init__(self, ring):
+        super().__init__(
+            'HS256',
+            api_settings.SIGNING_KEY,
+            None,
+            api_settings.AUDIENCE,
+            api_settings.ISSUER,
+            None,
+            api_settings.LEEWAY,
+            api_settings.JSON_ENCODER,
+        )
+        self.ring = ring
+
+    def encode(self, payload):
+        key = self.ring.signing_key()
+        if key is None:
+            return super().encode(payload)
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload, key.private_key, algorithm=key.algorithm,
+            headers={'kid': key.kid}, json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError('Token is invalid') from e
+        kid = header.get('kid')
+        if kid is None:
+            if not settings.SIGNING_KEYS['ACCEPT_HS256'] and self.ring.signing_key() is not None:
+                raise TokenBackendError('Token is invalid')
+            return super().decode(token, verify=verify)
+
+        key = self.ring.verifying_key(kid)
+        if key is None:
+            raise TokenBackendError('Token is invalid')
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={'verify_aud': self.audience is not None, 'verify_signature': verify},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise TokenBackendExpiredToken('Token is expired') from e
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError('Token is invalid') from e
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_token_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = KeyRingTokenBackend(KeyRing())
+    return _backend
@@ -0,0 +1,118 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from .caching import invalidate_user_caches
+from .models import Address, User
+
+
+def purge_in_batches(queryset, batch_size, pause=0.0, deadline=None, on_batch=None):
+    """
+    Delete the rows of ``queryset`` a batch at a time: the next
+    ``batch_size`` primary keys after the last batch (a keyset ``LIMIT``
+    query), then a delete of those rows, with cascades, in a transaction
+    of its own. Locks are held for one batch only, and ``pause`` seconds
+    between batches leave room for regular traffic.
+
+    The delete re-applies ``queryset``'s filter, so a row that stopped
+    matching since its key was read (a user verifying meanwhile) is kept.
+
+    Args:
+        deadline (float): ``time.monotonic()`` value to stop at, between batches
+        on_batch (callable): Called with each batch's deleted primary keys
+            after its transaction commits
+
+    Returns:
+        dict: ``deleted`` rows per model label (cascades included),
+        ``batches``, ``seconds`` and whether the purge is ``complete``
+    """
+    started = time.monotonic()
+    report = {'deleted': {}, 'batches': 0, 'seconds': 0.0, 'complete': False}
+    last_pk = None
+    while deadline is None or time.monotonic() < deadline:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        ids = list(batch.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            report['complete'] = True
+            break
+        last_pk = ids[-1]
+        with transaction.atomic():
+            _, per_model = queryset.filter(pk__in=ids).delete()
+        for label, count in per_model.items():
+            report['deleted'][label] = report['deleted'].get(label, 0) + count
+        report['batches'] += 1
+        if on_batch is not None:
+            on_batch(ids)
+        if len(ids) < batch_size:
+            report['complete'] = True
+            break
+        if pause:
+            time.sleep(pause)
+    report['seconds'] = time.monotonic() - started
+    return report
+
+
+def stale_unverified_users(now):
+    """
+    Accounts never verified within ``UNVERIFIED_RETENTION_DAYS`` of signing
+    up and not used since. Admins and superusers are never purged.
+    """
+    cutoff = now - timedelta(days=settings.DATA_RETENTION['UNVERIFIED_RETENTION_DAYS'])
+    return User.objects.filter(
+        Q(last_login__isnull=True) | Q(last_login__lt=cutoff),
+        is_verified=False,
+        is_superuser=False,
+        date_joined__lt=cutoff,
+    ).exclude(role='admin')
+
+
+def expired_tokens(now):
+    """Refresh tokens expired ``EXPIRED_TOKEN_GRACE_DAYS`` ago (blacklist rows cascade)."""
+    grace = timedelta(days=settings.DATA_RETENTION['EXPIRED_TOKEN_GRACE_DAYS'])
+    return OutstandingToken.objects.filter(expires_at__lt=now - grace)
+
+
+def orphaned_addresses():
+    """
+    Addresses whose user no longer exists. The foreign key cascades, so
+    these are only left behind by writes that bypassed it (raw SQL,
+    imports with constraints deferred or disabled).
+    """
+    return Address.objects.filter(~Exists(User.objects.filter(pk=OuterRef('user_id'))))
+
+
+def purge(now, targets, dry_run=False):
+    """
+    Run the purges in ``targets`` (``users``, ``tokens``, ``addresses``)
+    within ``MAX_SECONDS`` overall; whatever is left is picked up by the
+    next run.
+
+    Returns:
+        dict: ``{target: report}``, see ``purge_in_batches``; with
+        ``dry_run`` only the matching row counts
+    """
+    options = settings.DATA_RETENTION
+    querysets = {
+        'users': lambda: stale_unverified_users(now),
+        'tokens': lambda: expired_tokens(now),
+        'addresses': orphaned_addresses,
+    }
+    if dry_run:
+        return {target: {'matching': querysets[target]().count()} for target in targets}
+
+    deadline = time.monotonic() + options['MAX_SECONDS']
+    reports = {}
+    for target in targets:
+        reports[target] = purge_in_batches(
+            querysets[target](),
+            options['BATCH_SIZE'],
+            pause=options['PAUSE_SECONDS'],
+            deadline=deadline,
+            # Cached profiles and token users of deleted accounts
+            on_batch=invalidate_user_caches if target == 'users' else None,
+        )
+    return reports
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from user_auth import audit
+
+
+class Command(BaseCommand):
+    help = (
+        'Maintain the monthly partitions of the admin audit log (PostgreSQL): '
+        'create partitions for the coming AUDIT_LOG["MONTHS_AHEAD"] months and '
+        'drop whole partitions older than AUDIT_LOG["RETAIN_MONTHS"]. Run daily.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.AUDIT_LOG['MONTHS_AHEAD'])
+        parser.add_argument('--retain-months', type=int, default=settings.AUDIT_LOG['RETAIN_MONTHS'])
+        parser.add_argument('--dry-run', action='store_true', help='List expired partitions without dropping them.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write('The audit log is only partitioned on PostgreSQL; nothing to do.')
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            created = [] if options['dry_run'] else audit.ensure_partitions(now, options['months_ahead'])
+            dropped = audit.drop_partitions(now, options['retain_months'], dry_run=options['dry_run'])
+
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        for name in dropped:
+            self.stdout.write(f"{'Would drop' if options['dry_run'] else 'Dropped'} {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(audit.partitions())} partitions; {len(created)} created, '
+            f"{len(dropped)} {'expired' if options['dry_run'] else 'dropped'}."
+        ))
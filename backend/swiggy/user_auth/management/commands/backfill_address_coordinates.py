@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from user_auth.geocoding import cached_coordinates, get_geocoder, normalize, store_coordinates
+from user_auth.models import Address
+
+
+class Command(BaseCommand):
+    help = 'Geocode addresses without coordinates, through the persistent geocode cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Concurrent geocoder requests (default: GEOCODING["MAX_CONCURRENCY"]).')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many addresses.')
+
+    def handle(self, *args, **options):
+        geocoder = get_geocoder()
+        workers = options['workers'] or settings.GEOCODING['MAX_CONCURRENCY']
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        totals = {'addresses': 0, 'resolved': 0, 'cache_hits': 0, 'geocoded': 0, 'not_found': 0, 'failed': 0}
+
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while options['limit'] is None or totals['addresses'] < options['limit']:
+                size = batch_size
+                if options['limit'] is not None:
+                    size = min(size, options['limit'] - totals['addresses'])
+                # Keyset pagination keeps each batch an index range scan
+                batch = list(
+                    Address.objects.filter(id__gt=last_id, latitude__isnull=True)
+                    .order_by('id')[:size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                keys = {address.id: normalize(address) for address in batch}
+                known = cached_coordinates(keys.values())
+                missing = sorted({key for key in keys.values() if key and key not in known})
+                totals['cache_hits'] += sum(1 for key in keys.values() if key in known)
+
+                fetched = dict(zip(missing, pool.map(self.safe_geocode(geocoder), missing)))
+                store_coordinates({key: coords for key, coords in fetched.items() if coords is not False}, geocoder.name)
+                known.update({key: coords for key, coords in fetched.items() if coords})
+                # None: the geocoder has no match; False: the lookup itself failed
+                for coords in fetched.values():
+                    if coords:
+                        totals['geocoded'] += 1
+                    elif coords is None:
+                        totals['not_found'] += 1
+                    else:
+                        totals['failed'] += 1
+
+                updated = []
+                for address in batch:
+                    coords = known.get(keys[address.id])
+                    if coords:
+                        address.latitude, address.longitude = coords
+                        updated.append(address)
+                Address.objects.bulk_update(updated, ['latitude', 'longitude'])
+
+                totals['addresses'] += len(batch)
+                totals['resolved'] += len(updated)
+                self.stdout.write(f"... {totals['addresses']} addresses, {totals['resolved']} resolved")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {totals['addresses']} addresses in {elapsed:.1f}s: "
+            f"{totals['resolved']} resolved, {totals['cache_hits']} from cache, "
+            f"{totals['geocoded']} geocoded, {totals['not_found']} not found by the geocoder, "
+            f"{totals['failed']} failed lookups (retried next run)."
+        ))
+
+    def safe_geocode(self, geocoder):
+        def lookup(key):
+            try:
+                return geocoder.geocode(key)
+            except Exception as exc:
+                # Transient failures are not cached so a later run retries them
+                self.stderr.write(f'Geocoding failed for "{key}": {exc}')
+                return False
+        return lookup
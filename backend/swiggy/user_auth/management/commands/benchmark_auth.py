@@ -0,0 +1,187 @@
+import json
+import os
+import tempfile
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmarking import (
+    Scenario, compare_to_baseline, run_over_http, run_with_client, serve_asgi, serve_wsgi,
+)
+from user_auth.factories import DEFAULT_PASSWORD, create_users
+from user_auth.tokens import ServiceRefreshToken, get_writer
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'auth_baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every user_auth endpoint against a throwaway test database, '
+        'report throughput, p50/p95/p99 latency and queries per request, and '
+        'fail on failed requests or more queries per request than the committed '
+        'baseline (and on slower latency or throughput with --compare-timings).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users (with addresses) to seed.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--mode', choices=['client', 'wsgi', 'asgi'], default='client',
+                            help='Test client in-process, or a real WSGI/ASGI server under concurrency.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Only run the named scenario(s).')
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help='Use MD5 password hashing so login/register measure the framework, not PBKDF2.')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Overwrite the baseline with this run.')
+        parser.add_argument('--compare-timings', action='store_true',
+                            help='Also compare latency and throughput; only meaningful against a baseline '
+                                 'saved on the same machine.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative latency/throughput drift before flagging a regression.')
+        parser.add_argument('--output', help='Also write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver', '127.0.0.1', 'localhost'],
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        if options['fast_hasher']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings.get('NAME')
+        if connection.vendor == 'sqlite' and old_test_name in (None, '', ':memory:'):
+            # The shared-cache in-memory database locks whole tables, which
+            # the write-behind threads (tokens, rollups) then run into
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'benchmark_auth.sqlite3')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**overrides):
+                results = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            test_settings['NAME'] = old_test_name
+
+        self.report(results, options)
+
+    def build_scenarios(self, options):
+        iterations = options['requests']
+        self.stdout.write(f"Seeding {options['users']} users...")
+        admin = create_users(1, prefix='bench-admin', role='admin', addresses_per_user=0)[0]
+        users = create_users(options['users'], prefix='bench')
+
+        admin_auth = {'Authorization': f'Bearer {ServiceRefreshToken.for_user(admin).access_token}'}
+        user_tokens = [ServiceRefreshToken.for_user(users[i % len(users)]) for i in range(iterations)]
+        access = [{'Authorization': f'Bearer {token.access_token}'} for token in user_tokens]
+        # Issued before the run, so their rows are written out by now
+        get_writer().flush()
+        # Credential stuffing: guessed OTPs against a few real and unknown
+        # emails; after the first few attempts the gate answers from cache
+        stuffed = [user.email for user in users[:5]] + [f'bench-ghost{n}@example.com' for n in range(5)]
+
+        return [
+            Scenario('login', 'POST', '/api/auth/login/',
+                     body=lambda i: {'email': users[i % len(users)].email, 'password': DEFAULT_PASSWORD}),
+            Scenario('refresh', 'POST', '/api/auth/token/refresh/',
+                     body=lambda i: {'refresh': str(user_tokens[i])}),
+            Scenario('register', 'POST', '/api/auth/register/',
+                     body=lambda i: {'email': f'bench-new{i}@example.com', 'password': DEFAULT_PASSWORD,
+                                     'name': 'New User', 'phone': '9999999999'}),
+            Scenario('profile_get', 'GET', '/api/auth/profile/', headers=lambda i: access[i]),
+            Scenario('profile_patch', 'PATCH', '/api/auth/profile/', headers=lambda i: access[i],
+                     body=lambda i: {'first_name': f'Renamed {i}'}),
+            Scenario('admin_user_list', 'GET', '/api/auth/admin/users/?role=user&is_verified=true',
+                     headers=lambda i: admin_auth),
+            Scenario('admin_dashboard', 'GET', '/api/auth/admin/dashboard/', headers=lambda i: admin_auth),
+            Scenario('otp_stuffing', 'POST', '/api/auth/verify-email/',
+                     body=lambda i: {'email': stuffed[i % len(stuffed)], 'otp': f'{i:06d}'},
+                     expect_status=(400, 404, 429)),
+        ]
+
+    def run_benchmarks(self, options):
+        scenarios = self.build_scenarios(options)
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {s.name for s in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [s for s in scenarios if s.name in options['scenarios']]
+
+        results = []
+        with ExitStack() as stack:
+            base_url = None
+            if options['mode'] == 'wsgi':
+                from swiggy.wsgi import application
+                base_url = stack.enter_context(serve_wsgi(application))
+            elif options['mode'] == 'asgi':
+                from swiggy.asgi import application
+                base_url = stack.enter_context(serve_asgi(application))
+
+            for scenario in scenarios:
+                self.stdout.write(f'Running {scenario.name}...')
+                if base_url:
+                    row = run_over_http(base_url, scenario, options['requests'], options['concurrency'])
+                else:
+                    row = run_with_client(scenario, options['requests'])
+                results.append(row)
+        return results
+
+    def report(self, results, options):
+        header = f"{'scenario':<18}{'req':>6}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            self.stdout.write(
+                f"{row['scenario']:<18}{row['requests']:>6}{row['errors']:>5}{row['throughput_rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{str(row['queries_per_request']):>9}"
+            )
+
+        run = {
+            'mode': options['mode'], 'users': options['users'], 'requests': options['requests'],
+            'database': connection.vendor, 'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(run, fh, indent=2)
+
+        if options['save_baseline']:
+            failed = [row['scenario'] for row in results if row['errors']]
+            if failed:
+                raise CommandError(f"Not saving a baseline with failed requests in: {', '.join(failed)}")
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w') as fh:
+                json.dump(run, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        if not os.path.exists(options['baseline']):
+            raise CommandError(f"No baseline at {options['baseline']}; run with --save-baseline to store one.")
+        with open(options['baseline']) as fh:
+            baseline = json.load(fh)
+        # Seeding and first-request work are spread over the run, so queries
+        # per request only compare between runs of the same size
+        if (baseline.get('users'), baseline.get('requests')) != (run['users'], run['requests']):
+            raise CommandError(
+                f"Baseline was recorded with --users {baseline.get('users')} --requests {baseline.get('requests')}; "
+                'run with the same sizes or save a new baseline.'
+            )
+        timings = options['compare_timings']
+        if timings and (baseline.get('mode'), baseline.get('database')) != (run['mode'], run['database']):
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with mode={baseline.get('mode')} on {baseline.get('database')}; "
+                'comparing queries and errors only.'
+            ))
+            timings = False
+        regressions = compare_to_baseline(results, baseline, options['tolerance'], timings=timings)
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f'REGRESSION {line}'))
+            raise CommandError(f'{len(regressions)} regression(s) against baseline.')
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
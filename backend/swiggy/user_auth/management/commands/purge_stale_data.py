@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user_auth.maintenance import purge
+
+TARGETS = ('users', 'tokens', 'addresses')
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete unverified accounts past DATA_RETENTION["UNVERIFIED_RETENTION_DAYS"], '
+        'expired refresh tokens and addresses without a user, in keyset batches of '
+        'BATCH_SIZE rows per short transaction, and report rows removed and time '
+        'spent. Run daily (e.g. from cron); a run stops after MAX_SECONDS and the '
+        'next one continues.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=TARGETS, action='append', dest='targets',
+                            help='Purge only this (repeatable; default all).')
+        parser.add_argument('--dry-run', action='store_true', help='Count matching rows without deleting.')
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or TARGETS
+        reports = purge(timezone.now(), targets, dry_run=options['dry_run'])
+        if options['dry_run']:
+            for target, report in reports.items():
+                self.stdout.write(f"{target:<10}{report['matching']:>10} rows would be purged")
+            return
+
+        header = f"{'target':<10}{'rows':>10}{'batches':>9}{'seconds':>9}  complete  cascaded"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for target, report in reports.items():
+            deleted = report['deleted']
+            cascaded = ', '.join(f'{label} {count}' for label, count in sorted(deleted.items()))
+            self.stdout.write(
+                f"{target:<10}{sum(deleted.values()):>10}{report['batches']:>9}{report['seconds']:>9.2f}"
+                f"  {'yes' if report['complete'] else 'no':<8}  {cascaded}"
+            )
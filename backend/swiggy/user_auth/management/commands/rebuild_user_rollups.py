@@ -0,0 +1,37 @@
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour
+
+from user_auth.models import DailyUserStats, HourlyUserStats, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the signup counters of the user rollup tables from date_joined. '
+        'Run once after deploying the rollups, or after bulk loads that bypassed '
+        'signals. Verifications, logins and role changes have no history to '
+        'rebuild from and are left untouched.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, trunc in ((DailyUserStats, TruncDay), (HourlyUserStats, TruncHour)):
+                rows = (
+                    User.objects.annotate(bucket=trunc('date_joined', tzinfo=dt_timezone.utc))
+                    .values('bucket').annotate(signups=Count('id')).order_by()
+                )
+                stats = [
+                    model(bucket=row['bucket'].date() if model is DailyUserStats else row['bucket'],
+                          signups=row['signups'])
+                    for row in rows
+                ]
+                model.objects.update(signups=0)
+                model.objects.bulk_create(
+                    stats, batch_size=1000,
+                    update_conflicts=True, unique_fields=['bucket'], update_fields=['signups'],
+                )
+                self.stdout.write(f'{model.__name__}: {len(stats)} buckets')
+        self.stdout.write(self.style.SUCCESS('User rollups rebuilt.'))
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user_auth.keys import bump_key_version, rotate_keys
+from user_auth.models import SigningKey
+
+
+class Command(BaseCommand):
+    help = (
+        'Rotate the JWT signing key. The new key is published in the JWKS at once '
+        'and starts signing after SIGNING_KEYS["PUBLISH_AHEAD"]; the previous key '
+        'keeps verifying until its tokens have expired. Schedule with --scheduled '
+        '(e.g. daily from cron) to rotate only once the current key is ROTATION_DAYS old.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=[choice for choice, _ in SigningKey.ALGORITHM_CHOICES])
+        parser.add_argument('--now', action='store_true',
+                            help='Start signing immediately, without publishing ahead (first key). '
+                                 'The previous key still verifies until its tokens expire.')
+        parser.add_argument('--compromised', action='store_true',
+                            help='The current key leaked: stop it signing and verifying at once and sign '
+                                 'with the new key. Every token it signed is rejected.')
+        parser.add_argument('--scheduled', action='store_true',
+                            help='Rotate only if the newest key is older than ROTATION_DAYS.')
+        parser.add_argument('--prune', action='store_true', help='Delete keys that no longer verify anything.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options['prune']:
+            deleted, _ = SigningKey.objects.filter(expires_at__lte=now).delete()
+            if deleted:
+                bump_key_version()
+            self.stdout.write(f'Pruned {deleted} expired keys.')
+
+        latest = SigningKey.objects.order_by('-activated_at').first()
+        if options['scheduled'] and latest is not None and not options['compromised']:
+            due = latest.activated_at + timedelta(days=settings.SIGNING_KEYS['ROTATION_DAYS'])
+            if now < due:
+                self.stdout.write(f'Key {latest.kid} is not due for rotation until {due:%Y-%m-%d %H:%M}.')
+                return
+
+        # The very first key has no predecessor to hand over from
+        publish_ahead = timedelta(0) if options['now'] or latest is None else None
+        key = rotate_keys(
+            algorithm=options['algorithm'], publish_ahead=publish_ahead, now=now, compromised=options['compromised'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {key.algorithm} key {key.kid}, signing from {key.activated_at:%Y-%m-%d %H:%M:%S}.'
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:30
+
+from django.db import migrations, models
+import images.pipeline
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0004_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to=images.pipeline.HashedUploadTo('profile_pics', 'profile_picture')),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0007_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminAuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=50)),
+                ('target_ids', models.JSONField(blank=True, default=list)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('changes', models.JSONField(blank=True, default=dict)),
+                ('affected', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('actor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_actions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
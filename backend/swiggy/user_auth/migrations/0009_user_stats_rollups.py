@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0008_admin_audit_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('verifications', models.PositiveIntegerField(default=0)),
+                ('logins', models.PositiveIntegerField(default=0)),
+                ('role_changes', models.PositiveIntegerField(default=0)),
+                ('bucket', models.DateField(unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('verifications', models.PositiveIntegerField(default=0)),
+                ('logins', models.PositiveIntegerField(default=0)),
+                ('role_changes', models.PositiveIntegerField(default=0)),
+                ('bucket', models.DateTimeField(unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0009_user_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SigningKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kid', models.CharField(max_length=64, unique=True)),
+                ('algorithm', models.CharField(choices=[('RS256', 'RS256'), ('EdDSA', 'EdDSA')], max_length=10)),
+                ('private_key', models.TextField()),
+                ('public_key', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField()),
+                ('retired_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-activated_at'],
+            },
+        ),
+    ]
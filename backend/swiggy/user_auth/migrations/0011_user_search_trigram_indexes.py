@@ -0,0 +1,38 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXED_FIELDS = ('email', 'first_name', 'phone')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # GIN pg_trgm indexes answer the admin search; other databases fall
+    # back to the in-process n-gram index in user_auth.search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('user_auth', 'User')._meta.db_table
+    for field in INDEXED_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS user_{field}_trgm_idx '
+            f'ON {schema_editor.quote_name(table)} USING gin ({schema_editor.quote_name(field)} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in INDEXED_FIELDS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS user_{field}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('user_auth', '0010_signing_keys'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:23
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+TABLE = 'user_auth_adminauditlog'
+MONTHS_AHEAD = 3
+
+COLUMNS = """
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    actor_id bigint NULL,
+    actor_email varchar(254) NOT NULL,
+    action varchar(50) NOT NULL,
+    target_id bigint NULL,
+    target_ids jsonb NOT NULL,
+    filters jsonb NOT NULL,
+    changes jsonb NOT NULL,
+    affected integer NOT NULL CHECK (affected >= 0),
+    created_at timestamp with time zone NOT NULL
+"""
+COLUMN_NAMES = 'id, actor_id, actor_email, action, target_id, target_ids, filters, changes, affected, created_at'
+
+INDEXES = (
+    f'CREATE INDEX audit_created_idx ON {TABLE} (created_at DESC)',
+    f'CREATE INDEX audit_actor_created_idx ON {TABLE} (actor_id, created_at DESC)',
+    f'CREATE INDEX audit_target_created_idx ON {TABLE} (target_id, created_at DESC)',
+)
+
+
+def backfill_actor_emails(apps, schema_editor):
+    AdminAuditLog = apps.get_model('user_auth', 'AdminAuditLog')
+    User = apps.get_model('user_auth', 'User')
+    email = User.objects.filter(pk=models.OuterRef('actor_id')).values('email')[:1]
+    AdminAuditLog.objects.filter(actor_id__isnull=False).update(actor_email=models.Subquery(email))
+
+
+def _month(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def _rebuild_table(schema_editor, create, extra_indexes=()):
+    # Copy into a new table, then swap names; the log is small at this point
+    # and the admin endpoints are the only writers
+    for statement, params in create:
+        schema_editor.execute(statement, params)
+    schema_editor.execute(f'INSERT INTO {TABLE}_new ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM {TABLE}')
+    schema_editor.execute(f'DROP TABLE {TABLE}')
+    schema_editor.execute(f'ALTER TABLE {TABLE}_new RENAME TO {TABLE}')
+    schema_editor.execute(f'ALTER INDEX {TABLE}_new_pkey RENAME TO {TABLE}_pkey')
+    for statement in INDEXES + extra_indexes:
+        schema_editor.execute(statement)
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), max(id)) FROM {TABLE} HAVING max(id) IS NOT NULL"
+    )
+
+
+def partition_audit_log(apps, schema_editor):
+    # Monthly range partitions (dropped whole by manage.py audit_partitions)
+    # and a trigger refusing updates and deletes (PostgreSQL 13+). Other
+    # databases keep the plain table; the model refuses updates and deletes
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(created_at) FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+    now = datetime.now(dt_timezone.utc)
+    first = oldest.astimezone(dt_timezone.utc) if oldest else now
+
+    create = [(
+        f'CREATE TABLE {TABLE}_new ({COLUMNS}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)', (),
+    )]
+    # Partitions are named after the final table; they keep their names
+    # when the parent is renamed
+    months = (now.year - first.year) * 12 + now.month - first.month + MONTHS_AHEAD
+    for offset in range(months + 1):
+        start, end = _month(first.year, first.month + offset), _month(first.year, first.month + offset + 1)
+        create.append((
+            f'CREATE TABLE {TABLE}_p{start:%Y%m} PARTITION OF {TABLE}_new FOR VALUES FROM (%s) TO (%s)',
+            (start, end),
+        ))
+    _rebuild_table(
+        schema_editor,
+        create,
+        (f'CREATE INDEX audit_target_ids_idx ON {TABLE} USING gin (target_ids jsonb_path_ops)',),
+    )
+    schema_editor.execute(
+        """
+        CREATE FUNCTION user_auth_audit_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'Audit log entries are append-only';
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER audit_append_only BEFORE UPDATE OR DELETE ON {TABLE} '
+        f'FOR EACH ROW EXECUTE FUNCTION user_auth_audit_append_only()'
+    )
+
+
+def unpartition_audit_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _rebuild_table(schema_editor, [(f'CREATE TABLE {TABLE}_new ({COLUMNS}, PRIMARY KEY (id))', ())])
+    schema_editor.execute('DROP FUNCTION user_auth_audit_append_only()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0011_user_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminauditlog',
+            name='actor_email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='adminauditlog',
+            name='target_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='adminauditlog',
+            name='actor',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='audit_actions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='adminauditlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['-created_at'], name='audit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['actor', '-created_at'], name='audit_actor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminauditlog',
+            index=models.Index(fields=['target_id', '-created_at'], name='audit_target_created_idx'),
+        ),
+        migrations.RunPython(backfill_actor_emails, migrations.RunPython.noop),
+        migrations.RunPython(partition_audit_log, unpartition_audit_log),
+    ]
@@ -1,7 +1,7 @@
-
-from django.db import models
+from django.db import NotSupportedError, models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
+from images.pipeline import HashedUploadTo
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -32,10 +32,28 @@ class Address(models.Model):
     city = models.CharField(max_length=100, blank=True)
     state = models.CharField(max_length=100, blank=True)
     zip_code = models.CharField(max_length=20, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='address_lat_lng_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type}: {self.street_address}, {self.city}, {self.state} {self.zip_code}"
 
+class GeocodeCache(models.Model):
+    # Normalized free-text address -> coordinates; null coordinates cache a miss
+    normalized_address = models.CharField(max_length=500, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    provider = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.normalized_address
+
 class User(AbstractUser):
     # Use email as the unique identifier instead of username
     username = None
@@ -43,7 +61,9 @@ class User(AbstractUser):
     
     # Additional fields
     phone = models.CharField(max_length=15, blank=True)
-    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to=HashedUploadTo('profile_pics', 'profile_picture'), blank=True, null=True)
+    # Resized WebP renditions, filled in by the image pipeline after upload
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
     is_verified = models.BooleanField(default=False)
     otp = models.CharField(max_length=6, blank=True, null=True)
     role = models.CharField(max_length=20, choices=[('user', 'User'), ('admin', 'Admin')], default='user')
@@ -56,5 +76,92 @@ class User(AbstractUser):
     # No additional required fields for createsuperuser command
     REQUIRED_FIELDS = []
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember tracked fields as loaded so signals can detect transitions
+        instance._loaded_state = {
+            name: value for name, value in zip(field_names, values) if name in ('is_verified', 'role', 'email', 'is_active')
+        }
+        return instance
+
     def __str__(self):
         return self.email
+
+class AdminAuditLog(models.Model):
+    # One row per admin action; bulk actions record their ids or filter.
+    # Append-only: rows are written in batches by user_auth.audit and only
+    # removed a month at a time (a partition on PostgreSQL), so the actor
+    # is not a constraint and keeps its id and email after being deleted
+    actor = models.ForeignKey(
+        'User', related_name='audit_actions', null=True, on_delete=models.DO_NOTHING,
+        db_constraint=False, db_index=False,
+    )
+    actor_email = models.EmailField(blank=True)
+    action = models.CharField(max_length=50)
+    target_id = models.BigIntegerField(null=True, blank=True)  # Single-user actions
+    target_ids = models.JSONField(default=list, blank=True)
+    filters = models.JSONField(default=dict, blank=True)
+    changes = models.JSONField(default=dict, blank=True)
+    affected = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='audit_created_idx'),
+            models.Index(fields=['actor', '-created_at'], name='audit_actor_created_idx'),
+            models.Index(fields=['target_id', '-created_at'], name='audit_target_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise NotSupportedError('Audit log entries are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise NotSupportedError('Audit log entries are append-only.')
+
+    def __str__(self):
+        return f"{self.action} by {self.actor_id} ({self.affected} users)"
+
+class UserStatsRollup(models.Model):
+    # Incrementally maintained counters; time-series endpoints read only these
+    signups = models.PositiveIntegerField(default=0)
+    verifications = models.PositiveIntegerField(default=0)
+    logins = models.PositiveIntegerField(default=0)
+    role_changes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+class DailyUserStats(UserStatsRollup):
+    bucket = models.DateField(unique=True)
+
+    def __str__(self):
+        return f"{self.bucket}"
+
+class HourlyUserStats(UserStatsRollup):
+    bucket = models.DateTimeField(unique=True)
+
+    def __str__(self):
+        return f"{self.bucket}"
+
+class SigningKey(models.Model):
+    ALGORITHM_CHOICES = [('RS256', 'RS256'), ('EdDSA', 'EdDSA')]
+
+    # Published in the JWKS from creation, signs from activated_at until
+    # retired_at, and keeps verifying until expires_at
+    kid = models.CharField(max_length=64, unique=True)
+    algorithm = models.CharField(max_length=10, choices=ALGORITHM_CHOICES)
+    private_key = models.TextField()  # Encrypted PKCS#8 PEM
+    public_key = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField()
+    retired_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-activated_at']
+
+    def __str__(self):
+        return f"{self.kid} ({self.algorithm})"
@@ -0,0 +1,91 @@
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from core.caching import get_tiered_cache
+
+OTP_NAMESPACE = 'user_auth:otp'
+
+
+def _key(kind, *parts):
+    return ':'.join((OTP_NAMESPACE, kind, *parts))
+
+
+def otp_matches(expected, supplied):
+    """Compare OTPs in constant time; a user without a pending OTP never matches."""
+    if not expected or not supplied:
+        return False
+    return constant_time_compare(str(expected), str(supplied))
+
+
+def lockout_remaining(purpose, email):
+    """Seconds left on a lockout for ``email``, or 0 when attempts are allowed."""
+    until = get_tiered_cache().get(_key('lock', purpose, email))
+    if until is None:
+        return 0
+    return max(1, int(until - time.time()))
+
+
+def claim_attempt(purpose, email):
+    """
+    Count an OTP attempt for ``email`` before the OTP is compared, with an
+    atomic increment of the shared counter, so a concurrent burst cannot
+    get more than ``MAX_ATTEMPTS`` guesses in before the lockout is set.
+    The counter is not reset by the lockout; it expires with its window.
+
+    Returns:
+        int: Attempts left after this one, or None when this attempt is
+        refused (and the address is now locked out)
+    """
+    options = settings.OTP_GATE
+    attempts = get_tiered_cache().incr(_key('attempts', purpose, email), timeout=options['WINDOW_SECONDS'])
+    if attempts > options['MAX_ATTEMPTS']:
+        lock_out(purpose, email)
+        return None
+    return options['MAX_ATTEMPTS'] - attempts
+
+
+def lock_out(purpose, email):
+    """Refuse attempts for ``email`` for ``LOCKOUT_SECONDS``."""
+    seconds = settings.OTP_GATE['LOCKOUT_SECONDS']
+    get_tiered_cache().set(_key('lock', purpose, email), time.time() + seconds, timeout=seconds)
+
+
+def clear_failures(purpose, email):
+    get_tiered_cache().delete(_key('attempts', purpose, email))
+
+
+def is_unknown_email(email):
+    # Served from the local tier during a burst, so guesses at unknown
+    # emails are answered without leaving the process
+    return get_tiered_cache().get(_key('unknown', email)) is not None
+
+
+def remember_unknown_email(email):
+    get_tiered_cache().set(_key('unknown', email), 1, timeout=settings.OTP_GATE['UNKNOWN_EMAIL_TTL'])
+
+
+def forget_unknown_email(email):
+    get_tiered_cache().delete(_key('unknown', email))
+
+
+def _replay_digest(purpose, email, otp):
+    return salted_hmac(f'{OTP_NAMESPACE}:{purpose}', f'{email}:{otp}').hexdigest()
+
+
+def remember_success(purpose, email, otp, payload):
+    """Keep the response of a consumed OTP so a retried request gets it again."""
+    get_tiered_cache().set(
+        _key('done', purpose, email),
+        {'digest': _replay_digest(purpose, email, otp), 'payload': payload},
+        timeout=settings.OTP_GATE['REPLAY_TTL'],
+    )
+
+
+def replayed_response(purpose, email, otp):
+    """The stored response if ``otp`` is the one that already succeeded, else None."""
+    entry = get_tiered_cache().get(_key('done', purpose, email))
+    if entry and constant_time_compare(entry['digest'], _replay_digest(purpose, email, otp)):
+        return entry['payload']
+    return None
@@ -0,0 +1,168 @@
+import atexit
+import logging
+import threading
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DailyUserStats, HourlyUserStats
+
+METRICS = ('signups', 'verifications', 'logins', 'role_changes')
+GRANULARITIES = {
+    'day': (DailyUserStats, timedelta(days=1)),
+    'hour': (HourlyUserStats, timedelta(hours=1)),
+}
+
+
+def day_bucket(at):
+    return timezone.localtime(at, dt_timezone.utc).date()
+
+
+def hour_bucket(at):
+    return timezone.localtime(at, dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _increment(model, bucket, counts):
+    increments = {metric: F(metric) + count for metric, count in counts.items()}
+    if model.objects.filter(bucket=bucket).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(bucket=bucket, **counts)
+    except IntegrityError:
+        # Another writer created the bucket first
+        model.objects.filter(bucket=bucket).update(**increments)
+
+
+class RollupWriter:
+    """
+    Write-behind buffer for rollup counts. Requests only add to in-memory
+    per-bucket totals; a background thread applies them every ``interval``
+    seconds with one UPDATE (or INSERT) per touched bucket, so logins
+    neither run queries for the rollups nor queue on the shared daily and
+    hourly rows.
+
+    Counts still buffered when a process dies are lost; rebuild with
+    ``manage.py rebuild_user_rollups`` after a crash if exact totals matter.
+    """
+
+    def __init__(self, interval=2.0, background=True):
+        self.interval = interval
+        self.background = background
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def add(self, metric, count, at):
+        with self._condition:
+            for model, bucket in ((DailyUserStats, day_bucket(at)), (HourlyUserStats, hour_bucket(at))):
+                counts = self._pending.setdefault((model, bucket), {})
+                counts[metric] = counts.get(metric, 0) + count
+            if self.background:
+                self._ensure_thread()
+        if not self.background:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='rollup-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait(self.interval)
+            try:
+                self.flush()
+            finally:
+                # Not a request thread, so nothing else closes this
+                connection.close()
+
+    def flush(self):
+        """Apply everything buffered so far; safe to call from any thread."""
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+            for (model, bucket), counts in pending.items():
+                try:
+                    _increment(model, bucket, counts)
+                except Exception:
+                    logger.exception('Failed to apply rollup counts for %s %s', model.__name__, bucket)
+                    with self._condition:
+                        kept = self._pending.setdefault((model, bucket), {})
+                        for metric, count in counts.items():
+                            kept[metric] = kept.get(metric, 0) + count
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                options = settings.USER_ROLLUPS
+                _writer = RollupWriter(interval=options['FLUSH_SECONDS'], background=options['BACKGROUND_FLUSH'])
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def record(metric, count=1, at=None):
+    """
+    Add ``count`` events of ``metric`` to the daily and hourly rollups.
+
+    Buffered once the surrounding transaction commits, so a rolled-back
+    signup is never counted; visible after the next flush.
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Unknown rollup metric: {metric}')
+    if count <= 0:
+        return
+    at = at or timezone.now()
+    transaction.on_commit(lambda: get_writer().add(metric, count, at))
+
+
+def buckets(granularity, start, end):
+    step = GRANULARITIES[granularity][1]
+    current = day_bucket(start) if granularity == 'day' else hour_bucket(start)
+    last = day_bucket(end) if granularity == 'day' else hour_bucket(end)
+    while current <= last:
+        yield current
+        current += step
+
+
+def timeseries(metrics, granularity, start, end=None):
+    """
+    Zero-filled series for ``metrics`` between ``start`` and ``end``, read
+    with one range query on the rollup table; cost is O(buckets).
+    """
+    end = end or timezone.now()
+    model = GRANULARITIES[granularity][0]
+    first = day_bucket(start) if granularity == 'day' else hour_bucket(start)
+    rows = {
+        row['bucket']: row
+        for row in model.objects.filter(bucket__gte=first, bucket__lte=end if granularity == 'hour' else day_bucket(end))
+        .values('bucket', *metrics)
+    }
+    keys = list(buckets(granularity, start, end))
+    return {
+        'buckets': keys,
+        'series': {metric: [rows.get(key, {}).get(metric, 0) for key in keys] for metric in metrics},
+    }
+
+
+def totals(start, end=None):
+    end = end or timezone.now()
+    sums = DailyUserStats.objects.filter(bucket__gte=day_bucket(start), bucket__lte=day_bucket(end)).aggregate(
+        **{metric: Sum(metric) for metric in METRICS}
+    )
+    return {metric: value or 0 for metric, value in sums.items()}
@@ -0,0 +1,166 @@
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Q, When
+from django.db.models.functions import Greatest
+
+from .models import User
+
+SEARCH_FIELDS = ('email', 'first_name', 'phone')
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """
+    Trigrams of ``text`` the way pg_trgm extracts them: lowercased words of
+    letters and digits, each padded with two spaces in front and one after.
+    """
+    grams = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """
+    In-process trigram index over the searchable user fields, used where
+    pg_trgm is not available (SQLite development and test runs).
+
+    Scores approximate pg_trgm's ``word_similarity``: the share of the query's
+    trigrams found in a field. Saves and deletes in this process update the
+    index through signals; changes made elsewhere (other workers, bulk
+    updates) are picked up by a full rebuild every ``rebuild_seconds``.
+    """
+
+    def __init__(self, rebuild_seconds):
+        self.rebuild_seconds = rebuild_seconds
+        self._postings = defaultdict(set)
+        self._fields = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.rebuild_seconds:
+            return
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < self.rebuild_seconds:
+                return
+            postings, fields = defaultdict(set), {}
+            for pk, *values in User.objects.values_list('pk', *SEARCH_FIELDS).iterator(chunk_size=5000):
+                fields[pk] = [trigrams(value) for value in values]
+                for grams in fields[pk]:
+                    for gram in grams:
+                        postings[gram].add(pk)
+            self._postings, self._fields, self._built_at = postings, fields, time.monotonic()
+
+    def index(self, user):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(user.pk)
+            self._fields[user.pk] = [trigrams(getattr(user, name)) for name in SEARCH_FIELDS]
+            for grams in self._fields[user.pk]:
+                for gram in grams:
+                    self._postings[gram].add(user.pk)
+
+    def remove(self, pk):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        for grams in self._fields.pop(pk, ()):
+            for gram in grams:
+                self._postings[gram].discard(pk)
+
+    def search(self, query, threshold, limit):
+        """
+        Returns:
+            list: ``(pk, score)`` pairs, best match first
+        """
+        self._ensure_built()
+        wanted = trigrams(query)
+        if not wanted:
+            return []
+        # A match shares at least ``needed`` of the query's trigrams, so it
+        # appears in one of the len(wanted) - needed + 1 rarest posting lists
+        needed = max(1, math.ceil(threshold * len(wanted)))
+        # Signals update the posting sets from other request threads; a
+        # user's field trigrams are replaced rather than changed, so scoring
+        # can run outside the lock
+        with self._lock:
+            postings = sorted((self._postings.get(gram, ()) for gram in wanted), key=len)
+            candidates = set().union(*postings[:len(wanted) - needed + 1])
+            fields_by_pk = [(pk, self._fields.get(pk)) for pk in candidates]
+        scored = []
+        for pk, fields in fields_by_pk:
+            if fields is None:
+                continue
+            score = max(len(wanted & grams) for grams in fields) / len(wanted)
+            if score >= threshold:
+                scored.append((pk, score))
+        scored.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scored[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ngram_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NgramIndex(settings.USER_SEARCH['NGRAM_REBUILD_SECONDS'])
+    return _index
+
+
+def uses_trigram_indexes():
+    return connection.vendor == 'postgresql'
+
+
+def search_users(queryset, query):
+    """
+    Narrow ``queryset`` to users whose email, first name or phone resemble
+    ``query``, best match first.
+
+    On PostgreSQL the ``%>`` (word similarity) operator is answered from the
+    pg_trgm GIN indexes and rows are ranked by their best field similarity;
+    elsewhere the in-process n-gram index picks the ids.
+
+    Returns:
+        QuerySet: At most ``USER_SEARCH['MAX_RESULTS']`` users
+    """
+    options = settings.USER_SEARCH
+    limit = options['MAX_RESULTS']
+    if uses_trigram_indexes():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        matches = Q()
+        for name in SEARCH_FIELDS:
+            matches |= Q(**{f'{name}__trigram_word_similar': query})
+        return (
+            queryset.filter(matches)
+            .annotate(similarity=Greatest(*(TrigramWordSimilarity(query, name) for name in SEARCH_FIELDS)))
+            .order_by('-similarity', 'pk')[:limit]
+        )
+
+    # Scores for the whole table; filters on queryset may drop some of them
+    ranked = get_ngram_index().search(query, options['SIMILARITY_THRESHOLD'], limit * 4)
+    if not ranked:
+        return queryset.none()
+    similarity = Case(*(When(pk=pk, then=score) for pk, score in ranked), output_field=FloatField())
+    return (
+        queryset.filter(pk__in=[pk for pk, _ in ranked])
+        .annotate(similarity=similarity)
+        .order_by('-similarity', 'pk')[:limit]
+    )
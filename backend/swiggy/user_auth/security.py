@@ -1,9 +1,10 @@
-from django.core.cache import cache
 from django.conf import settings
 from rest_framework import serializers
 import re
 from datetime import timedelta
 
+from core.caching import get_tiered_cache
+
 def check_rate_limit(request, key_prefix, limit=5, window=60):
     """
     Check if the request should be rate limited.
@@ -21,14 +22,12 @@ def check_rate_limit(request, key_prefix, limit=5, window=60):
         ip = request.META.get('REMOTE_ADDR')
         cache_key = f'{key_prefix}_{ip}'
         
-        # Get current count
-        current = cache.get(cache_key, 0)
+        # Atomic increment on the shared tier, so every worker sees the
+        # same count and concurrent requests cannot both slip under it
+        current = get_tiered_cache().incr(cache_key, timeout=window)
         
-        if current >= limit:
+        if current > limit:
             return True
-            
-        # Increment the count
-        cache.set(cache_key, current + 1, timeout=window)
     return False
 
 def validate_password_strength(password):
@@ -2,10 +2,14 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from core.instrumentation import TimedListSerializer, TimedSerializerMixin
+from .geocoding import apply_cached_coordinates
+from .models import Address
+from .tokens import ServiceRefreshToken
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'first_name', 'last_name', 'phone', 'profile_picture']
@@ -53,14 +57,15 @@ class OTPSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
     otp = serializers.CharField(max_length=6, required=True)
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
     addresses = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ['id', 'email', 'name', 'first_name', 'last_name', 'phone', 'profile_picture', 'addresses']
-        read_only_fields = ['id', 'email', 'name']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'email', 'name', 'first_name', 'last_name', 'phone', 'profile_picture', 'profile_picture_variants', 'addresses']
+        read_only_fields = ['id', 'email', 'name', 'profile_picture_variants']
 
     def get_name(self, obj):
         return f"{obj.first_name} {obj.last_name}".strip() or "User"
@@ -74,6 +79,8 @@ class ProfileSerializer(serializers.ModelSerializer):
                 'city': addr.city,
                 'state': addr.state,
                 'zip_code': addr.zip_code,
+                'latitude': addr.latitude,
+                'longitude': addr.longitude,
             }
             for addr in obj.addresses.all()
         ]
@@ -83,21 +90,26 @@ class ProfileSerializer(serializers.ModelSerializer):
         instance.first_name = validated_data.get('first_name', instance.first_name)
         instance.last_name = validated_data.get('last_name', instance.last_name)
         instance.phone = validated_data.get('phone', instance.phone)
+        if 'profile_picture' in validated_data:
+            instance.profile_picture = validated_data['profile_picture']
         instance.save()
 
         # Update addresses if provided
         addresses_data = self.initial_data.get('addresses')
         if addresses_data is not None:
-            # Remove all old addresses and add new ones
+            # Remove all old addresses and add new ones, reusing known coordinates
             instance.addresses.all().delete()
-            for addr in addresses_data:
-                instance.addresses.create(
+            Address.objects.bulk_create(apply_cached_coordinates([
+                Address(
+                    user=instance,
                     type=addr.get('type', 'Home'),
                     street_address=addr.get('street_address', ''),
                     city=addr.get('city', ''),
                     state=addr.get('state', ''),
                     zip_code=addr.get('zip_code', ''),
                 )
+                for addr in addresses_data
+            ]))
         return instance
 
 class PasswordResetSerializer(serializers.Serializer):
@@ -107,8 +119,38 @@ class PasswordChangeSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True, write_only=True)
     new_password = serializers.CharField(required=True, write_only=True, validators=[validate_password])
 
-class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+class ServiceTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Issue key-ring signed tokens with write-behind outstanding rows
+    token_class = ServiceRefreshToken
+
+class CustomTokenObtainPairSerializer(ServiceTokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
         data['user'] = UserSerializer(self.user).data
         return data
+
+class AdminBulkFilterSerializer(serializers.Serializer):
+    role = serializers.ChoiceField(choices=['user', 'admin'], required=False)
+    is_verified = serializers.BooleanField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    email_domain = serializers.CharField(required=False)
+    joined_before = serializers.DateTimeField(required=False)
+    joined_after = serializers.DateTimeField(required=False)
+
+class AdminBulkChangesSerializer(serializers.Serializer):
+    role = serializers.ChoiceField(choices=['user', 'admin'], required=False)
+    is_verified = serializers.BooleanField(required=False)
+    is_active = serializers.BooleanField(required=False)
+
+class AdminBulkActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=['update', 'delete'])
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=10000)
+    filter = AdminBulkFilterSerializer(required=False)
+    changes = AdminBulkChangesSerializer(required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('filter'):
+            raise serializers.ValidationError('Provide a non-empty "ids" list or "filter".')
+        if attrs['action'] == 'update' and not attrs.get('changes'):
+            raise serializers.ValidationError('"changes" is required for update.')
+        return attrs
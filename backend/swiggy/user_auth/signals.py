@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from images.pipeline import variants_ready
+
+from . import otp as otp_gate
+from . import rollups
+from .caching import invalidate_profiles, invalidate_token_users
+from .models import User
+from .search import get_ngram_index, uses_trigram_indexes
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_identity_change(sender, instance, created, raw=False, **kwargs):
+    # Connected before track_user_rollups, which refreshes _loaded_state.
+    # The OTP gate caches emails that had no account; this one now does
+    loaded = getattr(instance, '_loaded_state', None) or {}
+    if created or loaded.get('email', instance.email) != instance.email:
+        otp_gate.forget_unknown_email(instance.email)
+    # The refresh service caches is_active per user
+    if loaded.get('is_active', instance.is_active) != instance.is_active:
+        invalidate_token_users([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def track_user_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.record('signups')
+        if instance.is_verified:
+            rollups.record('verifications')
+        return
+    loaded = getattr(instance, '_loaded_state', None)
+    if not loaded:
+        return
+    if instance.is_verified and loaded.get('is_verified') is False:
+        rollups.record('verifications')
+    if 'role' in loaded and instance.role != loaded['role']:
+        rollups.record('role_changes')
+    instance._loaded_state = {
+        'is_verified': instance.is_verified, 'role': instance.role,
+        'email': instance.email, 'is_active': instance.is_active,
+    }
+
+
+@receiver(post_save, sender=User)
+def index_user_for_search(sender, instance, raw=False, **kwargs):
+    if not raw and not uses_trigram_indexes():
+        get_ngram_index().index(instance)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user_for_search(sender, instance, **kwargs):
+    if not uses_trigram_indexes():
+        get_ngram_index().remove(instance.pk)
+
+
+@receiver(variants_ready, sender=User)
+def refresh_profile_variants(sender, pk, **kwargs):
+    # Variants are written with update() from a worker thread, not save()
+    invalidate_profiles([pk])
@@ -1,3 +1,490 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.caching import get_tiered_cache
+
+from . import otp as otp_gate
+from . import audit, maintenance, search, tokens
+from .keys import bump_key_version, rotate_keys
+from .models import Address, AdminAuditLog, SigningKey, User
+
+VERIFY_URL = '/api/auth/verify-email/'
+LOGIN_URL = '/api/auth/login/'
+LOGOUT_URL = '/api/auth/logout/'
+REFRESH_URL = '/api/auth/token/refresh/'
+AUDIT_URL = '/api/auth/admin/audit/'
+USERS_URL = '/api/auth/admin/users/'
+BULK_URL = '/api/auth/admin/users/bulk/'
+PROFILE_URL = '/api/auth/profile/'
+JWKS_URL = '/.well-known/jwks.json'
+
+
+class OTPLockoutTests(TransactionTestCase):
+    # Transactional so the request threads of the concurrency test see the user
+    def setUp(self):
+        get_tiered_cache().clear()
+        self.user = User.objects.create_user('otp@example.com', 'secret-pass', phone='9000000001', otp='123456')
+
+    def verify(self, otp):
+        return Client().post(VERIFY_URL, {'email': self.user.email, 'otp': otp}, content_type='application/json')
+
+    def test_locks_out_after_max_attempts(self):
+        attempts = settings.OTP_GATE['MAX_ATTEMPTS']
+        remaining = [self.verify('000000').json()['attempts_remaining'] for _ in range(attempts)]
+        self.assertEqual(remaining, list(range(attempts - 1, -1, -1)))
+
+        response = self.verify('123456')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_verified)
+
+    def test_correct_otp_within_limit_verifies(self):
+        self.verify('000000')
+        response = self.verify('123456')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_verified)
+
+    def test_concurrent_guesses_cannot_overtake_lockout(self):
+        guesses = 12
+        # Every request passes the lockout pre-check before any is compared,
+        # the worst case for a burst of guesses
+        barrier = threading.Barrier(guesses)
+        real_lockout_remaining = otp_gate.lockout_remaining
+
+        def lockout_remaining(purpose, email):
+            remaining = real_lockout_remaining(purpose, email)
+            barrier.wait(timeout=10)
+            return remaining
+
+        statuses = []
+
+        def guess(index):
+            try:
+                statuses.append(self.verify(f'{index:06d}').status_code)
+            finally:
+                connection.close()
+
+        with mock.patch.object(otp_gate, 'lockout_remaining', lockout_remaining):
+            threads = [threading.Thread(target=guess, args=(index,)) for index in range(guesses)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(statuses.count(400), settings.OTP_GATE['MAX_ATTEMPTS'])
+        self.assertEqual(statuses.count(429), guesses - settings.OTP_GATE['MAX_ATTEMPTS'])
+
+
+class RefreshTokenTests(TransactionTestCase):
+    def setUp(self):
+        get_tiered_cache().clear()
+        tokens._revocations = None
+        self.user = User.objects.create_user(
+            'tokens@example.com', 'secret-pass', phone='9000000002', is_verified=True,
+        )
+        self.client = Client()
+
+    def tearDown(self):
+        tokens.get_writer().flush()
+
+    def login(self):
+        response = self.client.post(
+            LOGIN_URL, {'email': self.user.email, 'password': 'secret-pass'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        tokens.get_writer().flush()
+        return response.json()
+
+    def refresh(self, token):
+        return self.client.post(REFRESH_URL, {'refresh': token}, content_type='application/json')
+
+    def as_other_worker(self):
+        # A worker that never saw this one's cache markers or Bloom filter,
+        # once the rows written behind have reached the database
+        tokens.get_writer().flush()
+        get_tiered_cache().clear()
+        tokens._revocations = None
+
+    def test_rotation_revokes_the_used_token(self):
+        old = self.login()['refresh']
+        response = self.refresh(old)
+        self.assertEqual(response.status_code, 200)
+        new = response.json()['refresh']
+        self.assertNotEqual(new, old)
+
+        self.assertEqual(self.refresh(old).status_code, 401)
+        self.assertEqual(self.refresh(new).status_code, 200)
+
+    def test_rotated_token_rejected_by_another_worker(self):
+        old = self.login()['refresh']
+        self.assertEqual(self.refresh(old).status_code, 200)
+        self.as_other_worker()
+        self.assertEqual(self.refresh(old).status_code, 401)
+
+    def test_logout_revokes_every_token(self):
+        first, second = self.login(), self.login()
+        response = self.client.post(
+            LOGOUT_URL, {'refresh': first['refresh']}, content_type='application/json',
+            HTTP_AUTHORIZATION=f"Bearer {first['access']}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.refresh(first['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(second['refresh']).status_code, 401)
+        self.as_other_worker()
+        self.assertEqual(self.refresh(second['refresh']).status_code, 401)
+
+    def test_login_right_after_logout_is_not_revoked(self):
+        session = self.login()
+        self.client.post(
+            LOGOUT_URL, {'refresh': session['refresh']}, content_type='application/json',
+            HTTP_AUTHORIZATION=f"Bearer {session['access']}",
+        )
+        # Within the same second as the logout
+        self.assertEqual(self.refresh(self.login()['refresh']).status_code, 200)
+
+
+class AdminAuditLogTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin@example.com', 'secret-pass', phone='9000000003', role='admin')
+        now = timezone.now()
+        AdminAuditLog.objects.bulk_create([
+            AdminAuditLog(actor_id=self.admin.pk, actor_email=self.admin.email, action='update',
+                          target_id=n, created_at=now - timedelta(minutes=n))
+            for n in range(5)
+        ])
+        token = tokens.ServiceRefreshToken.for_user(self.admin).access_token
+        tokens.get_writer().flush()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_cursor_pages_through_every_entry_once(self):
+        seen, url = [], f'{AUDIT_URL}?limit=2'
+        while url:
+            # Cursors are pasted into the query string as they are, unencoded
+            response = self.client.get(url, **self.auth)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            seen += [row['target_id'] for row in body['results']]
+            url = body['next_cursor'] and f"{AUDIT_URL}?limit=2&cursor={body['next_cursor']}"
+        self.assertEqual(seen, [0, 1, 2, 3, 4])
+
+    def test_malformed_cursor(self):
+        for cursor in ('abc', '1_2_3', f'{10 ** 20}_1'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(AUDIT_URL, {'cursor': cursor}, **self.auth)
+                self.assertEqual(response.status_code, 400)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        search._index = None
+        self.admin = User.objects.create_user('admin@example.com', 'secret-pass', phone='9000000050', role='admin')
+        self.priya = User.objects.create_user('priya@example.com', 'secret-pass', phone='9000000051',
+                                              first_name='Priya')
+        self.priyanka = User.objects.create_user('pk@example.com', 'secret-pass', phone='9000000052',
+                                                 first_name='Priyanka')
+        User.objects.create_user('rahul@example.com', 'secret-pass', phone='9000000053', first_name='Rahul')
+        token = tokens.ServiceRefreshToken.for_user(self.admin).access_token
+        tokens.get_writer().flush()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def tearDown(self):
+        search._index = None
+
+    def test_ranks_by_best_field_similarity(self):
+        # "priya" shares 5 of its 6 trigrams with "priyanka"
+        ranked = search.NgramIndex(300).search('priya', 0.6, 10)
+        self.assertEqual([pk for pk, _ in ranked], [self.priya.pk, self.priyanka.pk])
+        self.assertEqual(ranked[0][1], 1.0)
+        self.assertAlmostEqual(ranked[1][1], 5 / 6)
+
+    def test_threshold(self):
+        ranked = search.NgramIndex(300).search('priya', 0.9, 10)
+        self.assertEqual([pk for pk, _ in ranked], [self.priya.pk])
+        self.assertEqual(search.NgramIndex(300).search('zzzz', 0.1, 10), [])
+
+    def test_saves_and_deletes_update_the_index(self):
+        index = search.get_ngram_index()
+        index.search('priya', 0.6, 10)
+        self.priyanka.first_name = 'Meera'
+        self.priyanka.save()
+        self.priya.delete()
+        self.assertEqual(index.search('priya', 0.6, 10), [])
+        self.assertEqual([pk for pk, _ in index.search('meera', 0.6, 10)], [self.priyanka.pk])
+
+    def test_admin_list_orders_by_similarity(self):
+        response = self.client.get(USERS_URL, {'q': 'priya'}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['id'] for user in response.json()], [self.priya.pk, self.priyanka.pk])
+
+
+class AdminUserBulkTests(TestCase):
+    def setUp(self):
+        # Entries are written behind; keep each test's inside its transaction
+        audit.get_writer().flush()
+        self.admin = User.objects.create_user('admin@example.com', 'secret-pass', phone='9000000060', role='admin')
+        self.users = [
+            User.objects.create_user(f'staff{i}@corp.example', 'secret-pass', phone=f'900000006{i + 1}')
+            for i in range(3)
+        ]
+        token = tokens.ServiceRefreshToken.for_user(self.admin).access_token
+        tokens.get_writer().flush()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def tearDown(self):
+        audit.get_writer().flush()
+
+    def bulk(self, **body):
+        return self.client.post(BULK_URL, body, content_type='application/json', **self.auth)
+
+    def admins(self):
+        return set(User.objects.filter(role='admin').values_list('pk', flat=True))
+
+    def test_last_admin_is_never_demoted(self):
+        for target in ({'ids': [self.admin.pk]}, {'filter': {'role': 'admin'}}):
+            with self.subTest(**target):
+                response = self.bulk(action='update', changes={'role': 'user'}, **target)
+                self.assertEqual(response.json()['affected'], 0)
+                response = self.bulk(action='update', changes={'is_active': False}, **target)
+                self.assertEqual(response.json()['affected'], 0)
+                self.assertEqual(self.admins(), {self.admin.pk})
+
+    def test_admins_demoted_while_another_remains(self):
+        other = self.users[0]
+        User.objects.filter(pk=other.pk).update(role='admin')
+        # Demoting every admin at once would leave none, so nobody is demoted
+        self.assertEqual(self.bulk(action='update', filter={'role': 'admin'}, changes={'role': 'user'})
+                         .json()['affected'], 0)
+        self.assertEqual(self.bulk(action='update', ids=[other.pk], changes={'role': 'user'})
+                         .json()['affected'], 1)
+        self.assertEqual(self.admins(), {self.admin.pk})
+
+    def test_last_admin_is_never_deleted(self):
+        for target in ({'ids': [self.admin.pk, self.users[0].pk]}, {'filter': {'role': 'admin'}}):
+            with self.subTest(**target):
+                self.bulk(action='delete', **target)
+                self.assertTrue(User.objects.filter(pk=self.admin.pk).exists())
+        self.assertFalse(User.objects.filter(pk=self.users[0].pk).exists())
+
+    def test_delete_by_filter(self):
+        User.objects.create_user('guest@elsewhere.example', 'secret-pass', phone='9000000069')
+        response = self.bulk(action='delete', filter={'email_domain': 'corp.example'})
+        self.assertEqual(response.json()['affected'], 3)
+        self.assertEqual(
+            set(User.objects.values_list('email', flat=True)), {'admin@example.com', 'guest@elsewhere.example'},
+        )
+
+    def test_target_limits(self):
+        for body in (
+            {'action': 'delete'},
+            {'action': 'delete', 'ids': []},
+            {'action': 'delete', 'filter': {}},
+            {'action': 'delete', 'ids': list(range(1, 10_002))},
+            {'action': 'update', 'ids': [self.users[0].pk]},
+            {'action': 'delete', 'filter': {'role': 'owner'}},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.bulk(**body).status_code, 400)
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_writes_one_audit_entry_per_action(self):
+        ids = [user.pk for user in self.users[:2]]
+        self.bulk(action='update', ids=ids, changes={'is_verified': True})
+        self.bulk(action='delete', filter={'email_domain': 'corp.example'})
+        audit.get_writer().flush()
+        entries = list(AdminAuditLog.objects.order_by('id').values(
+            'actor_id', 'action', 'target_ids', 'filters', 'changes', 'affected',
+        ))
+        self.assertEqual(entries, [
+            {'actor_id': self.admin.pk, 'action': 'bulk_update', 'target_ids': ids, 'filters': {},
+             'changes': {'is_verified': True}, 'affected': 2},
+            {'actor_id': self.admin.pk, 'action': 'bulk_delete', 'target_ids': [],
+             'filters': {'email_domain': 'corp.example'}, 'changes': {}, 'affected': 3},
+        ])
+
+
+@override_settings(DATA_RETENTION={
+    'UNVERIFIED_RETENTION_DAYS': 7, 'EXPIRED_TOKEN_GRACE_DAYS': 1,
+    'BATCH_SIZE': 2, 'PAUSE_SECONDS': 0, 'MAX_SECONDS': 60,
+})
+class PurgeStaleDataTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.count = 0
+
+    def user(self, joined_days_ago=30, **fields):
+        self.count += 1
+        user = User.objects.create_user(f'purge{self.count}@example.com', 'secret-pass',
+                                        phone=f'90000071{self.count:02d}', **fields)
+        User.objects.filter(pk=user.pk).update(date_joined=self.now - timedelta(days=joined_days_ago))
+        return user
+
+    def remaining(self, *users):
+        return set(User.objects.filter(pk__in=[user.pk for user in users]).values_list('pk', flat=True))
+
+    def test_purges_only_stale_unverified_users(self):
+        stale = self.user()
+        Address.objects.create(user=stale, city='Pune')
+        kept = [
+            self.user(role='admin'),
+            self.user(is_superuser=True),
+            self.user(is_verified=True),
+            self.user(last_login=self.now - timedelta(days=1)),
+            self.user(joined_days_ago=1),
+        ]
+        report = maintenance.purge(self.now, ['users'])['users']
+        self.assertTrue(report['complete'])
+        self.assertEqual(report['deleted'], {'user_auth.User': 1, 'user_auth.Address': 1})
+        self.assertEqual(self.remaining(stale, *kept), {user.pk for user in kept})
+
+    def test_dry_run_deletes_nothing(self):
+        users = [self.user() for _ in range(3)]
+        out = StringIO()
+        call_command('purge_stale_data', '--dry-run', '--only', 'users', stdout=out)
+        self.assertIn('3 rows would be purged', out.getvalue())
+        self.assertEqual(len(self.remaining(*users)), 3)
+
+    def test_resumes_by_key_and_keeps_users_verified_mid_run(self):
+        users = [self.user() for _ in range(5)]
+        real_atomic = transaction.atomic
+        batches = []
+
+        def atomic():
+            # The third user verifies after its batch's keys were read
+            if len(batches) == 1:
+                User.objects.filter(pk=users[2].pk).update(is_verified=True)
+            return real_atomic()
+
+        with mock.patch.object(maintenance, 'transaction', SimpleNamespace(atomic=atomic)):
+            report = maintenance.purge_in_batches(
+                maintenance.stale_unverified_users(self.now), 2, on_batch=batches.append,
+            )
+        self.assertEqual(batches, [[users[0].pk, users[1].pk], [users[2].pk, users[3].pk], [users[4].pk]])
+        self.assertEqual((report['batches'], report['complete']), (3, True))
+        self.assertEqual(report['deleted'], {'user_auth.User': 4})
+        self.assertEqual(self.remaining(*users), {users[2].pk})
+
+    def test_stops_at_the_deadline(self):
+        users = [self.user() for _ in range(3)]
+        report = maintenance.purge_in_batches(
+            maintenance.stale_unverified_users(self.now), 1,
+            deadline=time.monotonic() + 0.05, on_batch=lambda ids: time.sleep(0.1),
+        )
+        self.assertEqual((report['batches'], report['complete']), (1, False))
+        self.assertEqual(len(self.remaining(*users)), 2)
+
+        with override_settings(DATA_RETENTION={**settings.DATA_RETENTION, 'MAX_SECONDS': 0}):
+            report = maintenance.purge(self.now, ['users'])['users']
+        self.assertEqual((report['batches'], report['complete']), (0, False))
+
+    def test_purges_expired_tokens_and_orphaned_addresses(self):
+        user = self.user(is_verified=True)
+        tokens_by_age = {
+            days: OutstandingToken.objects.create(user=user, jti=f'jti-{days}', token='t',
+                                                  expires_at=self.now - timedelta(days=days))
+            for days in (3, 0)
+        }
+        BlacklistedToken.objects.create(token=tokens_by_age[3])
+        Address.objects.create(user=user, city='Kept')
+        with connection.constraint_checks_disabled():
+            Address.objects.create(user_id=user.pk + 1000, city='Orphaned')
+
+        reports = maintenance.purge(self.now, ['tokens', 'addresses'])
+        self.assertEqual(reports['tokens']['deleted'], {
+            'token_blacklist.OutstandingToken': 1, 'token_blacklist.BlacklistedToken': 1,
+        })
+        self.assertEqual(reports['addresses']['deleted'], {'user_auth.Address': 1})
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-0'])
+        self.assertEqual(list(Address.objects.values_list('city', flat=True)), ['Kept'])
+
+
+class SigningKeyTests(TestCase):
+    def setUp(self):
+        # The key ring reloads when the key version changes
+        bump_key_version()
+        self.user = User.objects.create_user('keys@example.com', 'secret-pass', phone='9000000080')
+
+    def tearDown(self):
+        bump_key_version()
+
+    def rotate(self, **options):
+        with self.captureOnCommitCallbacks(execute=True):
+            return rotate_keys(algorithm='EdDSA', **options)
+
+    def access_token(self):
+        token = str(tokens.ServiceRefreshToken.for_user(self.user).access_token)
+        tokens.get_writer().flush()
+        return token
+
+    def profile_status(self, token):
+        return self.client.get(PROFILE_URL, HTTP_AUTHORIZATION=f'Bearer {token}').status_code
+
+    def test_jwks_publishes_public_keys_only(self):
+        key = self.rotate(publish_ahead=timedelta(0))
+        response = self.client.get(JWKS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=', response['Cache-Control'])
+        [jwk] = response.json()['keys']
+        self.assertEqual((jwk['kid'], jwk['alg'], jwk['use'], jwk['kty']), (key.kid, 'EdDSA', 'sig', 'OKP'))
+        self.assertNotIn('d', jwk)
+
+    def test_rotation_publishes_ahead_and_hands_over(self):
+        first = self.rotate(publish_ahead=timedelta(0))
+        old_token = self.access_token()
+        self.assertEqual(jwt.get_unverified_header(old_token)['kid'], first.kid)
+
+        second = self.rotate()
+        kids = {jwk['kid'] for jwk in self.client.get(JWKS_URL).json()['keys']}
+        self.assertEqual(kids, {first.kid, second.kid})
+        # Published, but the old key signs until the handover
+        self.assertEqual(jwt.get_unverified_header(self.access_token())['kid'], first.kid)
+
+        third = self.rotate(publish_ahead=timedelta(0))
+        self.assertEqual(jwt.get_unverified_header(self.access_token())['kid'], third.kid)
+        # The replaced key keeps verifying the tokens it signed
+        self.assertEqual(self.profile_status(old_token), 200)
+        first.refresh_from_db()
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        self.assertGreater(first.expires_at, timezone.now() + lifetime)
+
+    def test_expired_kid_is_rejected(self):
+        first = self.rotate(publish_ahead=timedelta(0))
+        old_token = self.access_token()
+        self.rotate(publish_ahead=timedelta(0))
+        SigningKey.objects.filter(pk=first.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        bump_key_version()
+        self.assertEqual(self.profile_status(old_token), 401)
+        self.assertNotIn(first.kid, {jwk['kid'] for jwk in self.client.get(JWKS_URL).json()['keys']})
+
+    def test_compromised_key_stops_verifying_at_once(self):
+        self.rotate(publish_ahead=timedelta(0))
+        old_token = self.access_token()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rotate_signing_keys', '--compromised', '--algorithm', 'EdDSA', stdout=StringIO())
+        self.assertEqual(self.profile_status(old_token), 401)
+        self.assertEqual(self.profile_status(self.access_token()), 200)
+        self.assertEqual(len(self.client.get(JWKS_URL).json()['keys']), 1)
+
+    def test_hs256_tokens_rejected_once_a_key_exists(self):
+        hs256_token = self.access_token()
+        self.assertNotIn('kid', jwt.get_unverified_header(hs256_token))
+        self.assertEqual(self.profile_status(hs256_token), 200)
+        self.rotate(publish_ahead=timedelta(0))
+        self.assertEqual(self.profile_status(hs256_token), 401)
+        with override_settings(SIGNING_KEYS={**settings.SIGNING_KEYS, 'ACCEPT_HS256': True}):
+            self.assertEqual(self.profile_status(hs256_token), 200)
@@ -0,0 +1,346 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from core.caching import get_tiered_cache
+from core.sketches import BloomFilter
+
+from .caching import token_user_cache_key
+from .keys import get_token_backend
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+REVOKED_NAMESPACE = 'user_auth:token:revoked'
+
+
+def revoked_key(jti):
+    return f'{REVOKED_NAMESPACE}:{jti}'
+
+
+def revoked_before_key(user_id):
+    return f'{REVOKED_NAMESPACE}:user:{user_id}'
+
+
+def _outstanding_row(token):
+    return {
+        'jti': token[api_settings.JTI_CLAIM],
+        'user_id': token.get(api_settings.USER_ID_CLAIM),
+        'token': str(token),
+        'created_at': token.current_time,
+        'expires_at': datetime_from_epoch(token['exp']),
+    }
+
+
+class TokenWriter:
+    """
+    Write-behind buffer for ``OutstandingToken`` and ``BlacklistedToken``
+    rows. A background thread flushes every ``interval`` seconds or once
+    ``batch_size`` rows are waiting, as three bulk statements per batch
+    instead of a handful of queries per refresh.
+
+    Rows still buffered when a process dies are lost; revocations are
+    also recorded in the shared cache, so a lost blacklist row does not
+    make a revoked token usable again before it expires. Without a shared
+    cache, other workers only see a revocation once its row is written.
+    """
+
+    def __init__(self, batch_size=500, interval=1.0, background=True):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.background = background
+        self._outstanding = {}
+        self._blacklisted = set()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def outstand(self, token):
+        self._enqueue(_outstanding_row(token))
+
+    def blacklist(self, token):
+        self._enqueue(_outstanding_row(token), blacklist=True)
+
+    def pending_blacklist(self):
+        with self._condition:
+            return set(self._blacklisted)
+
+    def _enqueue(self, row, blacklist=False):
+        with self._condition:
+            self._outstanding.setdefault(row['jti'], row)
+            if blacklist:
+                self._blacklisted.add(row['jti'])
+            pending = len(self._outstanding)
+            if self.background:
+                self._ensure_thread()
+                if pending >= self.batch_size:
+                    self._condition.notify()
+        if not self.background:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='token-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait(self.interval)
+            try:
+                self.flush()
+            finally:
+                # Not a request thread, so nothing else closes this
+                connection.close()
+
+    def flush(self):
+        """Write everything buffered so far; safe to call from any thread."""
+        with self._flush_lock:
+            with self._condition:
+                rows, self._outstanding = self._outstanding, {}
+                jtis, self._blacklisted = self._blacklisted, set()
+            if not rows:
+                return
+            try:
+                self._write(list(rows.values()), jtis)
+            except Exception:
+                logger.exception('Failed to write %d outstanding tokens', len(rows))
+
+    @staticmethod
+    def _write(rows, jtis):
+        # A user deleted since the token was issued would fail the FK check.
+        # The user id claim is a string
+        user_ids = {row['user_id'] for row in rows if row['user_id'] is not None}
+        existing = {str(pk) for pk in User.objects.filter(pk__in=user_ids).values_list('pk', flat=True)}
+        OutstandingToken.objects.bulk_create(
+            [
+                OutstandingToken(**{**row, 'user_id': row['user_id'] if str(row['user_id']) in existing else None})
+                for row in rows
+            ],
+            ignore_conflicts=True,
+        )
+        if jtis:
+            ids = OutstandingToken.objects.filter(jti__in=jtis).values_list('id', flat=True)
+            BlacklistedToken.objects.bulk_create(
+                [BlacklistedToken(token_id=token_id) for token_id in ids],
+                ignore_conflicts=True,
+            )
+
+
+class RevocationFilter:
+    """
+    Bloom filter of blacklisted JTIs, rebuilt from the database every
+    ``rebuild_seconds``. A miss proves a token was not blacklisted as of
+    the last rebuild, so only the rare hit (a revoked token or a false
+    positive) is confirmed with a query.
+    """
+
+    def __init__(self, capacity, error_rate, rebuild_seconds):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_seconds = rebuild_seconds
+        self._bloom = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        stale = time.monotonic() - self._built_at > self.rebuild_seconds
+        if (self._bloom is None or stale or self._bloom.saturated) and self._lock.acquire(blocking=self._bloom is None):
+            try:
+                self._rebuild()
+            finally:
+                self._lock.release()
+        return self._bloom
+
+    def _rebuild(self):
+        jtis = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list('token__jti', flat=True)
+        )
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        bloom.update(jtis)
+        bloom.update(get_writer().pending_blacklist())
+        self._bloom, self._built_at = bloom, time.monotonic()
+
+    def add(self, jti):
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+    def is_blacklisted(self, jti):
+        if not self._current().might_contain(jti):
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+_writer = None
+_revocations = None
+_state_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _state_lock:
+            if _writer is None:
+                options = settings.REFRESH_TOKENS
+                _writer = TokenWriter(
+                    batch_size=options['WRITE_BEHIND_BATCH'],
+                    interval=options['WRITE_BEHIND_INTERVAL'],
+                    background=options['WRITE_BEHIND'],
+                )
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def get_revocations():
+    global _revocations
+    if _revocations is None:
+        with _state_lock:
+            if _revocations is None:
+                options = settings.REFRESH_TOKENS
+                _revocations = RevocationFilter(
+                    options['BLOOM_CAPACITY'], options['BLOOM_ERROR_RATE'], options['BLOOM_REBUILD_SECONDS'],
+                )
+    return _revocations
+
+
+class KeyRingTokenMixin:
+    # Sign and verify with the rotating keys in user_auth.keys
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class ServiceAccessToken(KeyRingTokenMixin, AccessToken):
+    pass
+
+
+class ServiceRefreshToken(KeyRingTokenMixin, RefreshToken):
+    """
+    Refresh token whose blacklist checks and bookkeeping avoid the
+    database: revocation is checked against cache markers and a Bloom
+    filter, and outstanding/blacklist rows are written behind. The
+    markers need a shared cache (Redis); with a per-process cache the
+    blacklist is checked in the database, which other workers' rows
+    reach within ``WRITE_BEHIND_INTERVAL``.
+    """
+
+    access_token_class = ServiceAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user, which inserts the outstanding row inline
+        token = super(BlacklistMixin, cls).for_user(user)
+        get_writer().outstand(token)
+        return token
+
+    def set_iat(self, claim='iat', at_time=None):
+        # Sub-second, so a logout does not also revoke a token issued later
+        # within the same second (NumericDate allows fractions)
+        if at_time is None:
+            at_time = self.current_time
+        self.payload[claim] = round(at_time.timestamp(), 6)
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        cache = get_tiered_cache()
+        markers = cache.get_many([revoked_key(jti), revoked_before_key(user_id)])
+        if revoked_key(jti) in markers:
+            raise TokenError('Token is blacklisted')
+        revoked_before = markers.get(revoked_before_key(user_id))
+        if revoked_before is not None and self.payload.get('iat', 0) < revoked_before:
+            raise TokenError('Token is blacklisted')
+        # A per-process cache only holds this worker's markers and Bloom
+        # filter, so other workers' revocations are read from the database
+        if cache.is_shared:
+            blacklisted = get_revocations().is_blacklisted(jti)
+        else:
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if blacklisted:
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        """
+        Revoke this token. Returns False if it was already revoked, which
+        makes a concurrent second use of the same refresh token fail.
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        timeout = max(1, int(self.payload['exp'] - time.time()) + 1)
+        if not get_tiered_cache().add(revoked_key(jti), 1, timeout=timeout):
+            return False
+        get_revocations().add(jti)
+        get_writer().blacklist(self)
+        return True
+
+    def outstand(self):
+        get_writer().outstand(self)
+
+
+def ensure_active_user(user_id):
+    """Reject refreshes for inactive or deleted users, reading is_active from the cache."""
+    cache = get_tiered_cache()
+    key = token_user_cache_key(user_id)
+    active = cache.get(key)
+    if active is None:
+        active = User.objects.filter(pk=user_id, is_active=True).exists()
+        cache.set(key, active, timeout=settings.REFRESH_TOKENS['USER_STATE_TIMEOUT'])
+    if not active:
+        raise AuthenticationFailed('No active account found for the given token.', 'no_active_account')
+
+
+def refresh_tokens(raw_token):
+    """
+    Validate a refresh token and return new credentials, rotating and
+    blacklisting as configured in ``SIMPLE_JWT``.
+
+    Returns:
+        dict: ``access``, plus ``refresh`` when rotation is enabled
+
+    Raises:
+        TokenError: invalid, expired or revoked token
+        AuthenticationFailed: the user is inactive or gone
+    """
+    token = ServiceRefreshToken(raw_token)
+    ensure_active_user(token.get(api_settings.USER_ID_CLAIM))
+    data = {'access': str(token.access_token)}
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        if api_settings.BLACKLIST_AFTER_ROTATION and not token.blacklist():
+            raise TokenError('Token is blacklisted')
+        token.set_jti()
+        token.set_exp()
+        token.set_iat()
+        token.outstand()
+        data['refresh'] = str(token)
+    return data
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revoke every refresh token of a user. Tokens issued before now are
+    rejected at once through a cache marker; rows are then blacklisted in
+    the database, including any still waiting in this process's buffer.
+
+    Without a shared cache the marker only reaches this process and other
+    workers rely on the database rows, so a token another worker issued
+    in the last ``WRITE_BEHIND_INTERVAL`` and has not written yet stays
+    valid.
+    """
+    lifetime = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+    get_tiered_cache().set(revoked_before_key(user_id), time.time(), timeout=int(lifetime) + 1)
+    get_writer().flush()
+    tokens = OutstandingToken.objects.filter(user_id=user_id, blacklistedtoken__isnull=True)
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token=token) for token in tokens],
+        ignore_conflicts=True,
+    )
@@ -19,6 +19,10 @@ urlpatterns = [
     # Admin Management
     path('admin/dashboard/', views.AdminDashboardView.as_view(), name='admin_dashboard'),
     path('admin/users/', views.AdminUserListView.as_view(), name='admin_user_list'),
+    path('admin/users/bulk/', views.AdminUserBulkView.as_view(), name='admin_user_bulk'),
     path('admin/users/<int:user_id>/', views.AdminUserManageView.as_view(), name='admin_user_manage'),
+    path('admin/audit/', views.AdminAuditLogView.as_view(), name='admin_audit_log'),
     path('admin/activity/', views.UserActivityView.as_view(), name='user_activity'),
+    path('admin/analytics/timeseries/', views.AdminAnalyticsTimeseriesView.as_view(), name='admin_analytics_timeseries'),
+    path('admin/analytics/funnel/', views.AdminFunnelView.as_view(), name='admin_analytics_funnel'),
 ]
@@ -1,16 +1,29 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.exceptions import TokenError
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import transaction
+from django.db.models import Count, Exists, Q
+from functools import reduce
+import operator
 from django.core.mail import send_mail
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, timedelta, timezone as dt_timezone
+from . import audit
+from . import otp as otp_gate
+from . import rollups
+from .keys import get_token_backend
+from .caching import cache_profile, cached_dashboard, get_cached_profile, invalidate_profiles, invalidate_user_caches
 from .models import User
+from .search import search_users
+from .tokens import ServiceRefreshToken, refresh_tokens, revoke_user_tokens
 from .serializers import (
     RegisterSerializer, LoginSerializer, ProfileSerializer,
-    OTPSerializer, PasswordResetSerializer, PasswordChangeSerializer
+    OTPSerializer, PasswordResetSerializer, PasswordChangeSerializer,
+    AdminBulkActionSerializer,
 )
 import random
 import logging
@@ -21,6 +34,7 @@ logger = logging.getLogger(__name__)
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    query_budget = 7
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -43,8 +57,8 @@ class RegisterView(generics.CreateAPIView):
                 [user.email],
                 fail_silently=False,
             )
-        except Exception as e:
-            print(f"Email send failed: {e}")
+        except Exception:
+            logger.exception('Verification email failed', extra={'user_id': user.pk})
         
         return Response({
             'message': 'Registration successful! Please check your email for OTP verification.',
@@ -52,36 +66,81 @@ class RegisterView(generics.CreateAPIView):
             'otp_sent': True
         }, status=status.HTTP_201_CREATED)
 
+def locked_out_response(seconds):
+    return Response(
+        {'detail': 'Too many invalid attempts. Try again later.'},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(seconds)},
+    )
+
+def otp_gate_response(purpose, email):
+    """
+    Answer an OTP attempt from the cache when it must be refused anyway:
+    locked-out addresses and emails already known not to exist never
+    reach the database.
+    """
+    locked_for = otp_gate.lockout_remaining(purpose, email)
+    if locked_for:
+        return locked_out_response(locked_for)
+    if otp_gate.is_unknown_email(email):
+        return Response({'detail': 'User not found.'}, status=404)
+    return None
+
+def invalid_otp_response(purpose, email, remaining):
+    if not remaining:
+        # The last allowed attempt failed; refuse the next from the cache
+        otp_gate.lock_out(purpose, email)
+    return Response({'detail': 'Invalid OTP.', 'attempts_remaining': remaining}, status=400)
+
 # OTP/email verification
 class OTPVerifyView(APIView):
     permission_classes = [permissions.AllowAny]
+    query_budget = 4
     
     def post(self, request):
         serializer = OTPSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data['email']
         otp = serializer.validated_data['otp']
+        blocked = otp_gate_response('verify', email)
+        if blocked:
+            return blocked
+        # A retried request with the OTP that already succeeded gets the same answer
+        replayed = otp_gate.replayed_response('verify', email, otp)
+        if replayed:
+            return Response(replayed)
         try:
             user = User.objects.get(email=email)
-            if user.otp == otp:
-                user.is_verified = True
-                user.otp = None
-                user.save()
-                return Response({
-                    'message': 'Email verified successfully! You can now login.',
-                    'verified': True,
-                    'user': {
-                        'name': user.first_name,
-                        'email': user.email
-                    }
-                })
-            return Response({'detail': 'Invalid OTP.'}, status=400)
         except User.DoesNotExist:
+            otp_gate.remember_unknown_email(email)
             return Response({'detail': 'User not found.'}, status=404)
+        # Counted before comparing, so concurrent guesses cannot overtake the lockout
+        remaining = otp_gate.claim_attempt('verify', email)
+        if remaining is None:
+            return locked_out_response(settings.OTP_GATE['LOCKOUT_SECONDS'])
+        if not otp_gate.otp_matches(user.otp, otp):
+            return invalid_otp_response('verify', email, remaining)
+        user.is_verified = True
+        user.otp = None
+        user.save()
+        payload = {
+            'message': 'Email verified successfully! You can now login.',
+            'verified': True,
+            'user': {
+                'name': user.first_name,
+                'email': user.email
+            }
+        }
+        otp_gate.clear_failures('verify', email)
+        otp_gate.remember_success('verify', email, otp, payload)
+        return Response(payload)
 
 # Login (JWT-based)
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    # The user, plus the signing keys on a worker's first token or after a
+    # rotation; token rows and rollup counts are written behind
+    query_budget = 2
     
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -90,7 +149,8 @@ class LoginView(APIView):
         password = serializer.validated_data['password']
         user = authenticate(email=email, password=password)
         if user and user.is_verified:
-            refresh = RefreshToken.for_user(user)
+            refresh = ServiceRefreshToken.for_user(user)
+            rollups.record('logins')
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -107,45 +167,53 @@ class LoginView(APIView):
 # Logout with token blacklisting
 class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    # Writing out buffered tokens, then blacklisting the user's open ones
+    query_budget = 10
     
     def post(self, request):
         try:
-            refresh_token = request.data.get('refresh')
-            if refresh_token:
-                token = RefreshToken(refresh_token)
-                token.blacklist()
-            
-            # Blacklist all tokens for this user
-            tokens = OutstandingToken.objects.filter(user_id=request.user.id)
-            for token in tokens:
-                try:
-                    BlacklistedToken.objects.get_or_create(token=token)
-                except:
-                    pass
+            # Revokes the submitted refresh token along with every other
+            # one of this user, so it needs no blacklisting of its own
+            revoke_user_tokens(request.user.id)
                     
-            logger.info(f"User {request.user.email} logged out successfully")
+            logger.info('User logged out', extra={'user_id': request.user.pk})
             return Response({'detail': 'Successfully logged out.'}, status=status.HTTP_200_OK)
-        except Exception as e:
-            logger.error(f"Logout error for user {request.user.email}: {str(e)}")
+        except Exception:
+            logger.exception('Logout failed', extra={'user_id': request.user.pk})
             return Response({'detail': 'Logout successful.'}, status=status.HTTP_200_OK)
 
-# Refresh tokens
+# Refresh tokens (also served at /api/token/refresh/)
 class TokenRefreshView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    # is_active on a cache miss, plus the blacklist when the cache is per-process
+    query_budget = 3
     
     def post(self, request):
         refresh = request.data.get('refresh')
         if not refresh:
             return Response({'detail': 'Refresh token required.'}, status=400)
         try:
-            token = RefreshToken(refresh)
-            return Response({'access': str(token.access_token)})
-        except Exception:
-            return Response({'detail': 'Invalid refresh token.'}, status=400)
+            return Response(refresh_tokens(refresh))
+        except TokenError:
+            return Response({'detail': 'Invalid refresh token.', 'code': 'token_not_valid'}, status=401)
+
+# Public signing keys, so other services verify access tokens locally
+class JWKSView(APIView):
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    query_budget = 1
+
+    def get(self, request):
+        max_age = settings.SIGNING_KEYS['JWKS_MAX_AGE']
+        response = Response(get_token_backend().ring.jwks())
+        response['Cache-Control'] = f'public, max-age={max_age}, stale-while-revalidate={max_age}'
+        return response
 
 # Resend OTP
 class ResendOTPView(APIView):
     permission_classes = [permissions.AllowAny]
+    query_budget = 2
     
     def post(self, request):
         email = request.data.get('email')
@@ -172,6 +240,7 @@ class ResendOTPView(APIView):
 # Resend Verification
 class ResendVerificationView(APIView):
     permission_classes = [permissions.AllowAny]
+    query_budget = 2
     
     def post(self, request):
         email = request.data.get('email')
@@ -199,13 +268,29 @@ class ResendVerificationView(APIView):
 class ProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'GET': 2, 'PUT': 8, 'PATCH': 8}
     
     def get_object(self):
         return self.request.user
 
+    def retrieve(self, request, *args, **kwargs):
+        # Cached without the request so the stored copy holds relative URLs
+        data = get_cached_profile(request.user.pk)
+        if data is None:
+            data = dict(ProfileSerializer(request.user).data)
+            cache_profile(request.user.pk, data)
+        if data.get('profile_picture'):
+            data = {**data, 'profile_picture': request.build_absolute_uri(data['profile_picture'])}
+        return Response(data)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_profiles([serializer.instance.pk])
+
 # Password reset (forgot/reset)
 class PasswordResetView(APIView):
     permission_classes = [permissions.AllowAny]
+    query_budget = 2
     
     def post(self, request):
         serializer = PasswordResetSerializer(data=request.data)
@@ -230,6 +315,7 @@ class PasswordResetView(APIView):
 # Password change (after OTP verification)
 class PasswordChangeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
     
     def post(self, request):
         serializer = PasswordChangeSerializer(data=request.data)
@@ -246,6 +332,7 @@ class PasswordChangeView(APIView):
 # Password reset OTP verification and update password
 class PasswordResetVerifyView(APIView):
     permission_classes = [permissions.AllowAny]
+    query_budget = 2
     
     def post(self, request):
         email = request.data.get('email')
@@ -253,16 +340,27 @@ class PasswordResetVerifyView(APIView):
         new_password = request.data.get('new_password')
         if not email or not otp or not new_password:
             return Response({'detail': 'Missing fields.'}, status=400)
+        blocked = otp_gate_response('reset', email)
+        if blocked:
+            return blocked
+        # No replay shortcut here: a reset sets a credential, so it is only
+        # ever applied once
         try:
             user = User.objects.get(email=email)
-            if user.otp == otp:
-                user.set_password(new_password)
-                user.otp = None
-                user.save()
-                return Response({'detail': 'Password reset successful.'})
-            return Response({'detail': 'Invalid OTP.'}, status=400)
         except User.DoesNotExist:
+            otp_gate.remember_unknown_email(email)
             return Response({'detail': 'User not found.'}, status=404)
+        # Counted before comparing, so concurrent guesses cannot overtake the lockout
+        remaining = otp_gate.claim_attempt('reset', email)
+        if remaining is None:
+            return locked_out_response(settings.OTP_GATE['LOCKOUT_SECONDS'])
+        if not otp_gate.otp_matches(user.otp, otp):
+            return invalid_otp_response('reset', email, remaining)
+        user.set_password(new_password)
+        user.otp = None
+        user.save()
+        otp_gate.clear_failures('reset', email)
+        return Response({'detail': 'Password reset successful.'})
 
 # Roles & permissions (user, admin)
 class IsAdmin(permissions.BasePermission):
@@ -272,22 +370,24 @@ class IsAdmin(permissions.BasePermission):
 # Admin Dashboard - User Management
 class AdminDashboardView(APIView):
     permission_classes = [IsAdmin]
+    query_budget = 3
     
     def get(self, request):
-        total_users = User.objects.count()
-        verified_users = User.objects.filter(is_verified=True).count()
-        unverified_users = User.objects.filter(is_verified=False).count()
-        admin_users = User.objects.filter(role='admin').count()
+        return Response(cached_dashboard(self.build_dashboard))
+
+    @staticmethod
+    def build_dashboard():
+        stats = User.objects.aggregate(
+            total_users=Count('id'),
+            verified_users=Count('id', filter=Q(is_verified=True)),
+            unverified_users=Count('id', filter=Q(is_verified=False)),
+            admin_users=Count('id', filter=Q(role='admin')),
+        )
         
         recent_users = User.objects.order_by('-date_joined')[:10]
         
-        return Response({
-            'stats': {
-                'total_users': total_users,
-                'verified_users': verified_users,
-                'unverified_users': unverified_users,
-                'admin_users': admin_users,
-            },
+        return {
+            'stats': stats,
             'recent_users': [
                 {
                     'id': user.id,
@@ -299,29 +399,45 @@ class AdminDashboardView(APIView):
                 }
                 for user in recent_users
             ]
-        })
+        }
 
 # Admin - List All Users
 class AdminUserListView(generics.ListAPIView):
     permission_classes = [IsAdmin]
     serializer_class = ProfileSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.prefetch_related('addresses')
+    # One more when the SQLite n-gram search index rebuilds
+    query_budget = 4
     
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if query and len(query) < settings.USER_SEARCH['MIN_QUERY_LENGTH']:
+            return Response(
+                {'detail': f"Search needs at least {settings.USER_SEARCH['MIN_QUERY_LENGTH']} characters."},
+                status=400,
+            )
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
         queryset = super().get_queryset()
         role = self.request.query_params.get('role', None)
         is_verified = self.request.query_params.get('is_verified', None)
+        query = self.request.query_params.get('q', '').strip()
         
         if role:
             queryset = queryset.filter(role=role)
         if is_verified is not None:
             queryset = queryset.filter(is_verified=is_verified.lower() == 'true')
+        if query:
+            # Ranked by similarity to the best-matching field
+            return search_users(queryset, query)
             
         return queryset.order_by('-date_joined')
 
 # Admin - Manage User (Update/Delete)
 class AdminUserManageView(APIView):
     permission_classes = [IsAdmin]
+    query_budget = {'GET': 3, 'PUT': 5, 'DELETE': 5}
     
     def get(self, request, user_id):
         try:
@@ -340,16 +456,18 @@ class AdminUserManageView(APIView):
             is_verified = request.data.get('is_verified')
             is_active = request.data.get('is_active')
             
+            changes = {}
             if role and role in ['user', 'admin']:
-                user.role = role
+                user.role = changes['role'] = role
             if is_verified is not None:
-                user.is_verified = bool(is_verified)
+                user.is_verified = changes['is_verified'] = bool(is_verified)
             if is_active is not None:
-                user.is_active = bool(is_active)
+                user.is_active = changes['is_active'] = bool(is_active)
                 
             user.save()
+            invalidate_user_caches([user.id])
             
-            logger.info(f"Admin {request.user.email} updated user {user.email}")
+            audit.record(request.user, 'update', target_id=user.id, changes=changes, affected=1)
             return Response({'detail': 'User updated successfully.'})
         except User.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=404)
@@ -362,15 +480,213 @@ class AdminUserManageView(APIView):
                 
             user_email = user.email
             user.delete()
+            invalidate_user_caches([user_id])
             
-            logger.info(f"Admin {request.user.email} deleted user {user_email}")
+            audit.record(request.user, 'delete', target_id=user_id, changes={'email': user_email}, affected=1)
             return Response({'detail': 'User deleted successfully.'})
         except User.DoesNotExist:
             return Response({'detail': 'User not found.'}, status=404)
 
+def last_admin_guard(target_pks):
+    """
+    Row filter that only lets an admin row be demoted, deactivated or
+    deleted while another active admin outside ``target_pks`` remains.
+    Evaluated inside the same statement, so the check and the write agree.
+    """
+    other_admins = User.objects.filter(role='admin', is_active=True).exclude(pk__in=target_pks)
+    return ~Q(role='admin') | Exists(other_admins)
+
+# Admin - Bulk role/verification/activation changes and deletes
+class AdminUserBulkView(APIView):
+    permission_classes = [IsAdmin]
+    # No query_budget: deletes cost a few queries per batch of DELETE_BATCH_SIZE
+    DELETE_BATCH_SIZE = 500
+
+    def post(self, request):
+        serializer = AdminBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = self.get_target_queryset(data)
+
+        if data['action'] == 'update':
+            affected = self.bulk_update(queryset, data['changes'])
+        else:
+            affected = self.bulk_delete(queryset)
+
+        audit.record(
+            request.user,
+            f"bulk_{data['action']}",
+            target_ids=data.get('ids', []),
+            filters=request.data.get('filter') or {},
+            changes=request.data.get('changes') or {},
+            affected=affected,
+        )
+        # Exact ids are only known when the caller listed them
+        invalidate_user_caches(data['ids'] if data.get('ids') and not data.get('filter') else None)
+
+        return Response({'detail': f"{affected} users affected.", 'affected': affected})
+
+    def get_target_queryset(self, data):
+        queryset = User.objects.all()
+        if data.get('ids'):
+            queryset = queryset.filter(pk__in=data['ids'])
+        filters = data.get('filter') or {}
+        if 'role' in filters:
+            queryset = queryset.filter(role=filters['role'])
+        if 'is_verified' in filters:
+            queryset = queryset.filter(is_verified=filters['is_verified'])
+        if 'is_active' in filters:
+            queryset = queryset.filter(is_active=filters['is_active'])
+        if filters.get('email_domain'):
+            queryset = queryset.filter(email__iendswith='@' + filters['email_domain'].lstrip('@'))
+        if 'joined_before' in filters:
+            queryset = queryset.filter(date_joined__lt=filters['joined_before'])
+        if 'joined_after' in filters:
+            queryset = queryset.filter(date_joined__gte=filters['joined_after'])
+        return queryset
+
+    @staticmethod
+    def lock_admins():
+        # Serializes concurrent admin-affecting operations on the admin rows
+        list(User.objects.select_for_update().filter(role='admin').values_list('pk', flat=True))
+
+    def bulk_update(self, queryset, changes):
+        removes_admin = changes.get('role') == 'user' or changes.get('is_active') is False
+        # Only touch rows where something actually changes, so the affected
+        # count (and the rollups fed from it) reflect real transitions
+        queryset = queryset.filter(reduce(operator.or_, [~Q(**{field: value}) for field, value in changes.items()]))
+        with transaction.atomic():
+            if removes_admin:
+                self.lock_admins()
+                queryset = queryset.filter(last_admin_guard(queryset.values('pk')))
+            affected = queryset.update(**changes)
+        # Exact when a single field changes; with several, rows changing only
+        # one of them are counted under each
+        if 'role' in changes:
+            rollups.record('role_changes', affected)
+        if changes.get('is_verified') is True:
+            rollups.record('verifications', affected)
+        return affected
+
+    def bulk_delete(self, queryset):
+        deleted = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:self.DELETE_BATCH_SIZE]
+                )
+                if not ids:
+                    return deleted
+                last_pk = ids[-1]
+                self.lock_admins()
+                _, per_model = User.objects.filter(pk__in=ids).filter(last_admin_guard(ids)).delete()
+                deleted += per_model.get(User._meta.label, 0)
+
+# Admin - Audit log, newest first, filtered by actor, target user, action
+# and time range; paginated with a (created_at, id) keyset cursor. Entries
+# are written behind, so the last AUDIT_LOG['FLUSH_SECONDS'] may be missing
+class AdminAuditLogView(APIView):
+    permission_classes = [IsAdmin]
+    query_budget = 2
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+    EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = max(1, min(int(params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT))
+            actor = int(params['actor']) if params.get('actor') else None
+            target = int(params['target']) if params.get('target') else None
+            since, until = (self.parse_time(params.get(name)) for name in ('since', 'until'))
+            cursor = self.decode_cursor(params['cursor']) if params.get('cursor') else None
+        except (ValueError, OverflowError):
+            return Response({'detail': 'limit, actor, target, since, until or cursor are malformed.'}, status=400)
+
+        queryset = audit.entries(
+            actor_id=actor, target_id=target, action=params.get('action'), since=since, until=until,
+        )
+        if cursor:
+            created_at, pk = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows = list(queryset.values(
+            'id', 'actor_id', 'actor_email', 'action', 'target_id', 'target_ids', 'filters', 'changes',
+            'affected', 'created_at',
+        )[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1])
+        return Response({'results': rows, 'next_cursor': next_cursor})
+
+    @staticmethod
+    def parse_time(value):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+    @classmethod
+    def encode_cursor(cls, row):
+        # Epoch microseconds rather than ISO 8601, whose '+00:00' arrives as
+        # a space unless the client URL-encodes it
+        micros = (row['created_at'] - cls.EPOCH) // timedelta(microseconds=1)
+        return f"{micros}_{row['id']}"
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        micros, pk = cursor.split('_')
+        return cls.EPOCH + timedelta(microseconds=int(micros)), int(pk)
+
+# Admin - Time-series analytics, read only from the rollup tables
+class AdminAnalyticsTimeseriesView(APIView):
+    permission_classes = [IsAdmin]
+    query_budget = 2
+    MAX_BUCKETS = {'day': 366, 'hour': 24 * 14}
+
+    def get(self, request):
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in rollups.GRANULARITIES:
+            return Response({'detail': 'granularity must be "day" or "hour".'}, status=400)
+        metrics = request.query_params.get('metrics', ','.join(rollups.METRICS)).split(',')
+        unknown = set(metrics) - set(rollups.METRICS)
+        if unknown:
+            return Response({'detail': f"Unknown metrics: {', '.join(sorted(unknown))}."}, status=400)
+        try:
+            span = int(request.query_params.get('span', 90 if granularity == 'day' else 48))
+        except ValueError:
+            return Response({'detail': 'span must be an integer.'}, status=400)
+        span = max(1, min(span, self.MAX_BUCKETS[granularity]))
+
+        now = timezone.now()
+        step = rollups.GRANULARITIES[granularity][1]
+        return Response({'granularity': granularity, **rollups.timeseries(metrics, granularity, now - step * (span - 1), now)})
+
+# Admin - Signup -> verification -> login funnel over a window of days
+class AdminFunnelView(APIView):
+    permission_classes = [IsAdmin]
+    query_budget = 2
+
+    def get(self, request):
+        try:
+            days = max(1, min(int(request.query_params.get('days', 30)), 366))
+        except ValueError:
+            return Response({'detail': 'days must be an integer.'}, status=400)
+        totals = rollups.totals(timezone.now() - timedelta(days=days - 1))
+        signups = totals['signups']
+        return Response({
+            'days': days,
+            'totals': totals,
+            'verification_rate': round(totals['verifications'] / signups, 4) if signups else None,
+        })
+
 # User Activity Log (for admin monitoring)
 class UserActivityView(APIView):
     permission_classes = [IsAdmin]
+    query_budget = 2
     
     def get(self, request):
         # This would typically involve a separate Activity model